@@ -0,0 +1,74 @@
+# Copyright 2024 Community Contributors
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Latency of message resolution against room size.
+
+MessageDAO.get is an indexed lookup and should stay flat as rooms grow; the
+scan reproduces the previous lookup, which loaded every message of the room
+and compared UUIDs.
+"""
+
+import pytest
+from sqlalchemy import text
+
+from wazo_chatd.database.helpers import Session
+
+from wazo_chatd_reactions.message_dao import MessageDAO
+
+from tests.fixtures import create_database, insert_messages, insert_room
+
+ROOM_SIZES = [1000, 10000, 100000]
+
+
+@pytest.fixture(scope='module')
+def rooms():
+    engine = create_database('chatd_reactions_bench_messages')
+    rooms = {}
+    with engine.begin() as connection:
+        for size in ROOM_SIZES:
+            room_uuid = insert_room(connection)
+            rooms[size] = room_uuid, insert_messages(connection, room_uuid, size)
+        connection.execute(text('ANALYZE'))
+    bind = Session.session_factory.kw.get('bind')
+    Session.remove()
+    Session.configure(bind=engine)
+    yield rooms
+    Session.remove()
+    Session.configure(bind=bind)
+    engine.dispose()
+
+
+def _scan(room_uuid, message_uuid):
+    messages = Session().execute(
+        text("""
+            SELECT uuid, room_uuid, user_uuid, alias, content, created_at
+            FROM chatd_room_message
+            WHERE room_uuid = :room_uuid
+        """),
+        {'room_uuid': room_uuid},
+    ).fetchall()
+    for message in messages:
+        if str(message.uuid) == message_uuid:
+            return message
+    return None
+
+
+LOOKUPS = {
+    'indexed': lambda room_uuid, message_uuid: MessageDAO().get(room_uuid, message_uuid),
+    'scan': _scan,
+}
+
+
+@pytest.mark.parametrize('lookup', sorted(LOOKUPS))
+@pytest.mark.parametrize('size', ROOM_SIZES)
+def test_get_message(benchmark, rooms, size, lookup):
+    room_uuid, messages = rooms[size]
+    message_uuid = messages[len(messages) // 2]
+    benchmark.group = f'{lookup} lookup'
+
+    message = benchmark.pedantic(
+        LOOKUPS[lookup], args=(room_uuid, message_uuid), rounds=10, warmup_rounds=1
+    )
+
+    assert str(message.uuid) == message_uuid
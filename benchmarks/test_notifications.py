@@ -0,0 +1,53 @@
+# Copyright 2024 Community Contributors
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Cost of publishing a reaction event against room size, in both fan-out modes.
+
+The fake publisher does the per-message work of the bus publisher (headers,
+routing key and JSON body) without a broker, so the numbers show the work
+done in the request, not the broker round trips.
+"""
+
+import json
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+
+from wazo_chatd_reactions.dao import ReactionResult
+from wazo_chatd_reactions.notifier import FANOUT_ROOM, FANOUT_USER, ReactionNotifier
+from wazo_chatd_reactions.rooms import RoomAccess
+
+from tests.fixtures import TENANT_UUID
+
+
+class FakePublisher:
+    def __init__(self):
+        self.published = 0
+
+    def publish(self, event):
+        headers = {'name': event.name, 'tenant_uuid': event.tenant_uuid}
+        if hasattr(event, 'user_uuids'):
+            headers.update({f'user_uuid:{user_uuid}': True for user_uuid in event.user_uuids})
+        else:
+            headers[f'user_uuid:{event.user_uuid}'] = True
+        event.routing_key_fmt.format(**vars(event))
+        json.dumps({'name': event.name, 'headers': headers, 'data': event.marshal()})
+        self.published += 1
+
+
+@pytest.mark.parametrize('fanout', [FANOUT_USER, FANOUT_ROOM])
+@pytest.mark.parametrize('members', [10, 100, 2000])
+def test_reaction_created(benchmark, members, fanout):
+    room = RoomAccess(str(uuid.uuid4()), TENANT_UUID, [str(uuid.uuid4()) for _ in range(members)])
+    reaction = ReactionResult(
+        str(uuid.uuid4()), room.user_uuids[0], '👍', datetime.now(timezone.utc)
+    )
+    publisher = FakePublisher()
+    notifier = ReactionNotifier(publisher, fanout=fanout)
+    benchmark.group = f'{members} members'
+    notifier.reaction_created(room, None, reaction)
+    benchmark.extra_info['bus_messages'] = publisher.published
+
+    benchmark(notifier.reaction_created, room, None, reaction)
@@ -0,0 +1,104 @@
+# Copyright 2024 Community Contributors
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Latency and plans of the DAO queries, unpartitioned and hash-partitioned by room.
+
+Both layouts hold the same generated dataset. The plan of each query (the
+indexes and partitions it reads) is stored in the benchmark's extra_info,
+shown by --benchmark-json.
+"""
+
+import pytest
+
+from wazo_chatd.database.helpers import Session
+
+from wazo_chatd_reactions.dao import ReactionDAO
+from wazo_chatd_reactions.partitioning import TABLES, partition_table
+from wazo_chatd_reactions.plans import PLAN_CHECKS, _explain, _walk
+from wazo_chatd_reactions.reply_dao import ReplyDAO
+
+from tests.fixtures import create_database, insert_dataset
+
+ROOMS = 200
+MESSAGES = 200
+PARTITIONS = 16
+
+LAYOUTS = ['plain', 'partitioned']
+
+
+@pytest.fixture(scope='module')
+def layouts():
+    engines = {}
+    for layout in LAYOUTS:
+        engine = create_database(f'chatd_reactions_bench_{layout}')
+        with engine.begin() as connection:
+            # Same rooms in both layouts, for the same partition sizes
+            rooms = insert_dataset(connection, rooms=ROOMS, messages=MESSAGES)
+            if layout == 'partitioned':
+                for table in TABLES.values():
+                    partition_table(connection, table, PARTITIONS)
+        engines[layout] = engine, rooms
+    yield engines
+    for engine, _ in engines.values():
+        engine.dispose()
+
+
+@pytest.fixture(params=LAYOUTS)
+def layout(request, layouts):
+    engine, rooms = layouts[request.param]
+    bind = Session.session_factory.kw.get('bind')
+    Session.remove()
+    Session.configure(bind=engine)
+    with engine.connect() as connection:
+        messages = [
+            str(row[0]) for row in connection.exec_driver_sql(
+                'SELECT uuid FROM chatd_room_message WHERE room_uuid = %(room)s '
+                'ORDER BY created_at',
+                {'room': rooms[0]},
+            )
+        ]
+    yield engine, rooms[0], messages
+    Session.remove()
+    Session.configure(bind=bind)
+
+
+def _plan(engine, name):
+    [check] = [check for check in PLAN_CHECKS if check.name == name]
+    with engine.begin() as connection:
+        nodes = list(_walk(_explain(connection, check)[0]['Plan']))
+    return [
+        ' '.join(filter(None, (node['Node Type'], node.get('Relation Name'), node.get('Index Name'))))
+        for node in nodes
+    ]
+
+
+QUERIES = {
+    'ReactionDAO.get_by_message':
+        lambda room, messages: ReactionDAO().get_by_message(room, messages[0]),
+    'ReactionDAO.get_summaries_by_message':
+        lambda room, messages: ReactionDAO().get_summaries_by_message(room, messages[0], room),
+    'ReactionDAO.get_summaries_for_room':
+        lambda room, messages: ReactionDAO().get_summaries_for_room(room, room),
+    'ReactionDAO.get_counts_by_message':
+        lambda room, messages: ReactionDAO().get_counts_by_message(room, messages[0], room),
+    'ReplyDAO.get_by_child':
+        lambda room, messages: ReplyDAO().get_by_child(room, messages[-1]),
+    'ReplyDAO.get_replies_to_message':
+        lambda room, messages: ReplyDAO().get_replies_to_message(room, messages[0]),
+    'ReplyDAO.get_thread_summaries':
+        lambda room, messages: ReplyDAO().get_thread_summaries(room, messages[:50]),
+    'ReplyDAO.get_replies_in_room':
+        lambda room, messages: ReplyDAO().get_replies_in_room(room),
+}
+
+
+@pytest.mark.parametrize('name', sorted(QUERIES))
+def test_query(benchmark, layout, name):
+    engine, room, messages = layout
+    benchmark.group = name
+    benchmark.extra_info['plan'] = _plan(engine, name)
+
+    result = benchmark(QUERIES[name], room, messages)
+
+    assert result or result == 0
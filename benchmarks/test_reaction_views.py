@@ -0,0 +1,94 @@
+# Copyright 2024 Community Contributors
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Latency and payload size of the full and summary reaction views.
+
+The room holds 50k reactions (5,000 messages with 10 reactions each). Each
+benchmark reads and dumps a response as the resource does; its JSON size is
+stored in the benchmark's extra_info, shown by --benchmark-json.
+"""
+
+import json
+import uuid
+from unittest.mock import Mock
+
+import pytest
+
+from wazo_chatd.database.helpers import Session
+
+from wazo_chatd_reactions import serializers
+from wazo_chatd_reactions.dao import ReactionDAO
+from wazo_chatd_reactions.message_dao import MessageDAO
+from wazo_chatd_reactions.rooms import RoomAccess
+from wazo_chatd_reactions.services import ReactionService
+
+from tests.fixtures import TENANT_UUID, create_database, insert_dataset
+
+MESSAGES = 5000
+USER_UUID = str(uuid.uuid4())
+EMOJIS = ('👍', '❤️', '🎉', '😂', '🚀', '👀', '🙏', '🔥', '✅', '💯')
+
+
+@pytest.fixture(scope='module')
+def room():
+    engine = create_database('chatd_reactions_bench_views')
+    with engine.begin() as connection:
+        [room_uuid] = insert_dataset(connection, rooms=1, messages=MESSAGES, emojis=EMOJIS)
+        message_uuid = connection.exec_driver_sql(
+            'SELECT message_uuid FROM chatd_room_message_reaction LIMIT 1'
+        ).scalar()
+    bind = Session.session_factory.kw.get('bind')
+    Session.remove()
+    Session.configure(bind=engine)
+    yield room_uuid, str(message_uuid)
+    Session.remove()
+    Session.configure(bind=bind)
+    engine.dispose()
+
+
+def _service(room_uuid):
+    room_cache = Mock()
+    room_cache.get.return_value = RoomAccess(room_uuid, TENANT_UUID, [])
+    return ReactionService(room_cache, ReactionDAO(), MessageDAO(), Mock(), Mock())
+
+
+VIEWS = {
+    ('room', 'full'): lambda service, room_uuid, message_uuid: serializers.dump_room_reactions(
+        service.get_room_reactions(TENANT_UUID, room_uuid, USER_UUID)
+    ),
+    ('room', 'summary'): lambda service, room_uuid, message_uuid: (
+        serializers.dump_room_reaction_counts(
+            service.get_room_reaction_counts(TENANT_UUID, room_uuid, USER_UUID)
+        )
+    ),
+    ('message', 'full'): lambda service, room_uuid, message_uuid: (
+        serializers.dump_message_reactions(
+            service.get_reactions(TENANT_UUID, room_uuid, message_uuid, USER_UUID)
+        )
+    ),
+    ('message', 'summary'): lambda service, room_uuid, message_uuid: (
+        serializers.dump_message_reaction_counts(
+            service.get_reaction_counts(TENANT_UUID, room_uuid, message_uuid, USER_UUID)
+        )
+    ),
+}
+
+
+@pytest.mark.parametrize('view', ['full', 'summary'])
+@pytest.mark.parametrize('endpoint', ['room', 'message'])
+def test_reaction_view(benchmark, room, endpoint, view):
+    room_uuid, message_uuid = room
+    benchmark.group = f'{endpoint} reactions'
+
+    payload = benchmark.pedantic(
+        VIEWS[endpoint, view],
+        args=(_service(room_uuid), room_uuid, message_uuid),
+        rounds=10,
+        warmup_rounds=1,
+    )
+
+    benchmark.extra_info['payload_bytes'] = len(
+        json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    )
+    assert payload['reactions']
@@ -0,0 +1,132 @@
+# Copyright 2024 Community Contributors
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Throughput and memory of large DAO results, with the slotted tuple rows and
+with the previous plain result classes.
+
+The room holds 100k reactions and 10k replies. The memory retained by each
+result list (measured with tracemalloc) is stored in the benchmark's
+extra_info, shown by --benchmark-json.
+"""
+
+import tracemalloc
+
+import pytest
+
+from wazo_chatd.database.helpers import Session
+
+from wazo_chatd_reactions import dao, reply_dao
+from wazo_chatd_reactions.dao import ReactionDAO, ReactionResult
+from wazo_chatd_reactions.reply_dao import ReplyDAO, ReplyResult
+
+from tests.fixtures import create_database, insert_dataset
+
+MESSAGES = 20000
+EMOJIS = ('👍', '❤️', '🎉', '😂', '🚀')
+
+
+class _PlainReactionResult:
+    """ReactionResult before slotted rows."""
+
+    def __init__(self, message_uuid, user_uuid, emoji, created_at):
+        self.message_uuid = message_uuid
+        self.user_uuid = user_uuid
+        self.emoji = emoji
+        self.created_at = created_at
+
+
+class _PlainReplyResult:
+    """ReplyResult before slotted rows."""
+
+    def __init__(self, child_message_uuid, parent_message_uuid, room_uuid,
+                 parent_content_preview, parent_author_uuid, parent_author_alias,
+                 parent_created_at, created_at):
+        self.child_message_uuid = child_message_uuid
+        self.parent_message_uuid = parent_message_uuid
+        self.room_uuid = room_uuid
+        self.parent_content_preview = parent_content_preview
+        self.parent_author_uuid = parent_author_uuid
+        self.parent_author_alias = parent_author_alias
+        self.parent_created_at = parent_created_at
+        self.created_at = created_at
+
+
+_PLAIN_TYPES = {ReactionResult: _PlainReactionResult, ReplyResult: _PlainReplyResult}
+
+
+def _map_plain_rows(result_type, rows):
+    plain_type = _PLAIN_TYPES[result_type]
+    return [plain_type(*row) for row in rows]
+
+
+@pytest.fixture(scope='module')
+def room():
+    engine = create_database('chatd_reactions_bench_rows')
+    with engine.begin() as connection:
+        [room_uuid] = insert_dataset(
+            connection, rooms=1, messages=MESSAGES, emojis=EMOJIS, threads=100
+        )
+    bind = Session.session_factory.kw.get('bind')
+    Session.remove()
+    Session.configure(bind=engine)
+    yield room_uuid
+    Session.remove()
+    Session.configure(bind=bind)
+    engine.dispose()
+
+
+@pytest.fixture(params=['tuple', 'plain'])
+def rows(request, monkeypatch):
+    if request.param == 'plain':
+        monkeypatch.setattr(dao, 'map_rows', _map_plain_rows)
+        monkeypatch.setattr(reply_dao, 'map_rows', _map_plain_rows)
+    return request.param
+
+
+def _retained_bytes(func, *args):
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = func(*args)
+        retained = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    return result, retained
+
+
+QUERIES = {
+    'ReactionDAO.get_all_for_room': lambda room_uuid: ReactionDAO().get_all_for_room(room_uuid),
+    'ReplyDAO.get_replies_in_room': lambda room_uuid: ReplyDAO().get_replies_in_room(room_uuid),
+}
+
+
+@pytest.mark.parametrize('name', sorted(QUERIES))
+def test_query(benchmark, room, rows, name):
+    benchmark.group = name
+    result, retained = _retained_bytes(QUERIES[name], room)
+    benchmark.extra_info['rows'] = len(result)
+    benchmark.extra_info['retained_bytes'] = retained
+
+    result = benchmark.pedantic(QUERIES[name], args=(room,), rounds=5, warmup_rounds=1)
+
+    assert len(result) == benchmark.extra_info['rows']
+
+
+@pytest.mark.parametrize('name', sorted(QUERIES))
+def test_map_rows(benchmark, room, rows, name):
+    """Mapping only, from rows already fetched."""
+    result_type = ReactionResult if name.startswith('ReactionDAO') else ReplyResult
+    fetched = [
+        tuple(getattr(row, field) for field in result_type._fields)
+        for row in QUERIES[name](room)
+    ]
+    map_rows = dao.map_rows
+    benchmark.group = f'{name} mapping'
+
+    _, retained = _retained_bytes(map_rows, result_type, fetched)
+    benchmark.extra_info['retained_bytes'] = retained
+
+    result = benchmark(map_rows, result_type, fetched)
+
+    assert len(result) == len(fetched)
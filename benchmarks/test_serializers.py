@@ -0,0 +1,56 @@
+# Copyright 2024 Community Contributors
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Dump time of room reaction responses: marshmallow schemas against serializers."""
+
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from wazo_chatd_reactions import schemas, serializers
+
+EMOJIS = ['👍', '❤️', '🎉', '😂', '🚀']
+
+# Reactions per message, spread over the emojis
+REACTIONS_PER_MESSAGE = 10
+
+
+def _room_reactions(count):
+    """A get_room_reactions result with `count` reactions."""
+    users = [str(uuid.uuid4()) for _ in range(REACTIONS_PER_MESSAGE)]
+    created_at = datetime(2024, 1, 15, tzinfo=timezone.utc)
+    reactions = {}
+    for _ in range(count // REACTIONS_PER_MESSAGE):
+        summaries = []
+        for i, emoji in enumerate(EMOJIS):
+            user_uuids = users[i::len(EMOJIS)]
+            summaries.append({
+                'emoji': emoji,
+                'count': len(user_uuids),
+                'user_uuids': user_uuids,
+                'reacted_by_me': i == 0,
+                'details': [
+                    {'user_uuid': user_uuid, 'created_at': created_at + timedelta(seconds=j)}
+                    for j, user_uuid in enumerate(user_uuids)
+                ],
+            })
+        reactions[str(uuid.uuid4())] = summaries
+    return {'room_uuid': str(uuid.uuid4()), 'reactions': reactions}
+
+
+DUMPS = {
+    'schema': lambda result: schemas.RoomReactionsSchema().dump(result),
+    'serializer': serializers.dump_room_reactions,
+}
+
+
+@pytest.mark.parametrize('dump', sorted(DUMPS))
+@pytest.mark.parametrize('count', [1000, 10000, 100000])
+def test_dump_room_reactions(benchmark, count, dump):
+    result = _room_reactions(count)
+    benchmark.group = f'{count} reactions'
+
+    dumped = benchmark.pedantic(DUMPS[dump], args=(result,), rounds=5, warmup_rounds=1)
+
+    assert len(dumped['reactions']) == count // REACTIONS_PER_MESSAGE
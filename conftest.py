@@ -0,0 +1,5 @@
+# Copyright 2024 Community Contributors
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+# Shared by the tests and the benchmarks
+pytest_plugins = ['tests.fixtures']
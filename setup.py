@@ -15,12 +15,19 @@ setup(
     description=metadata.get('description', metadata['display_name']),
     author=metadata['author'],
     url=metadata.get('homepage', ''),
-    packages=find_packages(),
+    packages=find_packages(exclude=['tests', 'tests.*', 'benchmarks']),
     include_package_data=True,
     package_data={
-        'wazo_chatd_reactions': ['api.yml'],
+        'wazo_chatd_reactions': ['api.yml', 'migrations/*.sql'],
+    },
+    extras_require={
+        # Shared cache backend for multi-node deployments
+        'redis': ['redis'],
     },
     entry_points={
+        'console_scripts': [
+            'wazo-chatd-reactions-admin = wazo_chatd_reactions.admin:main',
+        ],
         'wazo_chatd.plugins': [
             'reactions = wazo_chatd_reactions.plugin:Plugin',
         ],
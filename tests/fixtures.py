@@ -0,0 +1,228 @@
+# Copyright 2024 Community Contributors
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Pytest fixtures: platform modules and a migrated PostgreSQL database.
+
+Database tests run against the server of WAZO_CHATD_REACTIONS_TEST_DB_URI
+(a PostgreSQL URI, as the database owner) or, when it is not set, against a
+throwaway server started with the pgserver package. They are skipped when
+neither is available. Each test database gets the chatd tables the plugin
+depends on, then the plugin migrations.
+"""
+
+import os
+import tempfile
+import uuid
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+
+from .platform_modules import install
+
+install()
+
+from wazo_chatd.database.helpers import Session  # noqa: E402
+
+from wazo_chatd_reactions.schema import migrate  # noqa: E402
+
+DB_URI_ENV = 'WAZO_CHATD_REACTIONS_TEST_DB_URI'
+
+TENANT_UUID = '00000000-0000-4000-8000-00000000000a'
+WAZO_UUID = '00000000-0000-4000-8000-00000000000b'
+
+# Subset of the wazo-chatd schema used by the plugin
+CHATD_TABLES = """
+    CREATE TABLE chatd_room (
+        uuid UUID PRIMARY KEY,
+        tenant_uuid UUID NOT NULL,
+        name TEXT,
+        created_at TIMESTAMPTZ DEFAULT NOW() NOT NULL
+    );
+    CREATE TABLE chatd_room_message (
+        uuid UUID PRIMARY KEY,
+        room_uuid UUID NOT NULL REFERENCES chatd_room(uuid) ON DELETE CASCADE,
+        content TEXT,
+        alias VARCHAR(256),
+        user_uuid UUID NOT NULL,
+        tenant_uuid UUID NOT NULL,
+        wazo_uuid UUID NOT NULL,
+        created_at TIMESTAMPTZ DEFAULT NOW() NOT NULL
+    );
+    CREATE INDEX chatd_room_message__idx__room_uuid ON chatd_room_message(room_uuid);
+"""
+
+PLUGIN_TABLES = [
+    'chatd_room_message_change',
+    'chatd_room_message_reaction',
+    'chatd_room_message_reaction_summary',
+    'chatd_room_message_reply',
+    'chatd_room_message',
+    'chatd_room',
+]
+
+_server = None
+
+
+def get_server_uri():
+    """Get the URI of the test PostgreSQL server, starting one if needed."""
+    global _server
+    uri = os.environ.get(DB_URI_ENV)
+    if uri:
+        return uri
+    try:
+        import pgserver
+    except ImportError:
+        pytest.skip(f'{DB_URI_ENV} is not set and pgserver is not installed')
+    if _server is None:
+        _server = pgserver.get_server(
+            os.path.join(tempfile.gettempdir(), 'wazo-chatd-reactions-tests'),
+            cleanup_mode='stop',
+        )
+    return _server.get_uri()
+
+
+def create_database(name, target=None):
+    """Create (or recreate) an empty, migrated test database.
+
+    Args:
+        name: Database name
+        target: Last migration applied (all if None)
+
+    Returns:
+        SQLAlchemy engine of the database
+    """
+    server_uri = get_server_uri()
+    admin_engine = create_engine(server_uri, isolation_level='AUTOCOMMIT')
+    with admin_engine.connect() as connection:
+        connection.execute(text(f'DROP DATABASE IF EXISTS {name} WITH (FORCE)'))
+        connection.execute(text(f'CREATE DATABASE {name}'))
+        connection.execute(text("""
+            DO $$ BEGIN
+                CREATE ROLE asterisk;
+            EXCEPTION WHEN duplicate_object THEN NULL;
+            END $$
+        """))
+    admin_engine.dispose()
+
+    engine = create_engine(make_url(server_uri).set(database=name))
+    with engine.begin() as connection:
+        connection.connection.cursor().execute(CHATD_TABLES)
+    migrate(engine, target=target)
+    return engine
+
+
+def insert_room(connection, tenant_uuid=TENANT_UUID):
+    """Insert a chatd room and return its UUID."""
+    room_uuid = str(uuid.uuid4())
+    connection.execute(
+        text('INSERT INTO chatd_room (uuid, tenant_uuid) VALUES (:uuid, :tenant_uuid)'),
+        {'uuid': room_uuid, 'tenant_uuid': tenant_uuid},
+    )
+    return room_uuid
+
+
+def insert_messages(connection, room_uuid, count, user_uuid=None):
+    """Insert messages in a room, one second apart, and return their UUIDs (oldest first)."""
+    results = connection.execute(
+        text("""
+            INSERT INTO chatd_room_message
+                (uuid, room_uuid, content, alias, user_uuid, tenant_uuid, wazo_uuid, created_at)
+            SELECT gen_random_uuid(), :room_uuid, 'message ' || i, 'alias',
+                   COALESCE(CAST(:user_uuid AS uuid), gen_random_uuid()),
+                   :tenant_uuid, :wazo_uuid,
+                   TIMESTAMPTZ '2024-01-01 00:00:00+00' + i * INTERVAL '1 second'
+            FROM generate_series(1, :count) AS i
+            RETURNING uuid, created_at
+        """),
+        {
+            'room_uuid': room_uuid,
+            'user_uuid': user_uuid,
+            'tenant_uuid': TENANT_UUID,
+            'wazo_uuid': WAZO_UUID,
+            'count': count,
+        },
+    ).fetchall()
+    return [str(row[0]) for row in sorted(results, key=lambda row: row[1])]
+
+
+def insert_dataset(connection, rooms, messages, emojis=('👍', '❤️', '🎉'), threads=25):
+    """Insert rooms of messages with reactions and threads, for plans and benchmarks.
+
+    Each message has one reaction per emoji, each from another user. The
+    second half of the messages of a room are replies, spread over `threads`
+    parents of the first half. Statistics are updated afterwards.
+
+    Returns:
+        List of room UUIDs
+    """
+    room_uuids = []
+    for _ in range(rooms):
+        room_uuid = insert_room(connection)
+        message_uuids = insert_messages(connection, room_uuid, messages)
+        connection.execute(
+            text("""
+                INSERT INTO chatd_room_message_reaction
+                    (room_uuid, message_uuid, user_uuid, emoji, created_at)
+                SELECT :room_uuid, m.uuid, gen_random_uuid(), e.emoji,
+                       m.created_at + e.i * INTERVAL '1 millisecond'
+                FROM chatd_room_message m,
+                     unnest(CAST(:emojis AS text[])) WITH ORDINALITY AS e(emoji, i)
+                WHERE m.room_uuid = :room_uuid
+            """),
+            {'room_uuid': room_uuid, 'emojis': list(emojis)},
+        )
+        half = messages // 2
+        connection.execute(
+            text("""
+                INSERT INTO chatd_room_message_reply
+                    (room_uuid, child_message_uuid, parent_message_uuid, created_at)
+                SELECT :room_uuid, child, parent, NOW()
+                FROM unnest(CAST(:children AS uuid[]), CAST(:parents AS uuid[]))
+                    AS t(child, parent)
+            """),
+            {
+                'room_uuid': room_uuid,
+                'children': message_uuids[half:],
+                'parents': [
+                    message_uuids[i % min(threads, half)] for i in range(messages - half)
+                ],
+            },
+        )
+        room_uuids.append(room_uuid)
+    connection.execute(text("""
+        INSERT INTO chatd_room_message_reaction_summary
+            (room_uuid, message_uuid, emoji, count, created_at, last_updated)
+        SELECT room_uuid, message_uuid, emoji, COUNT(*), MIN(created_at), MAX(created_at)
+        FROM chatd_room_message_reaction
+        GROUP BY room_uuid, message_uuid, emoji
+        ON CONFLICT (message_uuid, emoji) DO UPDATE SET count = EXCLUDED.count
+    """))
+    connection.execute(text('ANALYZE'))
+    return room_uuids
+
+
+@pytest.fixture(scope='session')
+def engine():
+    engine = create_database('chatd_reactions_tests')
+    Session.configure(bind=engine)
+    yield engine
+    Session.remove()
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    """Bind the DAO session to the test database, emptied after the test."""
+    yield engine
+    Session.remove()
+    with engine.begin() as connection:
+        connection.execute(text(f'TRUNCATE {", ".join(PLUGIN_TABLES)} CASCADE'))
+
+
+@pytest.fixture
+def room(db):
+    """UUID of an empty room."""
+    with db.begin() as connection:
+        return insert_room(connection)
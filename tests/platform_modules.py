@@ -0,0 +1,111 @@
+# Copyright 2024 Community Contributors
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Stand-ins for the wazo-chatd platform modules imported by the plugin.
+
+The plugin runs inside wazo-chatd, whose packages (wazo_chatd, xivo,
+wazo_bus) are not published on PyPI. When they are not installed, these
+modules provide the few names the plugin imports, with the same behavior for
+what the tests exercise: the scoped database session, the marshmallow schema
+base, the API exception and the bus event base classes. When the real
+packages are installed, they are used instead.
+"""
+
+import importlib
+import sys
+import types
+
+
+def install():
+    """Register the stand-ins of the platform modules that cannot be imported."""
+    for name, build in (
+        ('wazo_chatd', _build_wazo_chatd),
+        ('xivo', _build_xivo),
+        ('wazo_bus', _build_wazo_bus),
+    ):
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            build()
+
+
+def _module(name, **attributes):
+    module = types.ModuleType(name)
+    module.__dict__.update(attributes)
+    sys.modules[name] = module
+    parent, _, child = name.rpartition('.')
+    if parent:
+        setattr(sys.modules[parent], child, module)
+    return module
+
+
+def _build_wazo_chatd():
+    from sqlalchemy.orm import scoped_session, sessionmaker
+
+    class AuthResource:
+        method_decorators = []
+
+    _module('wazo_chatd')
+    _module('wazo_chatd.database')
+    _module('wazo_chatd.database.helpers', Session=scoped_session(sessionmaker()))
+    _module('wazo_chatd.http', AuthResource=AuthResource)
+
+
+def _build_xivo():
+    import marshmallow
+
+    class APIException(Exception):
+        def __init__(self, status_code, message, error_id, details=None, resource=None):
+            super().__init__(message)
+            self.status_code = status_code
+            self.message = message
+            self.id_ = error_id
+            self.details = details or {}
+            self.resource = resource
+
+    class Schema(marshmallow.Schema):
+        class Meta:
+            unknown = marshmallow.EXCLUDE
+
+    def required_acl(acl):
+        def wrapper(func):
+            return func
+        return wrapper
+
+    _module('xivo')
+    _module('xivo.rest_api_helpers', APIException=APIException)
+    _module('xivo.mallow', fields=marshmallow.fields, validate=marshmallow.validate)
+    _module('xivo.mallow_helpers', Schema=Schema)
+    _module('xivo.auth_verifier', required_acl=required_acl)
+    _module('xivo.tenant_flask_helpers', token=None)
+
+
+def _build_wazo_bus():
+
+    class UserEvent:
+        def __init__(self, content, tenant_uuid, user_uuid):
+            self.content = content
+            self.tenant_uuid = str(tenant_uuid)
+            self.user_uuid = str(user_uuid)
+
+        def marshal(self):
+            return self.content
+
+    class MultiUserEvent:
+        def __init__(self, content, tenant_uuid, user_uuids):
+            self.content = content
+            self.tenant_uuid = str(tenant_uuid)
+            self.user_uuids = [str(user_uuid) for user_uuid in user_uuids]
+
+        def marshal(self):
+            return self.content
+
+    _module('wazo_bus')
+    _module('wazo_bus.resources')
+    _module('wazo_bus.resources.common')
+    _module(
+        'wazo_bus.resources.common.event',
+        UserEvent=UserEvent,
+        MultiUserEvent=MultiUserEvent,
+    )
@@ -0,0 +1,67 @@
+# Copyright 2024 Community Contributors
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import argparse
+import uuid
+
+from sqlalchemy import text
+
+from wazo_chatd_reactions.admin import _cmd_backfill_reaction_rooms
+from wazo_chatd_reactions.schema import migrate
+
+from .fixtures import create_database, insert_messages, insert_room
+
+
+def test_backfill_reaction_rooms_then_validates_the_room_constraints():
+    # Reactions and counts written before migration 0005 added their room
+    engine = create_database('chatd_reactions_admin_backfill', target=4)
+    with engine.begin() as connection:
+        room_uuid = insert_room(connection)
+        message_uuids = insert_messages(connection, room_uuid, 3)
+        connection.execute(text("""
+            INSERT INTO chatd_room_message_reaction (message_uuid, user_uuid, emoji)
+            SELECT CAST(m AS uuid), gen_random_uuid(), '👍'
+            FROM unnest(CAST(:message_uuids AS text[])) AS m
+        """), {'message_uuids': message_uuids})
+        connection.execute(text("""
+            INSERT INTO chatd_room_message_reaction_summary
+                (message_uuid, emoji, count, created_at, last_updated)
+            SELECT CAST(m AS uuid), '👍', 1, NOW(), NOW()
+            FROM unnest(CAST(:message_uuids AS text[])) AS m
+        """), {'message_uuids': message_uuids})
+    migrate(engine)
+
+    try:
+        _cmd_backfill_reaction_rooms(engine, argparse.Namespace(batch_size=2))
+
+        with engine.begin() as connection:
+            rooms = connection.execute(text("""
+                SELECT room_uuid FROM chatd_room_message_reaction
+                UNION ALL
+                SELECT room_uuid FROM chatd_room_message_reaction_summary
+            """)).scalars().all()
+            validated = connection.execute(text("""
+                SELECT conname, convalidated FROM pg_constraint
+                WHERE conname LIKE '%room_uuid_not_null' ORDER BY conname
+            """)).fetchall()
+        assert [str(room) for room in rooms] == [room_uuid] * 6
+        assert validated == [
+            ('chatd_room_message_reaction_room_uuid_not_null', True),
+            ('chatd_room_message_reaction_summary_room_uuid_not_null', True),
+        ]
+    finally:
+        engine.dispose()
+
+
+def test_reactions_get_the_room_of_their_message(db, room):
+    with db.begin() as connection:
+        message_uuid = insert_messages(connection, room, 1)[0]
+        connection.execute(text("""
+            INSERT INTO chatd_room_message_reaction (message_uuid, user_uuid, emoji)
+            VALUES (:message_uuid, :user_uuid, '👍')
+        """), {'message_uuid': message_uuid, 'user_uuid': str(uuid.uuid4())})
+        room_uuid = connection.execute(text(
+            'SELECT room_uuid FROM chatd_room_message_reaction'
+        )).scalar()
+
+    assert str(room_uuid) == room
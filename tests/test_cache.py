@@ -0,0 +1,74 @@
+# Copyright 2024 Community Contributors
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from wazo_chatd_reactions.cache import LRUCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire_after_ttl():
+    clock = Clock()
+    cache = LRUCache(max_size=10, ttl=30, clock=clock)
+    cache.set('room', 'value')
+
+    clock.now += 29
+    assert cache.get('room') == 'value'
+
+    clock.now += 1
+    assert cache.get('room') is None
+    assert cache.stats()['size'] == 0
+
+
+def test_set_resets_the_ttl():
+    clock = Clock()
+    cache = LRUCache(max_size=10, ttl=30, clock=clock)
+    cache.set('room', 'old')
+    clock.now += 20
+    cache.set('room', 'new')
+    clock.now += 20
+
+    assert cache.get('room') == 'new'
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = LRUCache(max_size=2, ttl=30)
+    cache.set('first', 1)
+    cache.set('second', 2)
+    cache.get('first')
+
+    cache.set('third', 3)
+
+    assert cache.get('second') is None
+    assert cache.get('first') == 1
+    assert cache.get('third') == 3
+    assert cache.stats()['evictions'] == 1
+
+
+def test_invalidation():
+    cache = LRUCache(max_size=10, ttl=30)
+    for key in [('tenant', 'a'), ('tenant', 'b'), ('other', 'a')]:
+        cache.set(key, True)
+
+    cache.invalidate(('tenant', 'a'))
+    cache.invalidate_where(lambda key: key[1] == 'a')
+
+    assert cache.get(('tenant', 'a')) is None
+    assert cache.get(('other', 'a')) is None
+    assert cache.get(('tenant', 'b')) is True
+
+
+def test_stats_count_hits_and_misses():
+    cache = LRUCache(max_size=10, ttl=30)
+    cache.set('room', 'value')
+    cache.get('room')
+    cache.get('missing')
+
+    stats = cache.stats()
+
+    assert (stats['hits'], stats['misses'], stats['size']) == (1, 1, 1)
@@ -0,0 +1,192 @@
+# Copyright 2024 Community Contributors
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import uuid
+from unittest.mock import Mock
+
+import fakeredis
+import pytest
+import redis
+
+from wazo_chatd_reactions.cache_backends import (
+    FailSafeCache,
+    MemoryCacheBackend,
+    RedisCacheBackend,
+)
+from wazo_chatd_reactions.response_cache import RoomResponseCache
+from wazo_chatd_reactions.versions import VersionTracker
+
+ROOM_UUID = str(uuid.uuid4())
+PAYLOAD = {'reactions': {str(uuid.uuid4()): [{'emoji': '👍', 'count': 2}]}}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def redis_server(monkeypatch):
+    """Fake Redis server, used by every RedisCacheBackend created in the test."""
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(
+        redis.Redis, 'from_url', lambda url, **kwargs: fakeredis.FakeRedis(server=server)
+    )
+    return server
+
+
+def test_redis_versions_are_shared_by_every_process(redis_server):
+    first = VersionTracker(FailSafeCache(RedisCacheBackend()))
+    second = VersionTracker(FailSafeCache(RedisCacheBackend()))
+    version = second.room_version(ROOM_UUID)
+
+    first.bump_room(ROOM_UUID)
+
+    assert second.room_version(ROOM_UUID) > version
+
+
+def test_failsafe_cache_bypasses_redis_after_an_error(redis_server):
+    clock = Clock()
+    backend = RedisCacheBackend()
+    cache = FailSafeCache(backend, retry_after=30, clock=clock)
+    cache.set('key', b'value', 60)
+    redis_server.connected = False
+
+    assert cache.get('key') is None
+    assert cache.bump('counter', ['key'], 60) is None
+    assert cache.stats()['available'] is False
+    assert cache.stats()['errors'] == 1
+
+    # Bypassed without calling Redis until retry_after has elapsed
+    redis_server.connected = True
+    assert cache.get('key') is None
+    assert cache.stats()['errors'] == 1
+
+    clock.now += 30
+    assert cache.get('key') == b'value'
+    assert cache.stats()['available'] is True
+
+
+def test_failsafe_cache_turns_backend_exceptions_into_misses():
+    backend = Mock(shared=True)
+    backend.get_many.side_effect = redis.exceptions.TimeoutError()
+    cache = FailSafeCache(backend)
+
+    assert cache.get_many(['a', 'b']) == [None, None]
+    cache.set('a', b'value', 60)
+    backend.set.assert_not_called()
+    assert cache.stats()['misses'] == 2
+
+
+def test_versions_and_response_cache_fall_back_when_redis_fails(redis_server):
+    clock = Clock()
+    cache = FailSafeCache(RedisCacheBackend(), clock=clock)
+    versions = VersionTracker(cache)
+    response_cache = RoomResponseCache(cache)
+    build = Mock(return_value=PAYLOAD)
+    redis_server.connected = False
+
+    version = versions.room_version(ROOM_UUID)
+    key = ('reactions', ROOM_UUID, version) if version is not None else None
+
+    assert version is None
+    assert response_cache.get_or_build(key, build) == PAYLOAD
+    assert response_cache.get_or_build(('reactions', ROOM_UUID, 1), build) == PAYLOAD
+    assert build.call_count == 2
+
+
+def test_response_cache_with_a_shared_backend(redis_server):
+    response_cache = RoomResponseCache(FailSafeCache(RedisCacheBackend()), compress_min_bytes=1)
+    build = Mock(return_value=PAYLOAD)
+
+    assert response_cache.get_or_build(('reactions', ROOM_UUID, 1), build) == PAYLOAD
+    assert response_cache.get_or_build(('reactions', ROOM_UUID, 1), build) == PAYLOAD
+    build.assert_called_once()
+
+
+def test_response_cache_disabled_with_a_per_process_backend():
+    response_cache = RoomResponseCache(FailSafeCache(MemoryCacheBackend()))
+    build = Mock(return_value=PAYLOAD)
+
+    response_cache.get_or_build(('reactions', ROOM_UUID, 1), build)
+    response_cache.get_or_build(('reactions', ROOM_UUID, 1), build)
+
+    assert build.call_count == 2
+
+
+def test_memory_backend_entries_expire_after_ttl():
+    clock = Clock()
+    backend = MemoryCacheBackend(clock=clock)
+    backend.set('payload', b'value', 30)
+
+    clock.now += 29
+    assert backend.get_many(['payload']) == [b'value']
+
+    clock.now += 1
+    assert backend.get_many(['payload']) == [None]
+    assert backend.stats()['bytes'] == 0
+
+
+def test_memory_backend_evicts_least_recently_used_values_by_size():
+    backend = MemoryCacheBackend(max_bytes=10)
+    backend.set('first', b'1234', 60)
+    backend.set('second', b'1234', 60)
+    backend.get_many(['first'])
+
+    backend.set('third', b'1234', 60)
+
+    assert backend.get_many(['first', 'second', 'third']) == [b'1234', None, b'1234']
+    assert backend.stats()['bytes'] == 8
+    assert backend.stats()['evictions'] == 1
+
+    # Values larger than the cache are not stored
+    backend.set('large', b'x' * 11, 60)
+    assert backend.get_many(['large', 'first']) == [None, b'1234']
+
+
+def test_memory_backend_versions_survive_eviction():
+    backend = MemoryCacheBackend(max_bytes=64)
+    version = backend.bump('counter', ['version:a'], 60)
+    backend.set('payload', b'x' * 64, 60)
+
+    # The evicted version falls back to the counter, never to an older value
+    assert backend.get_many(['version:a']) == [None]
+    assert int(backend.get_many(['counter'])[0]) >= version
+    assert backend.bump('counter', ['version:a'], 60) > version
+
+
+def test_failed_bump_disables_versions_until_it_is_retried(redis_server):
+    clock = Clock()
+    cache = FailSafeCache(RedisCacheBackend(), retry_after=30, clock=clock)
+    versions = VersionTracker(cache)
+    version = versions.room_version(ROOM_UUID)
+    redis_server.connected = False
+
+    versions.bump_room(ROOM_UUID)
+
+    # The backend is back, but bypassed: the room keeps its old version in Redis
+    redis_server.connected = True
+    assert versions.room_version(ROOM_UUID) is None
+
+    clock.now += 30
+    assert versions.room_version(ROOM_UUID) > version
+
+
+def test_too_many_failed_bumps_disable_versions_for_their_ttl(redis_server):
+    clock = Clock()
+    cache = FailSafeCache(RedisCacheBackend(), retry_after=30, clock=clock)
+    versions = VersionTracker(cache, ttl=600, max_pending=2, clock=clock)
+    redis_server.connected = False
+
+    versions.bump_message(ROOM_UUID, str(uuid.uuid4()))
+    versions.bump_message(ROOM_UUID, str(uuid.uuid4()))
+
+    redis_server.connected = True
+    clock.now += 30
+    assert versions.room_version(ROOM_UUID) is None
+
+    clock.now += 570
+    assert versions.room_version(ROOM_UUID) is not None
@@ -0,0 +1,82 @@
+# Copyright 2024 Community Contributors
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import threading
+import uuid
+
+from wazo_chatd_reactions.coalesce import ReactionCoalescer
+from wazo_chatd_reactions.rooms import RoomAccess
+
+TENANT_UUID = str(uuid.uuid4())
+ROOM = RoomAccess(str(uuid.uuid4()), TENANT_UUID, [])
+MESSAGE_UUID = str(uuid.uuid4())
+ALICE = str(uuid.uuid4())
+BOB = str(uuid.uuid4())
+
+
+class Flush:
+    def __init__(self):
+        self.calls = []
+        self.called = threading.Event()
+
+    def __call__(self, room, message_uuid, changes, since):
+        self.calls.append((room, message_uuid, changes))
+        self.called.set()
+
+
+def test_changes_of_a_message_are_flushed_once_as_net_deltas():
+    flush = Flush()
+    coalescer = ReactionCoalescer(flush, window_ms=50)
+    coalescer.start()
+
+    coalescer.reaction_added(ROOM, MESSAGE_UUID, ALICE, '👍')
+    coalescer.reaction_added(ROOM, MESSAGE_UUID, BOB, '👍')
+    coalescer.reaction_added(ROOM, MESSAGE_UUID, ALICE, '🎉')
+    coalescer.reaction_removed(ROOM, MESSAGE_UUID, ALICE, '🎉')
+    coalescer.reaction_removed(ROOM, MESSAGE_UUID, BOB, '❤️')
+
+    assert flush.called.wait(5)
+    coalescer.stop()
+    coalescer.join(5)
+
+    assert flush.calls == [(
+        ROOM,
+        MESSAGE_UUID,
+        [
+            {'emoji': '❤️', 'delta': -1, 'added_user_uuids': [], 'removed_user_uuids': [BOB]},
+            {
+                'emoji': '👍',
+                'delta': 2,
+                'added_user_uuids': sorted([ALICE, BOB]),
+                'removed_user_uuids': [],
+            },
+        ],
+    )]
+    assert coalescer.stats()['changes'] == 5
+    assert coalescer.stats()['flushed'] == 1
+
+
+def test_pending_changes_are_flushed_on_stop():
+    flush = Flush()
+    coalescer = ReactionCoalescer(flush, window_ms=60000)
+    coalescer.start()
+
+    coalescer.reaction_added(ROOM, MESSAGE_UUID, ALICE, '👍')
+    coalescer.stop()
+    coalescer.join(5)
+
+    assert [message_uuid for _, message_uuid, _ in flush.calls] == [MESSAGE_UUID]
+    assert coalescer.reaction_added(ROOM, MESSAGE_UUID, BOB, '👍') is False
+
+
+def test_changes_that_cancel_out_are_not_flushed():
+    flush = Flush()
+    coalescer = ReactionCoalescer(flush, window_ms=60000)
+    coalescer.start()
+
+    coalescer.reaction_added(ROOM, MESSAGE_UUID, ALICE, '👍')
+    coalescer.reaction_removed(ROOM, MESSAGE_UUID, ALICE, '👍')
+    coalescer.stop()
+    coalescer.join(5)
+
+    assert flush.calls == []
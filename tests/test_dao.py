@@ -0,0 +1,125 @@
+# Copyright 2024 Community Contributors
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import threading
+import time
+import uuid
+
+from sqlalchemy import text
+
+from wazo_chatd_reactions.dao import ReactionDAO
+
+from .fixtures import insert_messages
+
+USER_UUID = str(uuid.uuid4())
+
+
+def _changes(db, room_uuid):
+    with db.connect() as connection:
+        return connection.execute(
+            text("""
+                SELECT kind, CAST(message_uuid AS text), emoji
+                FROM chatd_room_message_change
+                WHERE room_uuid = :room_uuid
+                ORDER BY id
+            """),
+            {'room_uuid': room_uuid},
+        ).fetchall()
+
+
+def _counts(db, message_uuid):
+    with db.connect() as connection:
+        return dict(connection.execute(
+            text("""
+                SELECT emoji, count
+                FROM chatd_room_message_reaction_summary
+                WHERE message_uuid = :message_uuid
+            """),
+            {'message_uuid': message_uuid},
+        ).fetchall())
+
+
+def test_toggle_adds_then_removes(db, room):
+    with db.begin() as connection:
+        [message_uuid] = insert_messages(connection, room, 1)
+    dao = ReactionDAO()
+
+    added, reaction = dao.toggle(room, message_uuid, USER_UUID, '👍')
+
+    assert added is True
+    assert (str(reaction.message_uuid), str(reaction.user_uuid), reaction.emoji) == (
+        message_uuid, USER_UUID, '👍'
+    )
+    assert dao.get(room, message_uuid, USER_UUID, '👍') == reaction
+    assert _counts(db, message_uuid) == {'👍': 1}
+
+    added, reaction = dao.toggle(room, message_uuid, USER_UUID, '👍')
+
+    assert added is False
+    assert reaction.emoji == '👍'
+    assert dao.get(room, message_uuid, USER_UUID, '👍') is None
+    assert _counts(db, message_uuid) == {'👍': 0}
+    assert _changes(db, room) == [
+        ('reaction_created', message_uuid, '👍'),
+        ('reaction_deleted', message_uuid, '👍'),
+    ]
+
+
+def test_bulk_update_adds_and_removes(db, room):
+    with db.begin() as connection:
+        first, second = insert_messages(connection, room, 2)
+    dao = ReactionDAO()
+    dao.create(room, second, USER_UUID, '🎉')
+
+    created, deleted = dao.bulk_update(
+        room, USER_UUID, [(first, '👍'), (first, '❤️')], [(second, '🎉')]
+    )
+
+    assert sorted((str(r.message_uuid), r.emoji) for r in created) == sorted(
+        [(first, '👍'), (first, '❤️')]
+    )
+    assert [(str(r.message_uuid), r.emoji) for r in deleted] == [(second, '🎉')]
+    assert _counts(db, first) == {'👍': 1, '❤️': 1}
+    assert _counts(db, second) == {'🎉': 0}
+
+    created, deleted = dao.bulk_update(room, USER_UUID, [], [(first, '👍'), (second, '🎉')])
+
+    assert created == []
+    assert [(str(r.message_uuid), r.emoji) for r in deleted] == [(first, '👍')]
+    assert _counts(db, first) == {'👍': 0, '❤️': 1}
+    assert sorted(_changes(db, room)) == sorted([
+        ('reaction_created', second, '🎉'),
+        ('reaction_created', first, '👍'),
+        ('reaction_created', first, '❤️'),
+        ('reaction_deleted', second, '🎉'),
+        ('reaction_deleted', first, '👍'),
+    ])
+
+
+def test_toggle_retries_after_a_concurrent_toggle(db, room):
+    with db.begin() as connection:
+        [message_uuid] = insert_messages(connection, room, 1)
+    results = []
+
+    # A concurrent toggle inserts the reaction while this one waits on it
+    with db.begin() as connection:
+        connection.execute(
+            text("""
+                INSERT INTO chatd_room_message_reaction (room_uuid, message_uuid, user_uuid, emoji)
+                VALUES (:room_uuid, :message_uuid, :user_uuid, '👍')
+            """),
+            {'room_uuid': room, 'message_uuid': message_uuid, 'user_uuid': USER_UUID},
+        )
+        thread = threading.Thread(
+            target=lambda: results.append(
+                ReactionDAO().toggle(room, message_uuid, USER_UUID, '👍')
+            )
+        )
+        thread.start()
+        time.sleep(0.5)
+    thread.join()
+
+    [(added, reaction)] = results
+    assert added is False
+    assert reaction.emoji == '👍'
+    assert ReactionDAO().get(room, message_uuid, USER_UUID, '👍') is None
@@ -0,0 +1,89 @@
+# Copyright 2024 Community Contributors
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import threading
+import time
+
+import pytest
+
+from wazo_chatd_reactions.dispatch import (
+    OVERFLOW_DROP_NEWEST,
+    OVERFLOW_DROP_OLDEST,
+    OVERFLOW_INLINE,
+    NotificationDispatcher,
+)
+
+
+def test_queued_jobs_are_drained_on_stop():
+    done = []
+    dispatcher = NotificationDispatcher(workers=1, drain_timeout=5)
+    for i in range(100):
+        dispatcher.submit(done.append, i)
+
+    dispatcher.start()
+    dispatcher.stop()
+    dispatcher.join()
+
+    assert done == list(range(100))
+    assert dispatcher.stats()['completed'] == 100
+
+
+def test_drain_gives_up_after_the_timeout():
+    release = threading.Event()
+    dispatcher = NotificationDispatcher(max_size=1, workers=1, drain_timeout=0.2)
+    dispatcher.start()
+    dispatcher.submit(release.wait)
+    time.sleep(0.1)
+    dispatcher.submit(release.wait)
+
+    start = time.monotonic()
+    dispatcher.stop()
+    dispatcher.join()
+    elapsed = time.monotonic() - start
+
+    assert elapsed < 1
+    assert dispatcher.stats()['queue_size'] == 1
+    release.set()
+
+
+def test_jobs_submitted_while_stopping_run_inline():
+    done = []
+    dispatcher = NotificationDispatcher(workers=1)
+    dispatcher.start()
+    dispatcher.stop()
+    dispatcher.join()
+
+    dispatcher.submit(done.append, 'late')
+
+    assert done == ['late']
+    assert dispatcher.stats()['inline'] == 1
+
+
+@pytest.mark.parametrize('overflow, expected', [
+    (OVERFLOW_INLINE, ['second', 'first']),
+    (OVERFLOW_DROP_NEWEST, ['first']),
+    (OVERFLOW_DROP_OLDEST, ['second']),
+])
+def test_overflow_policies(overflow, expected):
+    done = []
+    dispatcher = NotificationDispatcher(max_size=1, workers=1, overflow=overflow)
+
+    # Not started: the queue stays full
+    dispatcher.submit(done.append, 'first')
+    dispatcher.submit(done.append, 'second')
+    dispatcher.start()
+    dispatcher.stop()
+    dispatcher.join()
+
+    assert done == expected
+
+
+def test_failed_jobs_are_counted():
+    dispatcher = NotificationDispatcher(workers=1)
+    dispatcher.start()
+    dispatcher.submit(lambda: 1 / 0)
+    dispatcher.stop()
+    dispatcher.join()
+
+    assert dispatcher.stats()['failed'] == 1
+    assert dispatcher.stats()['completed'] == 0
@@ -0,0 +1,66 @@
+# Copyright 2024 Community Contributors
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import io
+import uuid
+
+from sqlalchemy import text
+
+from wazo_chatd_reactions.importer import import_reactions, import_replies
+
+from .fixtures import insert_messages
+
+
+def _csv(*lines):
+    return io.BytesIO('\n'.join(lines).encode() + b'\n')
+
+
+def test_import_reactions_rejects_invalid_emojis_and_logs_the_changes(db, room):
+    with db.begin() as connection:
+        first, second = insert_messages(connection, room, 2)
+    user_uuid = str(uuid.uuid4())
+    file = _csv(
+        'message_uuid,user_uuid,emoji,created_at',
+        f'{first},{user_uuid},👍,2024-01-01T00:00:00Z',
+        f'{second},{user_uuid},{"x" * 11},2024-01-01T00:00:00Z',
+        f'{second},{user_uuid},,2024-01-01T00:00:00Z',
+        f'{uuid.uuid4()},{user_uuid},🎉,2024-01-01T00:00:00Z',
+    )
+
+    with db.begin() as connection:
+        result = import_reactions(connection, file)
+
+    assert (result.read, result.inserted, result.rejected, result.skipped) == (4, 1, 2, 1)
+    assert result.rooms == {room: [first]}
+    with db.begin() as connection:
+        changes = connection.execute(text(
+            'SELECT kind, message_uuid, emoji FROM chatd_room_message_change'
+        )).fetchall()
+        counts = connection.execute(text(
+            'SELECT room_uuid, message_uuid, count FROM chatd_room_message_reaction_summary'
+        )).fetchall()
+    assert [(kind, str(message_uuid), emoji) for kind, message_uuid, emoji in changes] == [
+        ('reaction_created', first, '👍')
+    ]
+    assert [(str(room_uuid), str(message_uuid), count) for room_uuid, message_uuid, count in counts] == [
+        (room, first, 1)
+    ]
+
+
+def test_import_replies_logs_the_changes(db, room):
+    with db.begin() as connection:
+        parent, child = insert_messages(connection, room, 2)
+    file = _csv(f'{child},{parent}', f'{uuid.uuid4()},{parent}')
+
+    with db.begin() as connection:
+        result = import_replies(connection, file, header=False)
+
+    assert (result.read, result.inserted, result.skipped) == (2, 1, 1)
+    assert result.rooms == {room: []}
+    with db.begin() as connection:
+        changes = connection.execute(text(
+            'SELECT kind, message_uuid, parent_message_uuid FROM chatd_room_message_change'
+        )).fetchall()
+    assert [(kind, str(child_uuid), str(parent_uuid)) for kind, child_uuid, parent_uuid in changes] == [
+        ('reply_created', child, parent)
+    ]
@@ -0,0 +1,67 @@
+# Copyright 2024 Community Contributors
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import uuid
+from datetime import datetime, timezone
+
+from wazo_chatd_reactions.dao import ReactionResult
+from wazo_chatd_reactions.notifier import FANOUT_ROOM, ReactionNotifier
+from wazo_chatd_reactions.rooms import RoomAccess
+
+TENANT_UUID = str(uuid.uuid4())
+ALICE = str(uuid.uuid4())
+BOB = str(uuid.uuid4())
+ROOM = RoomAccess(str(uuid.uuid4()), TENANT_UUID, [ALICE, BOB])
+MESSAGE_UUID = str(uuid.uuid4())
+
+
+class Publisher:
+    def __init__(self):
+        self.events = []
+
+    def publish(self, event):
+        self.events.append(event)
+
+
+class Dispatcher:
+    def __init__(self):
+        self.jobs = []
+
+    def submit(self, func, *args, **kwargs):
+        self.jobs.append((func, args, kwargs))
+
+
+def test_bulk_changes_publish_reaction_created_and_deleted_events():
+    publisher = Publisher()
+    dispatcher = Dispatcher()
+    notifier = ReactionNotifier(publisher, fanout=FANOUT_ROOM, dispatcher=dispatcher)
+    created = [ReactionResult(MESSAGE_UUID, ALICE, '👍', datetime.now(timezone.utc))]
+    deleted = [ReactionResult(MESSAGE_UUID, BOB, '🎉', None)]
+
+    notifier.reactions_bulk_changed(ROOM, created, deleted)
+
+    assert len(dispatcher.jobs) == 1
+    func, args, kwargs = dispatcher.jobs[0]
+    func(*args, **kwargs)
+    assert [event.name for event in publisher.events] == [
+        'chatd_user_room_message_reaction_created',
+        'chatd_user_room_message_reaction_deleted',
+    ]
+    assert [event.content['user_uuid'] for event in publisher.events] == [ALICE, BOB]
+    assert [event.content['emoji'] for event in publisher.events] == ['👍', '🎉']
+
+
+def test_bulk_changes_are_coalesced_when_enabled():
+    publisher = Publisher()
+    notifier = ReactionNotifier(publisher, fanout=FANOUT_ROOM, coalesce_window_ms=60000)
+    notifier.coalescer.start()
+    created = [ReactionResult(MESSAGE_UUID, ALICE, '👍', datetime.now(timezone.utc))]
+
+    notifier.reactions_bulk_changed(ROOM, created, [])
+    assert publisher.events == []
+
+    notifier.coalescer.stop()
+    notifier.coalescer.join(5)
+    assert [event.name for event in publisher.events] == [
+        'chatd_user_room_message_reactions_changed'
+    ]
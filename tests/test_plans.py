@@ -0,0 +1,56 @@
+# Copyright 2024 Community Contributors
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import pytest
+
+from wazo_chatd_reactions.partitioning import TABLES, partition_table
+from wazo_chatd_reactions.plans import check_plans
+
+from .fixtures import create_database, insert_dataset
+
+
+@pytest.fixture(scope='module')
+def fresh_db():
+    engine = create_database('chatd_reactions_plans_fresh')
+    yield engine
+    engine.dispose()
+
+
+def _failed(engine):
+    with engine.begin() as connection:
+        return {
+            check.name: problems
+            for check, problems in check_plans(connection)
+            if problems
+        }
+
+
+def _partition(engine):
+    with engine.begin() as connection:
+        for table in TABLES.values():
+            partition_table(connection, table, 4)
+
+
+def test_plans_on_fresh_schema(fresh_db):
+    assert _failed(fresh_db) == {}
+
+
+def test_plans_on_fresh_partitioned_schema():
+    engine = create_database('chatd_reactions_plans_fresh_partitioned')
+    _partition(engine)
+
+    assert _failed(engine) == {}
+    engine.dispose()
+
+
+def test_plans_with_rows_before_and_after_partitioning():
+    engine = create_database('chatd_reactions_plans_rows')
+    with engine.begin() as connection:
+        insert_dataset(connection, rooms=40, messages=200)
+
+    assert _failed(engine) == {}
+
+    _partition(engine)
+
+    assert _failed(engine) == {}
+    engine.dispose()
@@ -0,0 +1,39 @@
+# Copyright 2024 Community Contributors
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import uuid
+
+from wazo_chatd_reactions.reply_dao import ReplyDAO
+
+from .fixtures import insert_messages, insert_room
+
+USER_UUID = str(uuid.uuid4())
+OTHER_USER_UUID = str(uuid.uuid4())
+
+
+def _reply(dao, room_uuid, child_uuid, parent_uuid):
+    dao.create(child_uuid, parent_uuid, room_uuid, None, None, None, None)
+
+
+def test_get_thread_summaries_groups_the_replies_of_each_parent(db, room):
+    with db.begin() as connection:
+        first, second, quiet = insert_messages(connection, room, 3)
+        replies = insert_messages(connection, room, 2, user_uuid=USER_UUID)
+        replies += insert_messages(connection, room, 1, user_uuid=OTHER_USER_UUID)
+        other_room = insert_room(connection)
+        other_reply, = insert_messages(connection, other_room, 1)
+    dao = ReplyDAO()
+    _reply(dao, room, replies[0], first)
+    _reply(dao, room, replies[1], first)
+    _reply(dao, room, replies[2], first)
+    _reply(dao, other_room, other_reply, second)
+
+    summaries = dao.get_thread_summaries(room, [first, second, quiet])
+
+    assert len(summaries) == 1
+    summary = summaries[0]
+    assert str(summary.parent_message_uuid) == first
+    assert summary.reply_count == 3
+    assert summary.last_reply_at is not None
+    assert sorted(summary.participant_uuids) == sorted([USER_UUID, OTHER_USER_UUID])
+    assert dao.get_thread_summaries(room, []) == []
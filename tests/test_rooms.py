@@ -0,0 +1,125 @@
+# Copyright 2024 Community Contributors
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import uuid
+from unittest.mock import Mock
+
+import pytest
+
+from wazo_chatd_reactions.exceptions import MessageNotFoundException, RoomNotFoundException
+from wazo_chatd_reactions.message_dao import MessageDAO
+from wazo_chatd_reactions.rooms import (
+    RoomAccess,
+    RoomAccessCache,
+    get_message,
+    get_message_window,
+    get_room,
+    verify_user_in_room,
+)
+
+from .fixtures import TENANT_UUID, insert_messages, insert_room
+
+USER_UUID = str(uuid.uuid4())
+
+
+def _chatd_dao(room_uuid, user_uuids):
+    chatd_dao = Mock()
+    chatd_dao.room.get.return_value = Mock(
+        uuid=uuid.UUID(room_uuid),
+        tenant_uuid=uuid.UUID(TENANT_UUID),
+        users=[Mock(uuid=uuid.UUID(user_uuid)) for user_uuid in user_uuids],
+    )
+    return chatd_dao
+
+
+def test_room_access_is_cached_with_its_members():
+    room_uuid = str(uuid.uuid4())
+    chatd_dao = _chatd_dao(room_uuid, [USER_UUID])
+    room_cache = RoomAccessCache(chatd_dao)
+
+    room = room_cache.get(TENANT_UUID, room_uuid)
+
+    assert (room.uuid, room.tenant_uuid, room.user_uuids) == (
+        room_uuid, TENANT_UUID, frozenset([USER_UUID])
+    )
+    assert room_cache.get(TENANT_UUID, room_uuid) is room
+    chatd_dao.room.get.assert_called_once_with([TENANT_UUID], room_uuid)
+    assert room_cache.stats()['hits'] == 1
+
+
+def test_room_access_is_reloaded_after_a_membership_event():
+    room_uuid = str(uuid.uuid4())
+    other_user_uuid = str(uuid.uuid4())
+    chatd_dao = _chatd_dao(room_uuid, [USER_UUID])
+    room_cache = RoomAccessCache(chatd_dao)
+    room_cache.get(TENANT_UUID, room_uuid)
+    chatd_dao.room.get.return_value = _chatd_dao(
+        room_uuid, [USER_UUID, other_user_uuid]
+    ).room.get.return_value
+
+    room_cache.on_room_event({'uuid': room_uuid})
+
+    assert room_cache.get(TENANT_UUID, room_uuid).user_uuids == {USER_UUID, other_user_uuid}
+
+
+def test_missing_room_is_not_cached():
+    chatd_dao = Mock()
+    chatd_dao.room.get.return_value = None
+    room_cache = RoomAccessCache(chatd_dao)
+
+    assert room_cache.get(TENANT_UUID, str(uuid.uuid4())) is None
+    assert room_cache.stats()['size'] == 0
+
+
+def test_get_room_checks_the_tenant():
+    room = RoomAccess(str(uuid.uuid4()), TENANT_UUID, frozenset([USER_UUID]))
+    room_cache = Mock()
+    room_cache.get.return_value = room
+
+    assert get_room(room_cache, TENANT_UUID, room.uuid) is room
+
+    room_cache.get.return_value = None
+    with pytest.raises(RoomNotFoundException):
+        get_room(room_cache, str(uuid.uuid4()), room.uuid)
+
+
+def test_verify_user_in_room():
+    room = RoomAccess(str(uuid.uuid4()), TENANT_UUID, frozenset([USER_UUID]))
+
+    verify_user_in_room(room, uuid.UUID(USER_UUID))
+    with pytest.raises(RoomNotFoundException):
+        verify_user_in_room(room, uuid.uuid4())
+
+
+def test_get_message_only_in_its_room(db, room):
+    with db.begin() as connection:
+        [message_uuid] = insert_messages(connection, room, 1)
+        other_room = insert_room(connection)
+
+    message = get_message(MessageDAO(), RoomAccess(room, TENANT_UUID, []), message_uuid)
+
+    assert str(message.uuid) == message_uuid
+    with pytest.raises(MessageNotFoundException):
+        get_message(MessageDAO(), RoomAccess(other_room, TENANT_UUID, []), message_uuid)
+
+
+def test_message_window_pages(db, room):
+    with db.begin() as connection:
+        messages = insert_messages(connection, room, 5)
+    room = RoomAccess(room, TENANT_UUID, [])
+    dao = MessageDAO()
+
+    page, cursor = get_message_window(dao, room, None, None, 2)
+    assert [str(uuid) for uuid in page] == [messages[4], messages[3]]
+    assert cursor == messages[3]
+
+    page, cursor = get_message_window(dao, room, cursor, None, 2)
+    assert [str(uuid) for uuid in page] == [messages[2], messages[1]]
+
+    page, cursor = get_message_window(dao, room, cursor, None, 2)
+    assert [str(uuid) for uuid in page] == [messages[0]]
+    assert cursor is None
+
+    page, cursor = get_message_window(dao, room, None, messages[2], None)
+    assert [str(uuid) for uuid in page] == messages[3:]
+    assert cursor is None
@@ -0,0 +1,36 @@
+# Copyright 2024 Community Contributors
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from sqlalchemy import text
+
+from wazo_chatd_reactions.schema import migrate
+
+from .fixtures import create_database
+
+
+def test_interrupted_concurrent_index_build_is_rebuilt():
+    engine = create_database('chatd_reactions_schema_rerun', target=5)
+    # What a CREATE INDEX CONCURRENTLY interrupted by migration 0006 leaves
+    with engine.begin() as connection:
+        connection.execute(text(
+            'CREATE INDEX idx_chatd_reaction_room_message '
+            'ON chatd_room_message_reaction(room_uuid)'
+        ))
+        connection.execute(text("""
+            UPDATE pg_index SET indisvalid = false
+            WHERE indexrelid = CAST('idx_chatd_reaction_room_message' AS regclass)
+        """))
+
+    try:
+        migrate(engine)
+
+        with engine.begin() as connection:
+            valid, definition = connection.execute(text("""
+                SELECT i.indisvalid, pg_get_indexdef(i.indexrelid)
+                FROM pg_index i
+                WHERE i.indexrelid = CAST('idx_chatd_reaction_room_message' AS regclass)
+            """)).one()
+        assert valid
+        assert 'INCLUDE (user_uuid, emoji)' in definition
+    finally:
+        engine.dispose()
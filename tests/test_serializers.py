@@ -0,0 +1,155 @@
+# Copyright 2024 Community Contributors
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""The hand-written serializers give the same output as dumping with the schemas."""
+
+import json
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from wazo_chatd_reactions import schemas, serializers
+
+USER_UUID = uuid.UUID('8040ec9d-1a61-4ca3-abe5-ad7c2f192e03')
+CREATED_AT = datetime(2024, 1, 15, 10, 30, 0, 123456, tzinfo=timezone.utc)
+
+
+def _summary(emoji, user_uuids, reacted_by_me=False, created_at=CREATED_AT):
+    return {
+        'emoji': emoji,
+        'count': len(user_uuids),
+        'user_uuids': user_uuids,
+        'reacted_by_me': reacted_by_me,
+        'details': [
+            {'user_uuid': user_uuid, 'created_at': created_at} for user_uuid in user_uuids
+        ],
+    }
+
+
+SUMMARIES = [
+    [],
+    [_summary('👍', [str(USER_UUID)], reacted_by_me=True)],
+    [
+        # UUID objects and strings, as read from the database or the cache
+        _summary('❤️', [USER_UUID, str(uuid.uuid4())]),
+        # Naive and other time zone datetimes
+        _summary('🎉', [str(uuid.uuid4())], created_at=datetime(2024, 1, 15, 10, 30)),
+        _summary(
+            '😂', [str(uuid.uuid4())],
+            created_at=datetime(2024, 1, 15, 10, 30, tzinfo=timezone(timedelta(hours=-5))),
+        ),
+    ],
+    # None values
+    [_summary('🚀', [None], reacted_by_me=None, created_at=None)],
+    # Without reacted_by_me, as shared by the room members in the response cache
+    [{key: value for key, value in _summary('👍', [str(USER_UUID)]).items()
+      if key != 'reacted_by_me'}],
+]
+
+COUNTS = [
+    [],
+    [{'emoji': '👍', 'count': 3, 'reacted_by_me': True}],
+    [
+        {'emoji': '❤️', 'count': 1, 'reacted_by_me': False},
+        {'emoji': '🎉', 'count': None, 'reacted_by_me': None},
+        {'emoji': '🚀', 'count': 2},
+    ],
+]
+
+
+def _room(reactions, **fields):
+    return dict(
+        {
+            'room_uuid': uuid.uuid4(),
+            'reactions': {
+                str(uuid.uuid4()): value for value in reactions
+            },
+        },
+        **fields,
+    )
+
+
+@pytest.mark.parametrize('summaries', SUMMARIES)
+def test_reaction_summaries(summaries):
+    assert serializers.dump_reaction_summaries(summaries) == (
+        schemas.ReactionSummarySchema(many=True).dump(summaries)
+    )
+    result = {'message_uuid': uuid.uuid4(), 'reactions': summaries}
+    assert serializers.dump_message_reactions(result) == (
+        schemas.MessageReactionsSchema().dump(result)
+    )
+
+
+@pytest.mark.parametrize('counts', COUNTS)
+def test_reaction_counts(counts):
+    assert serializers.dump_reaction_counts(counts) == (
+        schemas.ReactionCountSchema(many=True).dump(counts)
+    )
+    result = {'message_uuid': str(uuid.uuid4()), 'reactions': counts}
+    assert serializers.dump_message_reaction_counts(result) == (
+        schemas.MessageReactionCountsSchema().dump(result)
+    )
+
+
+@pytest.mark.parametrize('fields', [{}, {'next_cursor': None}, {'next_cursor': uuid.uuid4()}])
+def test_room_reactions(fields):
+    result = _room(SUMMARIES, **fields)
+    assert serializers.dump_room_reactions(result) == (
+        schemas.RoomReactionsSchema().dump(result)
+    )
+
+    result = _room(COUNTS, **fields)
+    assert serializers.dump_room_reaction_counts(result) == (
+        schemas.RoomReactionCountsSchema().dump(result)
+    )
+
+
+def test_streamed_room_reactions():
+    result = _room(SUMMARIES)
+
+    streamed = ''.join(serializers.iter_json_object(
+        {'room_uuid': str(result['room_uuid'])},
+        'reactions',
+        result['reactions'].items(),
+        serializers.dump_reaction_summaries,
+        chunk_size=100,
+    ))
+
+    assert json.loads(streamed) == schemas.RoomReactionsSchema().dump(result)
+
+
+def test_streamed_room_replies():
+    room_uuid = uuid.uuid4()
+    replies = {}
+    for preview in (
+        None,
+        {'content': 'hello', 'author_uuid': USER_UUID, 'author_alias': 'Alice',
+         'created_at': CREATED_AT},
+        {'content': '', 'author_uuid': None, 'author_alias': None, 'created_at': None},
+    ):
+        child_message_uuid = uuid.uuid4()
+        replies[str(child_message_uuid)] = {
+            'child_message_uuid': child_message_uuid,
+            'parent_message_uuid': uuid.uuid4() if preview else None,
+            'room_uuid': room_uuid,
+            'parent_preview': preview,
+        }
+
+    streamed = ''.join(serializers.iter_json_object(
+        {'room_uuid': str(room_uuid)},
+        'replies',
+        replies.items(),
+        schemas.ReplyInfoSchema().dump,
+        chunk_size=100,
+    ))
+
+    assert json.loads(streamed) == schemas.RoomReplyMetadataSchema().dump(
+        {'room_uuid': room_uuid, 'replies': replies}
+    )
+
+
+def test_streamed_empty_object():
+    streamed = ''.join(serializers.iter_json_object({}, 'replies', [], dict))
+
+    assert json.loads(streamed) == {'replies': {}}
@@ -0,0 +1,64 @@
+# Copyright 2024 Community Contributors
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import uuid
+from datetime import datetime, timezone
+from unittest.mock import Mock
+
+from wazo_chatd_reactions.dao import ReactionResult
+from wazo_chatd_reactions.rooms import RoomAccess
+from wazo_chatd_reactions.services import ReactionService
+
+TENANT_UUID = str(uuid.uuid4())
+ROOM_UUID = str(uuid.uuid4())
+MESSAGE_UUID = str(uuid.uuid4())
+USER_UUID = str(uuid.uuid4())
+CREATED_AT = datetime(2024, 1, 15, 10, 30, tzinfo=timezone.utc)
+
+
+def _service(reaction_dao):
+    room_cache = Mock()
+    room_cache.get.return_value = RoomAccess(ROOM_UUID, TENANT_UUID, [USER_UUID])
+    return ReactionService(room_cache, reaction_dao, Mock(), Mock(), Mock())
+
+
+def test_toggle_reaction_notifies_the_change():
+    reaction = ReactionResult(MESSAGE_UUID, USER_UUID, '👍', CREATED_AT)
+    reaction_dao = Mock()
+    reaction_dao.toggle.return_value = (True, reaction)
+    service = _service(reaction_dao)
+
+    result = service.toggle_reaction(TENANT_UUID, ROOM_UUID, MESSAGE_UUID, USER_UUID, '👍')
+
+    assert result['reacted'] is True
+    assert result['created_at'] == CREATED_AT
+    service._versions.bump_message.assert_called_once_with(ROOM_UUID, MESSAGE_UUID)
+    service._notifier.reaction_created.assert_called_once()
+
+
+def test_toggle_reaction_without_change_returns_the_current_state():
+    reaction = ReactionResult(MESSAGE_UUID, USER_UUID, '👍', CREATED_AT)
+    reaction_dao = Mock()
+    reaction_dao.toggle.return_value = None
+    reaction_dao.get.return_value = reaction
+    service = _service(reaction_dao)
+
+    result = service.toggle_reaction(TENANT_UUID, ROOM_UUID, MESSAGE_UUID, USER_UUID, '👍')
+
+    assert result == {
+        'message_uuid': MESSAGE_UUID,
+        'user_uuid': USER_UUID,
+        'emoji': '👍',
+        'created_at': CREATED_AT,
+        'reacted': True,
+    }
+    service._versions.bump_message.assert_not_called()
+    service._notifier.reaction_created.assert_not_called()
+    service._notifier.reaction_deleted.assert_not_called()
+
+    reaction_dao.get.return_value = None
+
+    result = service.toggle_reaction(TENANT_UUID, ROOM_UUID, MESSAGE_UUID, USER_UUID, '👍')
+
+    assert result['reacted'] is False
+    assert result['created_at'] is None
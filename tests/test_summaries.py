@@ -0,0 +1,129 @@
+# Copyright 2024 Community Contributors
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Summaries aggregated in SQL match the previous grouping of reaction rows in Python."""
+
+import random
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from unittest.mock import Mock
+
+import pytest
+from sqlalchemy import text
+
+from wazo_chatd_reactions.dao import ReactionDAO
+from wazo_chatd_reactions.message_dao import MessageDAO
+from wazo_chatd_reactions.rooms import RoomAccess
+from wazo_chatd_reactions.services import ReactionService
+
+from .fixtures import TENANT_UUID, insert_messages
+
+EMOJIS = ['👍', '❤️', '🎉', '😂', '🚀']
+
+
+def _group(reactions, current_user_uuid):
+    """Group reaction rows by emoji, as the service did before summaries were aggregated in SQL."""
+    grouped = defaultdict(list)
+    for reaction in reactions:
+        grouped[reaction.emoji].append({
+            'user_uuid': str(reaction.user_uuid),
+            'created_at': reaction.created_at,
+        })
+    result = []
+    for emoji, details in grouped.items():
+        user_uuids = [d['user_uuid'] for d in details]
+        result.append({
+            'emoji': emoji,
+            'count': len(details),
+            'user_uuids': user_uuids,
+            'reacted_by_me': str(current_user_uuid) in user_uuids,
+            'details': details,
+        })
+    return result
+
+
+def _group_by_message(reactions, current_user_uuid):
+    by_message = defaultdict(list)
+    for reaction in reactions:
+        by_message[str(reaction.message_uuid)].append(reaction)
+    return {
+        message_uuid: _group(message_reactions, current_user_uuid)
+        for message_uuid, message_reactions in by_message.items()
+    }
+
+
+@pytest.fixture
+def reactions(db, room):
+    """Random reactions of a few users on the messages of a room, at distinct times."""
+    rng = random.Random(4)
+    users = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(6)]
+    with db.begin() as connection:
+        messages = insert_messages(connection, room, 20)
+        rows = [
+            (message_uuid, user_uuid, emoji)
+            for message_uuid in messages[:15]
+            for user_uuid in users
+            for emoji in rng.sample(EMOJIS, rng.randint(0, 3))
+        ]
+        start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        seconds = rng.sample(range(100000), len(rows))
+        connection.execute(
+            text("""
+                INSERT INTO chatd_room_message_reaction
+                    (room_uuid, message_uuid, user_uuid, emoji, created_at)
+                VALUES (:room_uuid, :message_uuid, :user_uuid, :emoji, :created_at)
+            """),
+            [
+                {
+                    'room_uuid': room,
+                    'message_uuid': message_uuid,
+                    'user_uuid': user_uuid,
+                    'emoji': emoji,
+                    'created_at': start + timedelta(seconds=second),
+                }
+                for (message_uuid, user_uuid, emoji), second in zip(rows, seconds)
+            ],
+        )
+    return messages, users
+
+
+def _service(room):
+    room_cache = Mock()
+    room_cache.get.return_value = RoomAccess(room, TENANT_UUID, [])
+    return ReactionService(room_cache, ReactionDAO(), MessageDAO(), Mock(), Mock())
+
+
+def test_message_summaries_match_grouped_rows(room, reactions):
+    messages, users = reactions
+    service = _service(room)
+    dao = ReactionDAO()
+
+    for message_uuid in messages:
+        for current_user_uuid in users[:2] + [str(uuid.uuid4())]:
+            result = service.get_reactions(TENANT_UUID, room, message_uuid, current_user_uuid)
+
+            assert result['reactions'] == _group(
+                dao.get_by_message(room, message_uuid), current_user_uuid
+            )
+
+
+def test_room_summaries_match_grouped_rows(room, reactions):
+    messages, users = reactions
+    service = _service(room)
+    rows = ReactionDAO().get_all_for_room(room)
+
+    for current_user_uuid in users[:2] + [str(uuid.uuid4())]:
+        expected = _group_by_message(rows, current_user_uuid)
+
+        result = service.get_room_reactions(TENANT_UUID, room, current_user_uuid)
+        assert result['reactions'] == expected
+        assert list(result['reactions']) == list(expected)
+
+        streamed = service.iter_room_reactions(TENANT_UUID, room, current_user_uuid)
+        assert list(streamed) == list(expected.items())
+
+        window = service.get_room_reactions(
+            TENANT_UUID, room, current_user_uuid, limit=len(messages)
+        )
+        assert window['reactions'] == expected
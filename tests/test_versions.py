@@ -0,0 +1,56 @@
+# Copyright 2024 Community Contributors
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import uuid
+
+from wazo_chatd_reactions.cache_backends import FailSafeCache, MemoryCacheBackend
+from wazo_chatd_reactions.versions import VersionTracker
+
+ROOM_UUID = str(uuid.uuid4())
+MESSAGE_UUID = str(uuid.uuid4())
+
+
+def _tracker(single_process=True):
+    return VersionTracker(FailSafeCache(MemoryCacheBackend(single_process=single_process)))
+
+
+def _message_event(message_uuid, room_uuid=ROOM_UUID):
+    return {'uuid': message_uuid, 'content': 'hello', 'room': {'uuid': room_uuid}}
+
+
+def test_writes_change_versions():
+    tracker = _tracker()
+    room_version = tracker.room_version(ROOM_UUID)
+    message_version = tracker.message_version(ROOM_UUID, MESSAGE_UUID)
+
+    tracker.bump_message(ROOM_UUID, MESSAGE_UUID)
+
+    assert tracker.room_version(ROOM_UUID) > room_version
+    assert tracker.message_version(ROOM_UUID, MESSAGE_UUID) > message_version
+
+
+def test_message_posted_bumps_its_room_once():
+    tracker = _tracker()
+    tracker.bump_room(ROOM_UUID)
+    version = tracker.room_version(ROOM_UUID)
+
+    # One event per room member
+    for _ in range(3):
+        tracker.on_message_event(_message_event(MESSAGE_UUID))
+
+    bumped = tracker.room_version(ROOM_UUID)
+    assert bumped == version + 1
+
+    tracker.on_message_event(_message_event(str(uuid.uuid4())))
+
+    assert tracker.room_version(ROOM_UUID) == bumped + 1
+
+
+def test_no_versions_with_a_backend_that_is_not_shared():
+    tracker = _tracker(single_process=False)
+
+    tracker.bump_message(ROOM_UUID, MESSAGE_UUID)
+    tracker.on_message_event(_message_event(MESSAGE_UUID))
+
+    assert tracker.room_version(ROOM_UUID) is None
+    assert tracker.message_version(ROOM_UUID, MESSAGE_UUID) is None
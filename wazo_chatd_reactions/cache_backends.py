@@ -0,0 +1,324 @@
+# Copyright 2024 Community Contributors
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Cache backends for the reaction and reply read paths.
+
+The memory backend keeps entries in the wazo-chatd process. It is only shared
+when a single wazo-chatd process serves the API, which must be declared with
+its `single_process` option. The Redis backend is shared by every wazo-chatd
+node behind a load balancer, so room versions and cached payloads are
+consistent across nodes. Versions, and thus ETags and cached payloads, are
+only used with a shared backend (see CacheBackend.shared).
+
+Backends store bytes. Any object implementing the CacheBackend methods (e.g. a
+test stand-in) can be passed to FailSafeCache.
+"""
+
+import logging
+import random
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+BACKEND_MEMORY = 'memory'
+BACKEND_REDIS = 'redis'
+BACKEND_NONE = 'none'
+
+# Nominal size of small entries (counters, versions) in the memory backend
+_SMALL_ENTRY_SIZE = 64
+
+
+class CacheBackend:
+    """Interface of cache backends.
+
+    Methods may raise any exception when the backend is unavailable;
+    FailSafeCache turns them into cache misses.
+    """
+
+    # True when every wazo-chatd process serving the API sees the same
+    # entries. Versions of a backend that is not shared could be stale on
+    # another process, so they are not used.
+    shared = False
+
+    def get_many(self, keys):
+        """Get values (bytes), with None for missing or expired keys."""
+        raise NotImplementedError()
+
+    def set(self, key, value, ttl):
+        """Set a value (bytes) expiring after ttl seconds."""
+        raise NotImplementedError()
+
+    def bump(self, counter_key, keys, ttl):
+        """Increment a shared counter and store its new value in each key.
+
+        The counter starts at a random value and keys are never lowered, so a
+        value is never handed out twice for a key, even with concurrent bumps.
+
+        Returns:
+            The new counter value
+        """
+        raise NotImplementedError()
+
+    def stats(self):
+        """Get backend-specific statistics."""
+        return {}
+
+
+class NullCacheBackend(CacheBackend):
+    """Backend that stores nothing: every read goes to the database.
+
+    bump() returns None, so versions are unknown and ETags are not sent.
+    """
+
+    def get_many(self, keys):
+        return [None] * len(keys)
+
+    def set(self, key, value, ttl):
+        pass
+
+    def bump(self, counter_key, keys, ttl):
+        return None
+
+
+class MemoryCacheBackend(CacheBackend):
+    """Per-process LRU cache, bounded by the total size of its values."""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, single_process=False, clock=time.monotonic):
+        """Initialize the backend.
+
+        Args:
+            max_bytes: Maximum total size of the values kept before evicting
+                the least recently used ones
+            single_process: Whether this process is the only one serving the
+                API (one node, one worker); the backend is not shared otherwise
+            clock: Monotonic clock, overridable for testing
+        """
+        self.shared = single_process
+        self._max_bytes = max_bytes
+        self._clock = clock
+        self._entries = OrderedDict()  # key -> (value, size, expires_at)
+        self._bytes = 0
+        self._counters = {}  # never evicted, see bump()
+        self._lock = threading.Lock()
+        self._evictions = 0
+
+    def get_many(self, keys):
+        with self._lock:
+            return [
+                str(self._counters[key]).encode() if key in self._counters else self._get(key)
+                for key in keys
+            ]
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._set(key, value, len(value), ttl)
+
+    def bump(self, counter_key, keys, ttl):
+        with self._lock:
+            value = self._counters.get(counter_key)
+            if value is None:
+                value = random.getrandbits(48)
+            value += 1
+            self._counters[counter_key] = value
+            # Evicted keys fall back to the counter, which is higher than
+            # any value they held
+            for key in keys:
+                current = self._get(key)
+                if current is None or int(current) < value:
+                    self._set(key, str(value).encode(), _SMALL_ENTRY_SIZE, ttl)
+            return value
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self._max_bytes,
+                'evictions': self._evictions,
+            }
+
+    def _get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, size, expires_at = entry
+        if expires_at <= self._clock():
+            del self._entries[key]
+            self._bytes -= size
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _set(self, key, value, size, ttl):
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= previous[1]
+        if size > self._max_bytes:
+            return
+        self._entries[key] = (value, size, self._clock() + ttl)
+        self._bytes += size
+        while self._bytes > self._max_bytes:
+            _, (_, evicted_size, _) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+            self._evictions += 1
+
+
+# Seeds the counter randomly if missing, increments it, and raises each key
+# to the new value (never lowering a key bumped concurrently)
+_BUMP_SCRIPT = """
+redis.call('SET', KEYS[1], ARGV[1], 'NX')
+local value = redis.call('INCR', KEYS[1])
+for i = 2, #KEYS do
+    local current = tonumber(redis.call('GET', KEYS[i]) or '0')
+    if current < value then
+        redis.call('SET', KEYS[i], value, 'EX', ARGV[2])
+    end
+end
+return value
+"""
+
+
+class RedisCacheBackend(CacheBackend):
+    """Cache shared by every wazo-chatd node, stored in Redis.
+
+    Requires the `redis` Python package.
+    """
+
+    shared = True
+
+    def __init__(self, url='redis://localhost:6379/0', key_prefix='wazo-chatd-reactions:',
+                 socket_timeout=0.2):
+        """Initialize the backend.
+
+        Args:
+            url: Redis URL
+            key_prefix: Prefix of every key, to share a Redis database
+            socket_timeout: Seconds before a Redis call fails, so that a slow
+                Redis falls back to the database instead of piling up requests
+        """
+        if redis is None:
+            raise RuntimeError('The redis cache backend requires the redis Python package')
+        self._client = redis.Redis.from_url(
+            url,
+            socket_timeout=socket_timeout,
+            socket_connect_timeout=socket_timeout,
+        )
+        self._key_prefix = key_prefix
+        self._bump_script = self._client.register_script(_BUMP_SCRIPT)
+
+    def get_many(self, keys):
+        if not keys:
+            return []
+        return self._client.mget([self._key_prefix + key for key in keys])
+
+    def set(self, key, value, ttl):
+        self._client.set(self._key_prefix + key, value, ex=ttl)
+
+    def bump(self, counter_key, keys, ttl):
+        return int(self._bump_script(
+            keys=[self._key_prefix + key for key in [counter_key, *keys]],
+            args=[random.getrandbits(48), ttl],
+        ))
+
+
+class FailSafeCache:
+    """Wrap a backend so that failures are cache misses, never request errors.
+
+    After a failure the backend is bypassed for `retry_after` seconds, so an
+    unreachable backend does not add a timeout to every request.
+    """
+
+    def __init__(self, backend, retry_after=30, clock=time.monotonic):
+        self._backend = backend
+        self._retry_after = retry_after
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._down_until = 0
+        self._hits = 0
+        self._misses = 0
+        self._errors = 0
+
+    @property
+    def shared(self):
+        """Whether the wrapped backend is shared (see CacheBackend.shared)."""
+        return getattr(self._backend, 'shared', False)
+
+    def get(self, key):
+        """Get a value (bytes), or None if missing or if the backend failed."""
+        return self.get_many([key])[0]
+
+    def get_many(self, keys):
+        """Get values (bytes), with None for missing keys or if the backend failed."""
+        values = self._call('get_many', keys)
+        if values is None:
+            values = [None] * len(keys)
+        with self._lock:
+            hits = sum(1 for value in values if value is not None)
+            self._hits += hits
+            self._misses += len(values) - hits
+        return values
+
+    def set(self, key, value, ttl):
+        """Set a value (bytes); failures are only logged."""
+        self._call('set', key, value, ttl)
+
+    def bump(self, counter_key, keys, ttl):
+        """Bump versions (see CacheBackend.bump); returns None if the backend failed."""
+        return self._call('bump', counter_key, keys, ttl)
+
+    def stats(self):
+        """Get hit/miss/error counters and backend statistics."""
+        with self._lock:
+            stats = {
+                'backend': type(self._backend).__name__,
+                'shared': self.shared,
+                'available': self._clock() >= self._down_until,
+                'hits': self._hits,
+                'misses': self._misses,
+                'errors': self._errors,
+            }
+        try:
+            stats.update(self._backend.stats())
+        except Exception:
+            logger.debug('Could not get cache backend stats', exc_info=True)
+        return stats
+
+    def _call(self, method, *args):
+        if self._clock() < self._down_until:
+            return None
+        try:
+            return getattr(self._backend, method)(*args)
+        except Exception as e:
+            with self._lock:
+                self._errors += 1
+                self._down_until = self._clock() + self._retry_after
+            logger.warning(
+                'Cache backend error, bypassing it for %ss: %s', self._retry_after, e
+            )
+            return None
+
+
+def create_backend(backend=BACKEND_MEMORY, **options):
+    """Create a cache backend.
+
+    Args:
+        backend: BACKEND_MEMORY, BACKEND_REDIS or BACKEND_NONE
+        options: Backend options, keyed by backend name (e.g. the `redis`
+            section of reactions.cache)
+    """
+    backend_options = options.get(backend) or {}
+    if backend == BACKEND_NONE:
+        return NullCacheBackend()
+    if backend == BACKEND_MEMORY:
+        return MemoryCacheBackend(**backend_options)
+    if backend == BACKEND_REDIS:
+        return RedisCacheBackend(**backend_options)
+    raise ValueError(f'Unknown cache backend: {backend}')
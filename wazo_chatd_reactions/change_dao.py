@@ -0,0 +1,111 @@
+# Copyright 2024 Community Contributors
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Data Access Object for the chatd_room_message_change log.
+
+Log entries are written by ReactionDAO and ReplyDAO, in the same statement as
+the change they record. This DAO reads them back for delta sync.
+"""
+
+import logging
+from collections import namedtuple
+
+from sqlalchemy import text
+
+# Import the scoped session directly from wazo-chatd
+from wazo_chatd.database.helpers import Session
+
+from .rows import map_rows
+
+logger = logging.getLogger(__name__)
+
+# Also run by the EXPLAIN checks of plans.py
+LIST_SINCE_SQL = """
+    WITH horizon AS (
+        SELECT CAST(CAST(pg_snapshot_xmin(pg_current_snapshot()) AS text) AS bigint) AS txid,
+               now() AS now
+    )
+    SELECT h.txid, h.now,
+           c.id, c.txid, c.kind, c.message_uuid, c.user_uuid, c.emoji,
+           c.parent_message_uuid, c.created_at
+    FROM horizon h
+    LEFT JOIN LATERAL (
+        SELECT id, txid, kind, message_uuid, user_uuid, emoji,
+               parent_message_uuid, created_at
+        FROM chatd_room_message_change
+        WHERE room_uuid = :room_uuid
+          AND (txid, id) > (:txid, :change_id)
+          AND txid < h.txid
+        ORDER BY txid, id
+        LIMIT :limit
+    ) c ON TRUE
+"""
+
+
+class ChangeLogDAO:
+    """DAO for reading the reaction and reply change log."""
+
+    def __init__(self):
+        pass
+
+    @property
+    def _session(self):
+        """Get the current session."""
+        return Session()
+
+    def list_since(self, room_uuid, txid, change_id, limit):
+        """List the changes of a room after a (txid, id) position.
+
+        Changes are ordered by (txid, id). Only changes of transactions older
+        than every transaction still running are listed: a change listed later
+        can then never sort before one listed now, even if the transactions
+        commit out of order.
+
+        Args:
+            room_uuid: The room UUID
+            txid: Transaction ID of the last change already seen
+            change_id: ID of the last change already seen
+            limit: Maximum number of changes to return
+
+        Returns:
+            Tuple (changes, horizon, now): list of ChangeResult, the oldest
+            running transaction ID (every change with a lower txid is listed
+            or already seen) and the database time
+        """
+        query = text(LIST_SINCE_SQL)
+        results = self._session.execute(
+            query,
+            {
+                'room_uuid': str(room_uuid),
+                'txid': txid,
+                'change_id': change_id,
+                'limit': limit,
+            }
+        ).fetchall()
+
+        horizon, now = results[0][0], results[0][1]
+        changes = map_rows(ChangeResult, (row[2:] for row in results if row[2] is not None))
+        return changes, horizon, now
+
+    def get_horizon(self):
+        """Get the oldest running transaction ID and the database time.
+
+        Returns:
+            Tuple (horizon, now)
+        """
+        query = text("""
+            SELECT CAST(CAST(pg_snapshot_xmin(pg_current_snapshot()) AS text) AS bigint),
+                   now()
+        """)
+        result = self._session.execute(query).fetchone()
+        return result[0], result[1]
+
+
+class ChangeResult(namedtuple('ChangeResult', [
+    'id', 'txid', 'kind', 'message_uuid', 'user_uuid', 'emoji',
+    'parent_message_uuid', 'created_at',
+])):
+    """Result row for change log entries."""
+
+    __slots__ = ()
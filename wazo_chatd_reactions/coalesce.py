@@ -0,0 +1,196 @@
+# Copyright 2024 Community Contributors
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Coalescing of reaction changes per message.
+
+During reaction storms on a message, individual created/deleted events are
+merged over a short window into a single delta per message, with the net
+count change and the added/removed users of each emoji.
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+
+class _PendingChanges:
+    """Reaction changes of one message, accumulated during a window."""
+
+    def __init__(self, room, deadline):
+        self.room = room
+        self.deadline = deadline
+        self.since = datetime.now(timezone.utc)
+        self.added = {}  # emoji -> set of user UUIDs
+        self.removed = {}  # emoji -> set of user UUIDs
+
+    def add(self, emoji, user_uuid):
+        removed = self.removed.get(emoji)
+        if removed and user_uuid in removed:
+            removed.discard(user_uuid)
+        else:
+            self.added.setdefault(emoji, set()).add(user_uuid)
+
+    def remove(self, emoji, user_uuid):
+        added = self.added.get(emoji)
+        if added and user_uuid in added:
+            added.discard(user_uuid)
+        else:
+            self.removed.setdefault(emoji, set()).add(user_uuid)
+
+    def to_changes(self):
+        """Get the net change of each emoji, leaving out emojis with no change."""
+        changes = []
+        for emoji in sorted(set(self.added) | set(self.removed)):
+            added = self.added.get(emoji, set())
+            removed = self.removed.get(emoji, set())
+            if not added and not removed:
+                continue
+            changes.append({
+                'emoji': emoji,
+                'delta': len(added) - len(removed),
+                'added_user_uuids': sorted(added),
+                'removed_user_uuids': sorted(removed),
+            })
+        return changes
+
+
+class ReactionCoalescer:
+    """Merge reaction changes per message and flush them after a window.
+
+    The window starts with the first change of a message, so an event is
+    delayed by at most `window_ms`, however long the storm lasts. Implements
+    start/stop/join so it can be handed to the wazo-chatd thread manager;
+    pending changes are flushed on stop.
+    """
+
+    def __init__(self, flush, window_ms=250, clock=time.monotonic):
+        """Initialize the coalescer.
+
+        Args:
+            flush: Called with (room, message_uuid, changes, since) for each
+                message with net changes at the end of its window
+            window_ms: Window length in milliseconds
+            clock: Monotonic time source, in seconds
+        """
+        self._flush = flush
+        self._window = window_ms / 1000
+        self._clock = clock
+        self._pending = {}  # (room_uuid, message_uuid) -> _PendingChanges
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopping = False
+        self._changes = 0
+        self._flushed = 0
+
+    def start(self):
+        """Start the flusher thread (no-op if already started)."""
+        with self._condition:
+            if self._thread:
+                return
+            self._thread = threading.Thread(
+                target=self._run, name='reactions-coalesce', daemon=True
+            )
+            self._thread.start()
+
+    def stop(self):
+        """Stop the flusher thread once pending changes are flushed."""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+
+    def join(self, timeout=None):
+        """Wait for the flusher thread to exit."""
+        if self._thread:
+            self._thread.join(timeout)
+
+    def reaction_added(self, room, message_uuid, user_uuid, emoji):
+        """Record an added reaction.
+
+        Returns:
+            False if the coalescer is stopped and the change was not recorded
+        """
+        return self._record(
+            room, message_uuid, lambda pending: pending.add(emoji, str(user_uuid))
+        )
+
+    def reaction_removed(self, room, message_uuid, user_uuid, emoji):
+        """Record a removed reaction.
+
+        Returns:
+            False if the coalescer is stopped and the change was not recorded
+        """
+        return self._record(
+            room, message_uuid, lambda pending: pending.remove(emoji, str(user_uuid))
+        )
+
+    def stats(self):
+        """Get the number of pending messages and of changes in and events out."""
+        with self._condition:
+            return {
+                'window_ms': int(self._window * 1000),
+                'pending_messages': len(self._pending),
+                'changes': self._changes,
+                'flushed': self._flushed,
+            }
+
+    def _record(self, room, message_uuid, apply):
+        key = (str(room.uuid), str(message_uuid))
+        with self._condition:
+            if self._stopping:
+                return False
+            self._changes += 1
+            pending = self._pending.get(key)
+            if pending is None:
+                pending = _PendingChanges(room, self._clock() + self._window)
+                self._pending[key] = pending
+                self._condition.notify()
+            else:
+                # Keep the latest room members for the fan-out
+                pending.room = room
+            apply(pending)
+        return True
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while True:
+                    stopping = self._stopping
+                    due = self._pop_due(None if stopping else self._clock())
+                    if due or stopping:
+                        break
+                    if self._pending:
+                        next_deadline = min(p.deadline for p in self._pending.values())
+                        self._condition.wait(max(next_deadline - self._clock(), 0))
+                    else:
+                        self._condition.wait()
+
+            for (_, message_uuid), pending in due:
+                self._emit(message_uuid, pending)
+            if stopping:
+                return
+
+    def _pop_due(self, now):
+        """Remove and return the pending changes whose window ended (all if now is None)."""
+        due = [
+            (key, pending) for key, pending in self._pending.items()
+            if now is None or pending.deadline <= now
+        ]
+        for key, _ in due:
+            del self._pending[key]
+        return due
+
+    def _emit(self, message_uuid, pending):
+        changes = pending.to_changes()
+        if not changes:
+            return
+        try:
+            self._flush(pending.room, message_uuid, changes, pending.since)
+        except Exception:
+            logger.exception('Error while flushing reaction changes of message %s', message_uuid)
+            return
+        with self._condition:
+            self._flushed += 1
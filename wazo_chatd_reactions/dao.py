@@ -8,6 +8,7 @@ This DAO provides database operations for the chatd_room_message_reaction table.
 """
 
 import logging
+from collections import namedtuple
 from datetime import datetime, timezone
 
 from sqlalchemy import text
@@ -16,8 +17,95 @@ from sqlalchemy.exc import IntegrityError
 # Import the scoped session directly from wazo-chatd
 from wazo_chatd.database.helpers import Session
 
+from .rows import STREAM_BATCH_SIZE, iter_rows, map_row, map_rows
+
 logger = logging.getLogger(__name__)
 
+# Read queries, also run by the EXPLAIN checks of plans.py
+
+GET_BY_MESSAGE_SQL = """
+    SELECT message_uuid, user_uuid, emoji, created_at
+    FROM chatd_room_message_reaction
+    WHERE room_uuid = :room_uuid
+      AND message_uuid = :message_uuid
+    ORDER BY created_at ASC
+"""
+
+GET_BY_ROOM_SQL = """
+    SELECT message_uuid, user_uuid, emoji, created_at
+    FROM chatd_room_message_reaction
+    WHERE room_uuid = :room_uuid
+      AND message_uuid = ANY(CAST(:message_uuids AS uuid[]))
+    ORDER BY message_uuid, created_at ASC
+"""
+
+GET_ALL_FOR_ROOM_SQL = """
+    SELECT message_uuid, user_uuid, emoji, created_at
+    FROM chatd_room_message_reaction
+    WHERE room_uuid = :room_uuid
+    ORDER BY message_uuid, created_at ASC
+"""
+
+GET_SUMMARIES_BY_MESSAGE_SQL = """
+    SELECT message_uuid, emoji, COUNT(*),
+           array_agg(CAST(user_uuid AS text) ORDER BY created_at ASC),
+           array_agg(created_at ORDER BY created_at ASC),
+           bool_or(user_uuid = :current_user_uuid),
+           MIN(created_at)
+    FROM chatd_room_message_reaction
+    WHERE room_uuid = :room_uuid
+      AND message_uuid = :message_uuid
+    GROUP BY message_uuid, emoji
+    ORDER BY MIN(created_at) ASC, emoji
+"""
+
+GET_SUMMARIES_FOR_ROOM_SQL = """
+    SELECT r.message_uuid, r.emoji, COUNT(*),
+           array_agg(CAST(r.user_uuid AS text) ORDER BY r.created_at ASC),
+           array_agg(r.created_at ORDER BY r.created_at ASC),
+           bool_or(r.user_uuid = :current_user_uuid),
+           MIN(r.created_at)
+    FROM chatd_room_message_reaction r
+    WHERE r.room_uuid = :room_uuid
+    GROUP BY r.message_uuid, r.emoji
+    ORDER BY r.message_uuid, MIN(r.created_at) ASC, r.emoji
+"""
+
+GET_COUNTS_BY_MESSAGE_SQL = """
+    SELECT s.message_uuid, s.emoji, s.count, r.user_uuid IS NOT NULL
+    FROM chatd_room_message_reaction_summary s
+    LEFT JOIN chatd_room_message_reaction r
+        ON r.room_uuid = :room_uuid
+       AND r.message_uuid = s.message_uuid
+       AND r.emoji = s.emoji
+       AND r.user_uuid = :current_user_uuid
+    WHERE s.message_uuid = :message_uuid
+      AND s.count > 0
+    ORDER BY s.created_at ASC, s.emoji
+"""
+
+GET_COUNTS_FOR_ROOM_SQL = """
+    SELECT s.message_uuid, s.emoji, s.count, r.user_uuid IS NOT NULL
+    FROM chatd_room_message_reaction_summary s
+    LEFT JOIN chatd_room_message_reaction r
+        ON r.room_uuid = :room_uuid
+       AND r.message_uuid = s.message_uuid
+       AND r.emoji = s.emoji
+       AND r.user_uuid = :current_user_uuid
+    WHERE s.room_uuid = :room_uuid
+      AND s.count > 0
+    ORDER BY s.message_uuid, s.created_at ASC, s.emoji
+"""
+
+# message_filter: empty, or the message_uuids filter of get_user_emojis_for_room
+GET_USER_EMOJIS_FOR_ROOM_SQL = """
+    SELECT r.message_uuid, r.emoji
+    FROM chatd_room_message_reaction r
+    WHERE r.room_uuid = :room_uuid
+      AND r.user_uuid = :user_uuid
+      {message_filter}
+"""
+
 
 class ReactionDAO:
     """DAO for reaction database operations."""
@@ -31,72 +119,88 @@ class ReactionDAO:
         """Get the current session."""
         return Session()
 
-    def get(self, message_uuid, user_uuid, emoji):
+    def get(self, room_uuid, message_uuid, user_uuid, emoji):
         """Get a specific reaction."""
         query = text("""
             SELECT message_uuid, user_uuid, emoji, created_at
             FROM chatd_room_message_reaction
-            WHERE message_uuid = :message_uuid
+            WHERE room_uuid = :room_uuid
+              AND message_uuid = :message_uuid
               AND user_uuid = :user_uuid
               AND emoji = :emoji
         """)
         result = self._session.execute(
             query,
             {
+                'room_uuid': str(room_uuid),
                 'message_uuid': str(message_uuid),
                 'user_uuid': str(user_uuid),
                 'emoji': emoji,
             }
         ).fetchone()
         
-        if result:
-            return ReactionResult(
-                message_uuid=result[0],
-                user_uuid=result[1],
-                emoji=result[2],
-                created_at=result[3],
-            )
-        return None
+        return map_row(ReactionResult, result)
 
-    def get_by_message(self, message_uuid):
+    def get_by_message(self, room_uuid, message_uuid):
         """Get all reactions for a message."""
-        query = text("""
-            SELECT message_uuid, user_uuid, emoji, created_at
-            FROM chatd_room_message_reaction
-            WHERE message_uuid = :message_uuid
-            ORDER BY created_at ASC
-        """)
+        query = text(GET_BY_MESSAGE_SQL)
         results = self._session.execute(
             query,
-            {'message_uuid': str(message_uuid)}
+            {'room_uuid': str(room_uuid), 'message_uuid': str(message_uuid)}
         ).fetchall()
         
-        return [
-            ReactionResult(
-                message_uuid=row[0],
-                user_uuid=row[1],
-                emoji=row[2],
-                created_at=row[3],
-            )
-            for row in results
-        ]
+        return map_rows(ReactionResult, results)
 
-    def create(self, message_uuid, user_uuid, emoji):
-        """Create a new reaction."""
+    def create(self, room_uuid, message_uuid, user_uuid, emoji):
+        """Create a new reaction, unless it already exists.
+        
+        The reaction, its count in chatd_room_message_reaction_summary and its
+        entry in the chatd_room_message_change log are written by a single
+        statement, so concurrent identical requests do not fail on the
+        primary key.
+        
+        Returns:
+            ReactionResult, or None if the user already reacted with this emoji
+        """
         now = datetime.now(timezone.utc)
         
         query = text("""
-            INSERT INTO chatd_room_message_reaction 
-                (message_uuid, user_uuid, emoji, created_at)
-            VALUES 
-                (:message_uuid, :user_uuid, :emoji, :created_at)
-            RETURNING message_uuid, user_uuid, emoji, created_at
+            WITH inserted AS (
+                INSERT INTO chatd_room_message_reaction 
+                    (room_uuid, message_uuid, user_uuid, emoji, created_at)
+                VALUES 
+                    (:room_uuid, :message_uuid, :user_uuid, :emoji, :created_at)
+                ON CONFLICT DO NOTHING
+                RETURNING message_uuid, user_uuid, emoji, created_at
+            ), counted AS (
+                INSERT INTO chatd_room_message_reaction_summary
+                    (room_uuid, message_uuid, emoji, count, created_at, last_updated)
+                SELECT CAST(:room_uuid AS uuid), message_uuid, emoji, 1, created_at, created_at
+                FROM inserted
+                ON CONFLICT (message_uuid, emoji) DO UPDATE
+                SET count = chatd_room_message_reaction_summary.count + 1,
+                    created_at = CASE
+                        WHEN chatd_room_message_reaction_summary.count <= 0
+                        THEN EXCLUDED.created_at
+                        ELSE chatd_room_message_reaction_summary.created_at
+                    END,
+                    last_updated = EXCLUDED.last_updated
+            ), logged AS (
+                INSERT INTO chatd_room_message_change
+                    (room_uuid, txid, kind, message_uuid, user_uuid, emoji, created_at)
+                SELECT :room_uuid, CAST(CAST(pg_current_xact_id() AS text) AS bigint),
+                       'reaction_created', message_uuid, user_uuid, emoji, created_at
+                FROM inserted
+            )
+            SELECT message_uuid, user_uuid, emoji, created_at
+            FROM inserted
         """)
         
         try:
             result = self._session.execute(
                 query,
                 {
+                    'room_uuid': str(room_uuid),
                     'message_uuid': str(message_uuid),
                     'user_uuid': str(user_uuid),
                     'emoji': emoji,
@@ -104,41 +208,260 @@ class ReactionDAO:
                 }
             ).fetchone()
             self._session.commit()
-            
-            return ReactionResult(
-                message_uuid=result[0],
-                user_uuid=result[1],
-                emoji=result[2],
-                created_at=result[3],
-            )
         except IntegrityError:
             self._session.rollback()
             raise
+        
+        return map_row(ReactionResult, result)
 
-    def delete(self, message_uuid, user_uuid, emoji):
-        """Delete a reaction."""
+    def delete(self, room_uuid, message_uuid, user_uuid, emoji):
+        """Delete a reaction, if it exists.
+        
+        The reaction, its count in chatd_room_message_reaction_summary and a
+        tombstone in the chatd_room_message_change log are written by a single
+        statement. Counts that reach zero are kept and ignored by reads, so
+        they can be reused without a second statement.
+        
+        Returns:
+            The deleted ReactionResult, or None if there was no such reaction
+        """
         query = text("""
-            DELETE FROM chatd_room_message_reaction
-            WHERE message_uuid = :message_uuid
-              AND user_uuid = :user_uuid
-              AND emoji = :emoji
+            WITH deleted AS (
+                DELETE FROM chatd_room_message_reaction
+                WHERE room_uuid = :room_uuid
+                  AND message_uuid = :message_uuid
+                  AND user_uuid = :user_uuid
+                  AND emoji = :emoji
+                RETURNING message_uuid, user_uuid, emoji, created_at
+            ), counted AS (
+                UPDATE chatd_room_message_reaction_summary s
+                SET count = s.count - 1,
+                    last_updated = :now
+                FROM deleted d
+                WHERE s.message_uuid = d.message_uuid
+                  AND s.emoji = d.emoji
+            ), logged AS (
+                INSERT INTO chatd_room_message_change
+                    (room_uuid, txid, kind, message_uuid, user_uuid, emoji, created_at)
+                SELECT :room_uuid, CAST(CAST(pg_current_xact_id() AS text) AS bigint),
+                       'reaction_deleted', message_uuid, user_uuid, emoji, :now
+                FROM deleted
+            )
+            SELECT message_uuid, user_uuid, emoji, created_at
+            FROM deleted
         """)
         
-        self._session.execute(
+        result = self._session.execute(
             query,
             {
+                'room_uuid': str(room_uuid),
                 'message_uuid': str(message_uuid),
                 'user_uuid': str(user_uuid),
                 'emoji': emoji,
+                'now': datetime.now(timezone.utc),
             }
-        )
+        ).fetchone()
         self._session.commit()
+        
+        return map_row(ReactionResult, result)
+
+    def toggle(self, room_uuid, message_uuid, user_uuid, emoji):
+        """Delete a reaction if it exists, otherwise create it.
+        
+        Both cases, the count in chatd_room_message_reaction_summary and the
+        chatd_room_message_change log entry, are handled by a single statement.
+        
+        A concurrent toggle of the same reaction can make the statement
+        change nothing: it finds no reaction to delete, then the reaction
+        committed in the meantime makes its insert a no-op. The statement is
+        then run once more, and sees that reaction.
+        
+        Returns:
+            Tuple (added, ReactionResult): added is True if the reaction was
+            created, False if it was deleted; None if nothing was changed
+        """
+        query = text("""
+            WITH deleted AS (
+                DELETE FROM chatd_room_message_reaction
+                WHERE room_uuid = :room_uuid
+                  AND message_uuid = :message_uuid
+                  AND user_uuid = :user_uuid
+                  AND emoji = :emoji
+                RETURNING message_uuid, user_uuid, emoji, created_at
+            ), inserted AS (
+                INSERT INTO chatd_room_message_reaction 
+                    (room_uuid, message_uuid, user_uuid, emoji, created_at)
+                SELECT :room_uuid, :message_uuid, :user_uuid, :emoji, :created_at
+                WHERE NOT EXISTS (SELECT 1 FROM deleted)
+                ON CONFLICT DO NOTHING
+                RETURNING message_uuid, user_uuid, emoji, created_at
+            ), counted AS (
+                INSERT INTO chatd_room_message_reaction_summary
+                    (room_uuid, message_uuid, emoji, count, created_at, last_updated)
+                SELECT CAST(:room_uuid AS uuid), message_uuid, emoji, 1, created_at, created_at
+                FROM inserted
+                ON CONFLICT (message_uuid, emoji) DO UPDATE
+                SET count = chatd_room_message_reaction_summary.count + 1,
+                    created_at = CASE
+                        WHEN chatd_room_message_reaction_summary.count <= 0
+                        THEN EXCLUDED.created_at
+                        ELSE chatd_room_message_reaction_summary.created_at
+                    END,
+                    last_updated = EXCLUDED.last_updated
+            ), uncounted AS (
+                UPDATE chatd_room_message_reaction_summary s
+                SET count = s.count - 1,
+                    last_updated = :created_at
+                FROM deleted d
+                WHERE s.message_uuid = d.message_uuid
+                  AND s.emoji = d.emoji
+            ), logged AS (
+                INSERT INTO chatd_room_message_change
+                    (room_uuid, txid, kind, message_uuid, user_uuid, emoji, created_at)
+                SELECT CAST(:room_uuid AS uuid), CAST(CAST(pg_current_xact_id() AS text) AS bigint),
+                       'reaction_created', message_uuid, user_uuid, emoji, created_at
+                FROM inserted
+                UNION ALL
+                SELECT CAST(:room_uuid AS uuid), CAST(CAST(pg_current_xact_id() AS text) AS bigint),
+                       'reaction_deleted', message_uuid, user_uuid, emoji, :created_at
+                FROM deleted
+            )
+            SELECT true, message_uuid, user_uuid, emoji, created_at FROM inserted
+            UNION ALL
+            SELECT false, message_uuid, user_uuid, emoji, created_at FROM deleted
+        """)
+        
+        for _ in range(2):
+            try:
+                result = self._session.execute(
+                    query,
+                    {
+                        'room_uuid': str(room_uuid),
+                        'message_uuid': str(message_uuid),
+                        'user_uuid': str(user_uuid),
+                        'emoji': emoji,
+                        'created_at': datetime.now(timezone.utc),
+                    }
+                ).fetchone()
+                self._session.commit()
+            except IntegrityError:
+                self._session.rollback()
+                raise
+            if result:
+                return result[0], map_row(ReactionResult, result[1:])
+        
+        logger.warning(
+            'Toggle of reaction %s on message %s by user %s changed nothing',
+            emoji, message_uuid, user_uuid,
+        )
+        return None
+
+    def bulk_update(self, room_uuid, user_uuid, added, removed):
+        """Create and delete reactions of a user in a single statement.
+
+        Reactions that already exist (added) or do not exist (removed) are
+        skipped. Counts in chatd_room_message_reaction_summary and the
+        chatd_room_message_change log entries are written by the same
+        statement, so every change is committed at once.
+
+        Args:
+            room_uuid: The room UUID
+            user_uuid: The user UUID
+            added: List of (message_uuid, emoji) to create
+            removed: List of (message_uuid, emoji) to delete; must not
+                overlap with added
+
+        Returns:
+            Tuple (created, deleted): ReactionResult lists of the reactions
+            actually created and deleted
+        """
+        if not added and not removed:
+            return [], []
+
+        now = datetime.now(timezone.utc)
+
+        query = text("""
+            WITH deleted AS (
+                DELETE FROM chatd_room_message_reaction r
+                USING unnest(CAST(:removed_message_uuids AS uuid[]),
+                             CAST(:removed_emojis AS text[])) AS d(message_uuid, emoji)
+                WHERE r.room_uuid = CAST(:room_uuid AS uuid)
+                  AND r.message_uuid = d.message_uuid
+                  AND r.emoji = d.emoji
+                  AND r.user_uuid = CAST(:user_uuid AS uuid)
+                RETURNING r.message_uuid, r.user_uuid, r.emoji, r.created_at
+            ), inserted AS (
+                INSERT INTO chatd_room_message_reaction
+                    (room_uuid, message_uuid, user_uuid, emoji, created_at)
+                SELECT CAST(:room_uuid AS uuid), a.message_uuid, CAST(:user_uuid AS uuid),
+                       a.emoji, :created_at
+                FROM unnest(CAST(:added_message_uuids AS uuid[]),
+                            CAST(:added_emojis AS text[])) AS a(message_uuid, emoji)
+                ON CONFLICT DO NOTHING
+                RETURNING message_uuid, user_uuid, emoji, created_at
+            ), counted AS (
+                INSERT INTO chatd_room_message_reaction_summary
+                    (room_uuid, message_uuid, emoji, count, created_at, last_updated)
+                SELECT CAST(:room_uuid AS uuid), message_uuid, emoji, 1, created_at, created_at
+                FROM inserted
+                ON CONFLICT (message_uuid, emoji) DO UPDATE
+                SET count = chatd_room_message_reaction_summary.count + 1,
+                    created_at = CASE
+                        WHEN chatd_room_message_reaction_summary.count <= 0
+                        THEN EXCLUDED.created_at
+                        ELSE chatd_room_message_reaction_summary.created_at
+                    END,
+                    last_updated = EXCLUDED.last_updated
+            ), uncounted AS (
+                UPDATE chatd_room_message_reaction_summary s
+                SET count = s.count - 1,
+                    last_updated = :created_at
+                FROM deleted d
+                WHERE s.message_uuid = d.message_uuid
+                  AND s.emoji = d.emoji
+            ), logged AS (
+                INSERT INTO chatd_room_message_change
+                    (room_uuid, txid, kind, message_uuid, user_uuid, emoji, created_at)
+                SELECT CAST(:room_uuid AS uuid), CAST(CAST(pg_current_xact_id() AS text) AS bigint),
+                       'reaction_created', message_uuid, user_uuid, emoji, created_at
+                FROM inserted
+                UNION ALL
+                SELECT CAST(:room_uuid AS uuid), CAST(CAST(pg_current_xact_id() AS text) AS bigint),
+                       'reaction_deleted', message_uuid, user_uuid, emoji, :created_at
+                FROM deleted
+            )
+            SELECT true, message_uuid, user_uuid, emoji, created_at FROM inserted
+            UNION ALL
+            SELECT false, message_uuid, user_uuid, emoji, created_at FROM deleted
+        """)
+
+        try:
+            results = self._session.execute(
+                query,
+                {
+                    'room_uuid': str(room_uuid),
+                    'user_uuid': str(user_uuid),
+                    'added_message_uuids': [str(message_uuid) for message_uuid, _ in added],
+                    'added_emojis': [emoji for _, emoji in added],
+                    'removed_message_uuids': [str(message_uuid) for message_uuid, _ in removed],
+                    'removed_emojis': [emoji for _, emoji in removed],
+                    'created_at': now,
+                }
+            ).fetchall()
+            self._session.commit()
+        except IntegrityError:
+            self._session.rollback()
+            raise
+
+        created = map_rows(ReactionResult, (row[1:] for row in results if row[0]))
+        deleted = map_rows(ReactionResult, (row[1:] for row in results if not row[0]))
+        return created, deleted
 
     def get_by_room(self, room_uuid, message_uuids):
         """Get all reactions for multiple messages in a room.
         
         Args:
-            room_uuid: The room UUID (for validation context)
+            room_uuid: The room UUID
             message_uuids: List of message UUIDs to get reactions for
             
         Returns:
@@ -150,32 +473,19 @@ class ReactionDAO:
         # Convert to strings for query
         uuid_strings = [str(uuid) for uuid in message_uuids]
         
-        query = text("""
-            SELECT message_uuid, user_uuid, emoji, created_at
-            FROM chatd_room_message_reaction
-            WHERE message_uuid = ANY(:message_uuids)
-            ORDER BY message_uuid, created_at ASC
-        """)
+        query = text(GET_BY_ROOM_SQL)
         results = self._session.execute(
             query,
-            {'message_uuids': uuid_strings}
+            {'room_uuid': str(room_uuid), 'message_uuids': uuid_strings}
         ).fetchall()
         
-        return [
-            ReactionResult(
-                message_uuid=row[0],
-                user_uuid=row[1],
-                emoji=row[2],
-                created_at=row[3],
-            )
-            for row in results
-        ]
+        return map_rows(ReactionResult, results)
 
     def get_all_for_room(self, room_uuid):
         """Get all reactions for all messages in a room.
         
-        This joins with the chatd_room_message table to find all messages
-        in the room, then gets their reactions.
+        Reactions are found by their room_uuid column, without reading the
+        chatd_room_message table.
         
         Args:
             room_uuid: The room UUID
@@ -183,34 +493,240 @@ class ReactionDAO:
         Returns:
             List of ReactionResult objects
         """
-        query = text("""
-            SELECT r.message_uuid, r.user_uuid, r.emoji, r.created_at
-            FROM chatd_room_message_reaction r
-            INNER JOIN chatd_room_message m ON r.message_uuid = m.uuid
-            WHERE m.room_uuid = :room_uuid
-            ORDER BY r.message_uuid, r.created_at ASC
-        """)
+        query = text(GET_ALL_FOR_ROOM_SQL)
         results = self._session.execute(
             query,
             {'room_uuid': str(room_uuid)}
         ).fetchall()
         
-        return [
-            ReactionResult(
-                message_uuid=row[0],
-                user_uuid=row[1],
-                emoji=row[2],
-                created_at=row[3],
-            )
-            for row in results
-        ]
+        return map_rows(ReactionResult, results)
 
+    def get_summaries_by_message(self, room_uuid, message_uuid, current_user_uuid):
+        """Get reactions for a message, aggregated by emoji in the database.
 
-class ReactionResult:
-    """Simple result object for reaction data."""
-    
-    def __init__(self, message_uuid, user_uuid, emoji, created_at):
-        self.message_uuid = message_uuid
-        self.user_uuid = user_uuid
-        self.emoji = emoji
-        self.created_at = created_at
+        Args:
+            room_uuid: The room UUID of the message
+            message_uuid: The message UUID
+            current_user_uuid: The user for whom reacted_by_me is computed
+
+        Returns:
+            List of ReactionSummaryResult objects, in order of first reaction
+        """
+        query = text(GET_SUMMARIES_BY_MESSAGE_SQL)
+        results = self._session.execute(
+            query,
+            {
+                'room_uuid': str(room_uuid),
+                'message_uuid': str(message_uuid),
+                'current_user_uuid': str(current_user_uuid),
+            }
+        ).fetchall()
+
+        return map_rows(ReactionSummaryResult, results)
+
+    def get_summaries_for_room(self, room_uuid, current_user_uuid):
+        """Get reactions for all messages in a room, aggregated by emoji.
+
+        Args:
+            room_uuid: The room UUID
+            current_user_uuid: The user for whom reacted_by_me is computed
+
+        Returns:
+            List of ReactionSummaryResult objects, ordered by message and then
+            by first reaction
+        """
+        results = self._execute_summaries_for_room(room_uuid, current_user_uuid).fetchall()
+        return map_rows(ReactionSummaryResult, results)
+
+    def iter_summaries_for_room(self, room_uuid, current_user_uuid, batch_size=STREAM_BATCH_SIZE):
+        """Same as get_summaries_for_room, read through a server-side cursor.
+
+        Rows are fetched batch_size at a time, so memory does not grow with
+        the size of the room. The session must stay open until the iterator
+        is exhausted.
+        """
+        results = self._execute_summaries_for_room(room_uuid, current_user_uuid, stream=True)
+        return iter_rows(ReactionSummaryResult, results, batch_size)
+
+    def _execute_summaries_for_room(self, room_uuid, current_user_uuid, stream=False):
+        query = text(GET_SUMMARIES_FOR_ROOM_SQL).execution_options(stream_results=stream)
+        return self._session.execute(
+            query,
+            {
+                'room_uuid': str(room_uuid),
+                'current_user_uuid': str(current_user_uuid),
+            }
+        )
+
+    def get_summaries_by_room(self, room_uuid, message_uuids, current_user_uuid):
+        """Get reactions for multiple messages in a room, aggregated by emoji.
+
+        This is the aggregated counterpart of get_by_room, used to load the
+        reactions of a single page of messages.
+
+        Args:
+            room_uuid: The room UUID
+            message_uuids: List of message UUIDs to get reactions for
+            current_user_uuid: The user for whom reacted_by_me is computed
+
+        Returns:
+            List of ReactionSummaryResult objects, ordered by message and then
+            by first reaction
+        """
+        if not message_uuids:
+            return []
+
+        query = text("""
+            SELECT message_uuid, emoji, COUNT(*),
+                   array_agg(CAST(user_uuid AS text) ORDER BY created_at ASC),
+                   array_agg(created_at ORDER BY created_at ASC),
+                   bool_or(user_uuid = :current_user_uuid),
+                   MIN(created_at)
+            FROM chatd_room_message_reaction
+            WHERE room_uuid = :room_uuid
+              AND message_uuid = ANY(CAST(:message_uuids AS uuid[]))
+            GROUP BY message_uuid, emoji
+            ORDER BY message_uuid, MIN(created_at) ASC, emoji
+        """)
+        results = self._session.execute(
+            query,
+            {
+                'room_uuid': str(room_uuid),
+                'message_uuids': [str(uuid) for uuid in message_uuids],
+                'current_user_uuid': str(current_user_uuid),
+            }
+        ).fetchall()
+
+        return map_rows(ReactionSummaryResult, results)
+
+    def get_counts_by_message(self, room_uuid, message_uuid, current_user_uuid):
+        """Get reaction counts for a message from the summary table.
+
+        Never scans individual reactions: the current user's reactions are
+        found with primary key lookups, one per emoji.
+
+        Returns:
+            List of ReactionCountResult objects, in order of first reaction
+        """
+        query = text(GET_COUNTS_BY_MESSAGE_SQL)
+        results = self._session.execute(
+            query,
+            {
+                'room_uuid': str(room_uuid),
+                'message_uuid': str(message_uuid),
+                'current_user_uuid': str(current_user_uuid),
+            }
+        ).fetchall()
+
+        return map_rows(ReactionCountResult, results)
+
+    def get_counts_by_room(self, room_uuid, message_uuids, current_user_uuid):
+        """Get reaction counts for multiple messages from the summary table.
+
+        Args:
+            room_uuid: The room UUID
+            message_uuids: List of message UUIDs to get counts for
+            current_user_uuid: The user for whom reacted_by_me is computed
+
+        Returns:
+            List of ReactionCountResult objects, ordered by message and then
+            by first reaction
+        """
+        if not message_uuids:
+            return []
+
+        query = text("""
+            SELECT s.message_uuid, s.emoji, s.count, r.user_uuid IS NOT NULL
+            FROM chatd_room_message_reaction_summary s
+            LEFT JOIN chatd_room_message_reaction r
+                ON r.room_uuid = :room_uuid
+               AND r.message_uuid = s.message_uuid
+               AND r.emoji = s.emoji
+               AND r.user_uuid = :current_user_uuid
+            WHERE s.message_uuid = ANY(CAST(:message_uuids AS uuid[]))
+              AND s.count > 0
+            ORDER BY s.message_uuid, s.created_at ASC, s.emoji
+        """)
+        results = self._session.execute(
+            query,
+            {
+                'room_uuid': str(room_uuid),
+                'message_uuids': [str(uuid) for uuid in message_uuids],
+                'current_user_uuid': str(current_user_uuid),
+            }
+        ).fetchall()
+
+        return map_rows(ReactionCountResult, results)
+
+    def get_counts_for_room(self, room_uuid, current_user_uuid):
+        """Get reaction counts for all messages in a room from the summary table.
+
+        Returns:
+            List of ReactionCountResult objects, ordered by message and then
+            by first reaction
+        """
+        results = self._execute_counts_for_room(room_uuid, current_user_uuid).fetchall()
+        return map_rows(ReactionCountResult, results)
+
+    def iter_counts_for_room(self, room_uuid, current_user_uuid, batch_size=STREAM_BATCH_SIZE):
+        """Same as get_counts_for_room, read through a server-side cursor."""
+        results = self._execute_counts_for_room(room_uuid, current_user_uuid, stream=True)
+        return iter_rows(ReactionCountResult, results, batch_size)
+
+    def _execute_counts_for_room(self, room_uuid, current_user_uuid, stream=False):
+        query = text(GET_COUNTS_FOR_ROOM_SQL).execution_options(stream_results=stream)
+        return self._session.execute(
+            query,
+            {
+                'room_uuid': str(room_uuid),
+                'current_user_uuid': str(current_user_uuid),
+            }
+        )
+
+    def get_user_emojis_for_room(self, room_uuid, user_uuid, message_uuids=None):
+        """Get the emojis a user reacted with in a room.
+
+        Args:
+            room_uuid: The room UUID
+            user_uuid: The user UUID
+            message_uuids: Only look at these messages (all if None)
+
+        Returns:
+            Set of (message_uuid, emoji) tuples, with message UUIDs as strings
+        """
+        message_filter = ''
+        params = {'room_uuid': str(room_uuid), 'user_uuid': str(user_uuid)}
+        if message_uuids is not None:
+            if not message_uuids:
+                return set()
+            message_filter = 'AND r.message_uuid = ANY(CAST(:message_uuids AS uuid[]))'
+            params['message_uuids'] = [str(uuid) for uuid in message_uuids]
+
+        query = text(GET_USER_EMOJIS_FOR_ROOM_SQL.format(message_filter=message_filter))
+        results = self._session.execute(query, params).fetchall()
+
+        return {(str(row[0]), row[1]) for row in results}
+
+
+class ReactionResult(namedtuple('ReactionResult', 'message_uuid user_uuid emoji created_at')):
+    """Result row for reaction data."""
+
+    __slots__ = ()
+
+
+class ReactionSummaryResult(namedtuple('ReactionSummaryResult', [
+    'message_uuid', 'emoji', 'count', 'user_uuids', 'created_ats',
+    'reacted_by_me', 'first_created_at',
+])):
+    """Result row for reactions aggregated by message and emoji.
+
+    user_uuids and created_ats are parallel lists, ordered by reaction time.
+    """
+
+    __slots__ = ()
+
+
+class ReactionCountResult(namedtuple('ReactionCountResult', 'message_uuid emoji count reacted_by_me')):
+    """Result row for a reaction count read from the summary table."""
+
+    __slots__ = ()
@@ -0,0 +1,185 @@
+# Copyright 2024 Community Contributors
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Background dispatch of notification jobs.
+
+Lets the HTTP request return as soon as the database commit is done, while
+bus events are published by worker threads.
+"""
+
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Overflow policies, applied when the queue is full
+OVERFLOW_INLINE = 'inline'  # run the job in the caller's thread (backpressure)
+OVERFLOW_DROP_NEWEST = 'drop_newest'  # discard the job being submitted
+OVERFLOW_DROP_OLDEST = 'drop_oldest'  # discard the oldest queued job
+OVERFLOW_POLICIES = (OVERFLOW_INLINE, OVERFLOW_DROP_NEWEST, OVERFLOW_DROP_OLDEST)
+
+_STOP = object()
+
+
+class NotificationDispatcher:
+    """Bounded job queue consumed by background worker threads.
+
+    Implements start/stop/join so it can be handed to the wazo-chatd thread
+    manager, which stops it (draining queued jobs) on shutdown.
+    """
+
+    def __init__(self, max_size=10000, workers=2, overflow=OVERFLOW_INLINE,
+                 drain_timeout=5):
+        """Initialize the dispatcher.
+
+        Args:
+            max_size: Maximum number of queued jobs
+            workers: Number of worker threads
+            overflow: Policy when the queue is full, one of OVERFLOW_POLICIES
+            drain_timeout: Seconds to wait for queued jobs on shutdown
+        """
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f'Unknown dispatch overflow policy: {overflow}')
+        self._queue = queue.Queue(maxsize=max_size)
+        self._worker_count = workers
+        self._overflow = overflow
+        self._drain_timeout = drain_timeout
+        self._workers = []
+        self._lock = threading.Lock()
+        self._stopping = False
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._dropped = 0
+        self._inline = 0
+        self._dequeued = 0
+        self._total_latency = 0.0
+        self._max_latency = 0.0
+
+    def start(self):
+        """Start the worker threads (no-op if already started)."""
+        with self._lock:
+            if self._workers:
+                return
+            for i in range(self._worker_count):
+                worker = threading.Thread(
+                    target=self._run,
+                    name=f'reactions-dispatch-{i}',
+                    daemon=True,
+                )
+                worker.start()
+                self._workers.append(worker)
+
+    def stop(self):
+        """Stop accepting jobs and let workers exit once the queue is drained."""
+        with self._lock:
+            if self._stopping:
+                return
+            self._stopping = True
+        deadline = time.monotonic() + self._drain_timeout
+        for _ in self._workers:
+            try:
+                self._queue.put(_STOP, timeout=max(deadline - time.monotonic(), 0))
+            except queue.Full:
+                logger.warning('Notification queue still full on shutdown')
+                break
+
+    def join(self, timeout=None):
+        """Wait for the worker threads to exit."""
+        timeout = self._drain_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        for worker in self._workers:
+            worker.join(max(deadline - time.monotonic(), 0))
+        pending = self._queue.qsize()
+        if pending:
+            logger.warning('%s notification jobs not dispatched on shutdown', pending)
+
+    def submit(self, func, *args, **kwargs):
+        """Queue a job, applying the overflow policy if the queue is full.
+
+        Jobs submitted while stopping are run in the caller's thread.
+        """
+        job = (time.monotonic(), func, args, kwargs)
+        with self._lock:
+            self._submitted += 1
+            stopping = self._stopping
+        if stopping:
+            self._run_inline(job)
+            return
+
+        try:
+            self._queue.put_nowait(job)
+            return
+        except queue.Full:
+            pass
+
+        if self._overflow == OVERFLOW_INLINE:
+            self._run_inline(job)
+        elif self._overflow == OVERFLOW_DROP_NEWEST:
+            self._drop()
+        else:
+            try:
+                self._queue.get_nowait()
+                self._drop()
+            except queue.Empty:
+                pass
+            try:
+                self._queue.put_nowait(job)
+            except queue.Full:
+                self._drop()
+
+    def stats(self):
+        """Get queue depth, job counters and queue latency (in seconds)."""
+        with self._lock:
+            dequeued = self._dequeued
+            return {
+                'queue_size': self._queue.qsize(),
+                'max_size': self._queue.maxsize,
+                'overflow': self._overflow,
+                'submitted': self._submitted,
+                'completed': self._completed,
+                'failed': self._failed,
+                'dropped': self._dropped,
+                'inline': self._inline,
+                'avg_queue_latency': self._total_latency / dequeued if dequeued else 0.0,
+                'max_queue_latency': self._max_latency,
+            }
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if job is _STOP:
+                return
+            self._execute(job, queued=True)
+
+    def _run_inline(self, job):
+        with self._lock:
+            self._inline += 1
+        self._execute(job, queued=False)
+
+    def _drop(self):
+        with self._lock:
+            self._dropped += 1
+        logger.warning('Notification queue full, dropping a job')
+
+    def _execute(self, job, queued):
+        submitted_at, func, args, kwargs = job
+        latency = time.monotonic() - submitted_at
+        try:
+            func(*args, **kwargs)
+            failed = False
+        except Exception:
+            logger.exception('Error while dispatching notification')
+            failed = True
+        with self._lock:
+            if failed:
+                self._failed += 1
+            else:
+                self._completed += 1
+            if queued:
+                self._dequeued += 1
+                self._total_latency += latency
+                self._max_latency = max(self._max_latency, latency)
@@ -5,9 +5,13 @@
 Custom bus events for chat reactions and replies.
 
 These events follow the same pattern as wazo-bus events.
+
+User events are published once per room member. Room events carry the same
+name and payload but are published once per room, with one user_uuid header
+per member; the websocket layer expands them to each member.
 """
 
-from wazo_bus.resources.common.event import UserEvent
+from wazo_bus.resources.common.event import MultiUserEvent, UserEvent
 
 
 class UserRoomMessageReactionCreatedEvent(UserEvent):
@@ -85,3 +89,128 @@ class UserRoomMessageReplyCreatedEvent(UserEvent):
         self.message_uuid = str(parent_message_uuid)  # For routing key compatibility
         self.parent_message_uuid = str(parent_message_uuid)
         self.child_message_uuid = str(child_message_uuid)
+
+
+class UserRoomMessageReactionsChangedEvent(UserEvent):
+    """Event fired when the reactions of a message changed, coalesced over a window."""
+    
+    service = 'chatd'
+    name = 'chatd_user_room_message_reactions_changed'
+    routing_key_fmt = 'chatd.users.{user_uuid}.rooms.{room_uuid}.messages.{message_uuid}.reactions.changed'
+
+    def __init__(
+        self,
+        changes_data: dict,
+        room_uuid: str,
+        message_uuid: str,
+        tenant_uuid: str,
+        user_uuid: str,
+    ):
+        super().__init__(changes_data, tenant_uuid, user_uuid)
+        if room_uuid is None:
+            raise ValueError('room_uuid must have a value')
+        if message_uuid is None:
+            raise ValueError('message_uuid must have a value')
+        self.room_uuid = str(room_uuid)
+        self.message_uuid = str(message_uuid)
+
+
+class RoomMessageReactionCreatedEvent(MultiUserEvent):
+    """Event fired once per room when a user adds a reaction to a message."""
+    
+    service = 'chatd'
+    name = 'chatd_user_room_message_reaction_created'
+    routing_key_fmt = 'chatd.rooms.{room_uuid}.messages.{message_uuid}.reactions.created'
+
+    def __init__(
+        self,
+        reaction_data: dict,
+        room_uuid: str,
+        message_uuid: str,
+        tenant_uuid: str,
+        user_uuids: list,
+    ):
+        super().__init__(reaction_data, tenant_uuid, user_uuids)
+        if room_uuid is None:
+            raise ValueError('room_uuid must have a value')
+        if message_uuid is None:
+            raise ValueError('message_uuid must have a value')
+        self.room_uuid = str(room_uuid)
+        self.message_uuid = str(message_uuid)
+
+
+class RoomMessageReactionDeletedEvent(MultiUserEvent):
+    """Event fired once per room when a user removes a reaction from a message."""
+    
+    service = 'chatd'
+    name = 'chatd_user_room_message_reaction_deleted'
+    routing_key_fmt = 'chatd.rooms.{room_uuid}.messages.{message_uuid}.reactions.deleted'
+
+    def __init__(
+        self,
+        reaction_data: dict,
+        room_uuid: str,
+        message_uuid: str,
+        tenant_uuid: str,
+        user_uuids: list,
+    ):
+        super().__init__(reaction_data, tenant_uuid, user_uuids)
+        if room_uuid is None:
+            raise ValueError('room_uuid must have a value')
+        if message_uuid is None:
+            raise ValueError('message_uuid must have a value')
+        self.room_uuid = str(room_uuid)
+        self.message_uuid = str(message_uuid)
+
+
+class RoomMessageReplyCreatedEvent(MultiUserEvent):
+    """Event fired once per room when a user creates a reply to a message."""
+    
+    service = 'chatd'
+    name = 'chatd_user_room_message_reply_created'
+    routing_key_fmt = 'chatd.rooms.{room_uuid}.messages.{message_uuid}.replies.created'
+
+    def __init__(
+        self,
+        reply_data: dict,
+        room_uuid: str,
+        parent_message_uuid: str,
+        child_message_uuid: str,
+        tenant_uuid: str,
+        user_uuids: list,
+    ):
+        super().__init__(reply_data, tenant_uuid, user_uuids)
+        if room_uuid is None:
+            raise ValueError('room_uuid must have a value')
+        if parent_message_uuid is None:
+            raise ValueError('parent_message_uuid must have a value')
+        if child_message_uuid is None:
+            raise ValueError('child_message_uuid must have a value')
+        self.room_uuid = str(room_uuid)
+        self.message_uuid = str(parent_message_uuid)  # For routing key compatibility
+        self.parent_message_uuid = str(parent_message_uuid)
+        self.child_message_uuid = str(child_message_uuid)
+
+
+class RoomMessageReactionsChangedEvent(MultiUserEvent):
+    """Event fired once per room when the reactions of a message changed, coalesced over a window."""
+    
+    service = 'chatd'
+    name = 'chatd_user_room_message_reactions_changed'
+    routing_key_fmt = 'chatd.rooms.{room_uuid}.messages.{message_uuid}.reactions.changed'
+
+    def __init__(
+        self,
+        changes_data: dict,
+        room_uuid: str,
+        message_uuid: str,
+        tenant_uuid: str,
+        user_uuids: list,
+    ):
+        super().__init__(changes_data, tenant_uuid, user_uuids)
+        if room_uuid is None:
+            raise ValueError('room_uuid must have a value')
+        if message_uuid is None:
+            raise ValueError('message_uuid must have a value')
+        self.room_uuid = str(room_uuid)
+        self.message_uuid = str(message_uuid)
@@ -58,3 +58,15 @@ class RoomNotFoundException(APIException):
             error_id='room-not-found',
             details=details,
         )
+
+
+class InvalidSyncCursorException(APIException):
+    def __init__(self, cursor):
+        msg = f'Invalid sync cursor: {cursor}'
+        details = {'since': cursor}
+        super().__init__(
+            status_code=400,
+            message=msg,
+            error_id='invalid-sync-cursor',
+            details=details,
+        )
@@ -1,24 +1,83 @@
 # Copyright 2024 Community Contributors
 # SPDX-License-Identifier: GPL-3.0-or-later
 
-from flask import request
+import hashlib
+
+from flask import Response, request, stream_with_context
 from xivo.auth_verifier import required_acl
 from xivo.tenant_flask_helpers import token
 
 from wazo_chatd.http import AuthResource
 
+from .response_cache import with_reacted_by_me, without_reacted_by_me
 from .schemas import (
+    BulkReactionsSchema,
+    BulkReactionResultsSchema,
     ReactionCreateSchema,
-    MessageReactionsSchema,
     ReactionSchema,
-    RoomReactionsSchema,
+    ReactionToggleSchema,
+    ReactionsQuerySchema,
+    RoomReactionsQuerySchema,
     ReplyCreateSchema,
     ReplyInfoSchema,
     MessageRepliesSchema,
+    RoomReplyMetadataQuerySchema,
     RoomReplyMetadataSchema,
+    MessagesMetadataQuerySchema,
+    RoomMessagesMetadataSchema,
+    RoomThreadSummariesSchema,
+    RoomSyncQuerySchema,
+    RoomSyncSchema,
+)
+from .serializers import (
+    dump_message_reactions,
+    dump_message_reaction_counts,
+    dump_reaction_counts,
+    dump_reaction_summaries,
+    dump_room_reactions,
+    dump_room_reaction_counts,
+    iter_json_object,
 )
 
 
+def _etag(version):
+    """Build an (unquoted) ETag from a version, the current user and the request URL.
+
+    The user is part of the tag since responses include reacted_by_me.
+    Returns None if the version is unknown (cache backend unavailable).
+    """
+    if version is None:
+        return None
+    key = '{}|{}|{}|{}'.format(
+        version,
+        token.user_uuid,
+        request.path,
+        sorted(request.args.items(multi=True)),
+    )
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+def _etag_headers(etag):
+    if etag is None:
+        return {}
+    return {'ETag': f'"{etag}"', 'Cache-Control': 'no-cache'}
+
+
+def _not_modified(etag):
+    """Whether the client already has the representation with this ETag."""
+    return etag is not None and request.if_none_match.contains(etag)
+
+
+def _stream_json(chunks, etag):
+    """Build a streamed JSON response; the request context is kept for the DB session."""
+    return Response(
+        stream_with_context(chunks),
+        status=200,
+        headers=_etag_headers(etag),
+        mimetype='application/json',
+    )
+
+
 # =============================================================================
 # Reaction Resources
 # =============================================================================
@@ -34,14 +93,35 @@ class MessageReactionsResource(AuthResource):
         """Get all reactions for a message.
         
         Returns reactions grouped by emoji with count and user list.
+        Query string: view=summary only returns emoji, count and reacted_by_me.
+
+        Returns 304 if If-None-Match matches the current ETag.
         """
+        query_args = ReactionsQuerySchema().load(request.args)
+        etag = _etag(self._service.get_message_version(
+            tenant_uuid=token.tenant_uuid,
+            room_uuid=room_uuid,
+            message_uuid=message_uuid,
+        ))
+        if _not_modified(etag):
+            return '', 304, _etag_headers(etag)
+
+        if query_args['view'] == 'summary':
+            result = self._service.get_reaction_counts(
+                tenant_uuid=token.tenant_uuid,
+                room_uuid=room_uuid,
+                message_uuid=message_uuid,
+                current_user_uuid=token.user_uuid,
+            )
+            return dump_message_reaction_counts(result), 200, _etag_headers(etag)
+
         result = self._service.get_reactions(
             tenant_uuid=token.tenant_uuid,
             room_uuid=room_uuid,
             message_uuid=message_uuid,
             current_user_uuid=token.user_uuid,
         )
-        return MessageReactionsSchema().dump(result), 200
+        return dump_message_reactions(result), 200, _etag_headers(etag)
 
     @required_acl('chatd.users.me.rooms.{room_uuid}.messages.{message_uuid}.reactions.create')
     def post(self, room_uuid, message_uuid):
@@ -83,25 +163,161 @@ class MessageReactionResource(AuthResource):
         return '', 204
 
 
+class MessageReactionToggleResource(AuthResource):
+    """Resource for toggling a specific reaction."""
+
+    def __init__(self, service):
+        self._service = service
+
+    @required_acl('chatd.users.me.rooms.{room_uuid}.messages.{message_uuid}.reactions.toggle')
+    def post(self, room_uuid, message_uuid, emoji):
+        """Add the reaction if the user has not reacted with this emoji, remove it otherwise.
+        
+        The response tells which one happened (reacted: true if added).
+        """
+        result = self._service.toggle_reaction(
+            tenant_uuid=token.tenant_uuid,
+            room_uuid=room_uuid,
+            message_uuid=message_uuid,
+            user_uuid=token.user_uuid,
+            emoji=emoji,
+        )
+        return ReactionToggleSchema().dump(result), 200
+
+
+class RoomReactionsBulkResource(AuthResource):
+    """Resource for adding and removing reactions on several messages at once."""
+
+    def __init__(self, service):
+        self._service = service
+
+    @required_acl('chatd.users.me.rooms.{room_uuid}.reactions.bulk.update')
+    def post(self, room_uuid):
+        """Apply a list of add/remove reaction operations in one transaction.
+        
+        Request body: {"operations": [{"action": "add", "message_uuid": "...", "emoji": "..."}]}
+        Operations already in effect are reported with applied: false.
+        """
+        bulk_args = BulkReactionsSchema().load(request.get_json())
+        
+        result = self._service.bulk_update_reactions(
+            tenant_uuid=token.tenant_uuid,
+            room_uuid=room_uuid,
+            user_uuid=token.user_uuid,
+            operations=bulk_args['operations'],
+        )
+        return BulkReactionResultsSchema().dump(result), 200
+
+
 class RoomReactionsResource(AuthResource):
     """Resource for getting all reactions in a room (batch loading)."""
 
-    def __init__(self, service):
+    def __init__(self, service, response_cache):
         self._service = service
+        self._response_cache = response_cache
 
     @required_acl('chatd.users.me.rooms.{room_uuid}.reactions.read')
     def get(self, room_uuid):
-        """Get all reactions for all messages in a room.
+        """Get reactions for the messages in a room.
         
         Returns a dict mapping message UUIDs to their reactions.
         Useful for batch loading reaction data for a room.
+        Query string: before/after (message UUID) and limit select a page of
+        messages; the response then includes a next_cursor.
+        view=summary only returns emoji, count and reacted_by_me.
+
+        Returns 304 if If-None-Match matches the current ETag.
+
+        The payload is shared by every room member through the response
+        cache; only reacted_by_me is computed for the current user.
+
+        stream=true (whole-room reads only) bypasses the response cache and
+        streams the response as rows are read, so memory stays bounded
+        however large the room is.
         """
+        query_args = RoomReactionsQuerySchema().load(request.args)
+        version = self._service.get_room_version(
+            tenant_uuid=token.tenant_uuid,
+            room_uuid=room_uuid,
+        )
+        etag = _etag(version)
+        if _not_modified(etag):
+            return '', 304, _etag_headers(etag)
+
+        view = query_args.pop('view')
+        if query_args.pop('stream') and not query_args:
+            return self._stream_room_reactions(room_uuid, view, etag)
+
+        key = None
+        if version is not None:
+            key = (
+                'reactions',
+                room_uuid,
+                view,
+                *(f'{name}={value}' for name, value in sorted(query_args.items())),
+                version,
+            )
+        payload = self._response_cache.get_or_build(
+            key, lambda: self._dump_room_reactions(room_uuid, view, query_args)
+        )
+
+        if view == 'summary':
+            reacted = self._service.get_reacted_emojis(
+                tenant_uuid=token.tenant_uuid,
+                room_uuid=room_uuid,
+                user_uuid=token.user_uuid,
+                message_uuids=list(payload['reactions']) if query_args else None,
+            )
+            result = with_reacted_by_me(
+                payload,
+                lambda message_uuid, reaction: (message_uuid, reaction['emoji']) in reacted,
+            )
+        else:
+            user_uuid = str(token.user_uuid)
+            result = with_reacted_by_me(
+                payload,
+                lambda message_uuid, reaction: user_uuid in reaction['user_uuids'],
+            )
+        return result, 200, _etag_headers(etag)
+
+    def _stream_room_reactions(self, room_uuid, view, etag):
+        if view == 'summary':
+            items = self._service.iter_room_reaction_counts(
+                tenant_uuid=token.tenant_uuid,
+                room_uuid=room_uuid,
+                current_user_uuid=token.user_uuid,
+            )
+            dump = dump_reaction_counts
+        else:
+            items = self._service.iter_room_reactions(
+                tenant_uuid=token.tenant_uuid,
+                room_uuid=room_uuid,
+                current_user_uuid=token.user_uuid,
+            )
+            dump = dump_reaction_summaries
+        return _stream_json(
+            iter_json_object({'room_uuid': str(room_uuid)}, 'reactions', items, dump),
+            etag,
+        )
+
+    def _dump_room_reactions(self, room_uuid, view, query_args):
+        """Load and dump the reactions of a room, without per-user data."""
+        if view == 'summary':
+            result = self._service.get_room_reaction_counts(
+                tenant_uuid=token.tenant_uuid,
+                room_uuid=room_uuid,
+                current_user_uuid=token.user_uuid,
+                **query_args,
+            )
+            return without_reacted_by_me(dump_room_reaction_counts(result))
+
         result = self._service.get_room_reactions(
             tenant_uuid=token.tenant_uuid,
             room_uuid=room_uuid,
             current_user_uuid=token.user_uuid,
+            **query_args,
         )
-        return RoomReactionsSchema().dump(result), 200
+        return without_reacted_by_me(dump_room_reactions(result))
 
 
 # =============================================================================
@@ -173,8 +389,9 @@ class MessageRepliesResource(AuthResource):
 class RoomReplyMetadataResource(AuthResource):
     """Resource for getting all reply metadata in a room."""
 
-    def __init__(self, service):
+    def __init__(self, service, response_cache):
         self._service = service
+        self._response_cache = response_cache
 
     @required_acl('chatd.users.me.rooms.{room_uuid}.replies.read')
     def get(self, room_uuid):
@@ -182,9 +399,140 @@ class RoomReplyMetadataResource(AuthResource):
         
         Returns a dict mapping message UUIDs to their reply info.
         Useful for batch loading reply data for a room.
+
+        Returns 304 if If-None-Match matches the current ETag.
+        stream=true bypasses the response cache and streams the response.
+        """
+        query_args = RoomReplyMetadataQuerySchema().load(request.args)
+        version = self._service.get_room_version(
+            tenant_uuid=token.tenant_uuid,
+            room_uuid=room_uuid,
+        )
+        etag = _etag(version)
+        if _not_modified(etag):
+            return '', 304, _etag_headers(etag)
+
+        if query_args['stream']:
+            items = self._service.iter_room_reply_metadata(
+                tenant_uuid=token.tenant_uuid,
+                room_uuid=room_uuid,
+            )
+            schema = ReplyInfoSchema()
+            return _stream_json(
+                iter_json_object({'room_uuid': str(room_uuid)}, 'replies', items, schema.dump),
+                etag,
+            )
+
+        payload = self._response_cache.get_or_build(
+            ('replies', room_uuid, version) if version is not None else None,
+            lambda: RoomReplyMetadataSchema().dump(
+                self._service.get_room_reply_metadata(
+                    tenant_uuid=token.tenant_uuid,
+                    room_uuid=room_uuid,
+                )
+            ),
+        )
+        return payload, 200, _etag_headers(etag)
+
+
+class RoomThreadSummariesResource(AuthResource):
+    """Resource for getting the reply counts of messages in a room."""
+
+    def __init__(self, service, response_cache):
+        self._service = service
+        self._response_cache = response_cache
+
+    @required_acl('chatd.users.me.rooms.{room_uuid}.threads.read')
+    def get(self, room_uuid):
+        """Get the thread summary of a set of messages in a room.
+        
+        Returns a dict mapping the UUIDs of messages that have replies to
+        their reply count, last reply time and participants, so clients can
+        show reply badges without one request per message.
+        Query string: message_uuids (comma-separated), or before/after
+        (message UUID) and limit to select a page of messages.
+
+        Returns 304 if If-None-Match matches the current ETag.
+        """
+        query_args = MessagesMetadataQuerySchema().load(request.args)
+        version = self._service.get_room_version(
+            tenant_uuid=token.tenant_uuid,
+            room_uuid=room_uuid,
+        )
+        etag = _etag(version)
+        if _not_modified(etag):
+            return '', 304, _etag_headers(etag)
+
+        # Pages are shared by room members; message lists are too varied
+        key = None
+        if version is not None and 'message_uuids' not in query_args:
+            key = (
+                'threads',
+                room_uuid,
+                *(f'{name}={value}' for name, value in sorted(query_args.items())),
+                version,
+            )
+        payload = self._response_cache.get_or_build(
+            key,
+            lambda: RoomThreadSummariesSchema().dump(
+                self._service.get_thread_summaries(
+                    tenant_uuid=token.tenant_uuid,
+                    room_uuid=room_uuid,
+                    **query_args,
+                )
+            ),
+        )
+        return payload, 200, _etag_headers(etag)
+
+
+# =============================================================================
+# Room Metadata Resources
+# =============================================================================
+
+class RoomMessagesMetadataResource(AuthResource):
+    """Resource for getting reactions and reply info of messages in one call."""
+
+    def __init__(self, service):
+        self._service = service
+
+    @required_acl('chatd.users.me.rooms.{room_uuid}.metadata.read')
+    def get(self, room_uuid):
+        """Get reactions, reply info and thread summaries for a set of messages in a room.
+        
+        Query string: message_uuids (comma-separated), or before/after
+        (message UUID) and limit to select a page of messages.
+        """
+        query_args = MessagesMetadataQuerySchema().load(request.args)
+        result = self._service.get_messages_metadata(
+            tenant_uuid=token.tenant_uuid,
+            room_uuid=room_uuid,
+            current_user_uuid=token.user_uuid,
+            **query_args,
+        )
+        return RoomMessagesMetadataSchema().dump(result), 200
+
+
+# =============================================================================
+# Room Sync Resources
+# =============================================================================
+
+class RoomSyncResource(AuthResource):
+    """Resource for getting reaction and reply changes since a cursor."""
+
+    def __init__(self, service):
+        self._service = service
+
+    @required_acl('chatd.users.me.rooms.{room_uuid}.sync.read')
+    def get(self, room_uuid):
+        """Get the reactions created/deleted and replies created since a cursor.
+        
+        Query string: since (cursor from a previous response; omit it to get
+        the current cursor) and limit.
         """
-        result = self._service.get_room_reply_metadata(
+        query_args = RoomSyncQuerySchema().load(request.args)
+        result = self._service.get_changes(
             tenant_uuid=token.tenant_uuid,
             room_uuid=room_uuid,
+            **query_args,
         )
-        return RoomReplyMetadataSchema().dump(result), 200
+        return RoomSyncSchema().dump(result), 200
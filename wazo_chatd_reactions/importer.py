@@ -0,0 +1,264 @@
+# Copyright 2024 Community Contributors
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Bulk import of reply relationships and reactions, for history migrations.
+
+Rows are streamed from CSV files into a temporary table with PostgreSQL COPY,
+then inserted with a single statement per file, joined with
+chatd_room_message to resolve rooms and parent previews. Nothing goes through
+the services: no room is loaded and no notification is published.
+
+Imported rows are written to the chatd_room_message_change log, like the
+writes of the services, and the import result lists the rooms (and messages)
+whose versions must be bumped.
+"""
+
+import logging
+import time
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+# Seconds between two progress reports
+PROGRESS_INTERVAL = 5
+# Same limit as chatd_room_message_reaction.emoji
+MAX_EMOJI_LENGTH = 10
+# Rejected rows logged as examples
+REJECTED_EXAMPLES = 10
+
+
+class ImportResult:
+    """Counts of an import.
+
+    rooms maps the room of every inserted row to the messages whose
+    reactions changed (empty for replies, which only change their room).
+    """
+
+    def __init__(self, read, inserted, elapsed, rejected=0, rooms=None):
+        self.read = read
+        self.inserted = inserted
+        self.elapsed = elapsed
+        self.rejected = rejected
+        self.rooms = rooms or {}
+
+    @property
+    def skipped(self):
+        """Rows already present, or referencing unknown messages."""
+        return self.read - self.rejected - self.inserted
+
+    @property
+    def rate(self):
+        """Rows read per second."""
+        return self.read / self.elapsed if self.elapsed else 0
+
+
+class _ProgressReader:
+    """File wrapper reporting the progress of COPY as it reads the file."""
+
+    def __init__(self, file, total_bytes=None, interval=PROGRESS_INTERVAL,
+                 clock=time.monotonic):
+        self._file = file
+        self._total_bytes = total_bytes
+        self._interval = interval
+        self._clock = clock
+        self._started = clock()
+        self._next_report = self._started + interval
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        data = self._file.read(size)
+        self._count(len(data))
+        return data
+
+    def readline(self, size=-1):
+        data = self._file.readline(size)
+        self._count(len(data))
+        return data
+
+    def _count(self, size):
+        self.bytes_read += size
+        now = self._clock()
+        if now >= self._next_report:
+            self._next_report = now + self._interval
+            self._report(now)
+
+    def _report(self, now):
+        rate = self.bytes_read / (now - self._started) / 1e6
+        if self._total_bytes:
+            logger.info(
+                'Loaded %.1f of %.1f MB (%d%%), %.1f MB/s',
+                self.bytes_read / 1e6,
+                self._total_bytes / 1e6,
+                100 * self.bytes_read // self._total_bytes,
+                rate,
+            )
+        else:
+            logger.info('Loaded %.1f MB, %.1f MB/s', self.bytes_read / 1e6, rate)
+
+
+def import_replies(connection, file, total_bytes=None, header=True):
+    """Import reply relationships from a CSV file.
+
+    Columns: child_message_uuid, parent_message_uuid. The room and the parent
+    preview are taken from chatd_room_message. Replies whose messages are
+    unknown or in different rooms, or that already exist, are skipped.
+
+    Args:
+        connection: SQLAlchemy connection (psycopg2), inside a transaction
+        file: Binary file object to stream the CSV from
+        total_bytes: Size of the file, for progress reports (if known)
+        header: Whether the first line is a header to skip
+
+    Returns:
+        ImportResult
+    """
+    started = time.monotonic()
+    connection.execute(text("""
+        CREATE TEMPORARY TABLE reactions_import_reply (
+            child_message_uuid uuid NOT NULL,
+            parent_message_uuid uuid NOT NULL
+        ) ON COMMIT DROP
+    """))
+    read = _copy(connection, 'reactions_import_reply', file, total_bytes, header)
+
+    rows = connection.execute(text("""
+        WITH inserted AS (
+            INSERT INTO chatd_room_message_reply
+                (child_message_uuid, parent_message_uuid, room_uuid,
+                 parent_content_preview, parent_author_uuid, parent_author_alias,
+                 parent_created_at, created_at)
+            SELECT DISTINCT ON (i.child_message_uuid)
+                   i.child_message_uuid, i.parent_message_uuid, c.room_uuid,
+                   left(p.content, 200), p.user_uuid, p.alias,
+                   p.created_at, c.created_at
+            FROM reactions_import_reply i
+            INNER JOIN chatd_room_message c ON c.uuid = i.child_message_uuid
+            INNER JOIN chatd_room_message p
+                ON p.uuid = i.parent_message_uuid
+               AND p.room_uuid = c.room_uuid
+            ORDER BY i.child_message_uuid
+            ON CONFLICT DO NOTHING
+            RETURNING child_message_uuid, parent_message_uuid, room_uuid, created_at
+        ), logged AS (
+            INSERT INTO chatd_room_message_change
+                (room_uuid, txid, kind, message_uuid, parent_message_uuid, created_at)
+            SELECT room_uuid, CAST(CAST(pg_current_xact_id() AS text) AS bigint),
+                   'reply_created', child_message_uuid, parent_message_uuid, created_at
+            FROM inserted
+        )
+        SELECT room_uuid, COUNT(*)
+        FROM inserted
+        GROUP BY room_uuid
+    """)).fetchall()
+    return ImportResult(
+        read,
+        sum(count for _, count in rows),
+        time.monotonic() - started,
+        rooms={str(room_uuid): [] for room_uuid, _ in rows},
+    )
+
+
+def import_reactions(connection, file, total_bytes=None, header=True):
+    """Import reactions from a CSV file.
+
+    Columns: message_uuid, user_uuid, emoji, created_at. Rows with an empty
+    emoji, or longer than MAX_EMOJI_LENGTH characters, are rejected (and a few
+    of them logged). Reactions of unknown messages, or that already exist, are
+    skipped. The counts of every imported message are then recomputed in
+    chatd_room_message_reaction_summary.
+
+    Args: see import_replies
+
+    Returns:
+        ImportResult
+    """
+    started = time.monotonic()
+    connection.execute(text("""
+        CREATE TEMPORARY TABLE reactions_import_reaction (
+            message_uuid uuid NOT NULL,
+            user_uuid uuid NOT NULL,
+            emoji text,
+            created_at timestamptz NOT NULL
+        ) ON COMMIT DROP
+    """))
+    read = _copy(connection, 'reactions_import_reaction', file, total_bytes, header)
+    rejected = _reject_invalid_emojis(connection)
+
+    rows = connection.execute(text("""
+        WITH inserted AS (
+            INSERT INTO chatd_room_message_reaction
+                (room_uuid, message_uuid, user_uuid, emoji, created_at)
+            SELECT m.room_uuid, i.message_uuid, i.user_uuid, i.emoji, i.created_at
+            FROM reactions_import_reaction i
+            INNER JOIN chatd_room_message m ON m.uuid = i.message_uuid
+            ON CONFLICT DO NOTHING
+            RETURNING room_uuid, message_uuid, user_uuid, emoji, created_at
+        ), logged AS (
+            INSERT INTO chatd_room_message_change
+                (room_uuid, txid, kind, message_uuid, user_uuid, emoji, created_at)
+            SELECT room_uuid, CAST(CAST(pg_current_xact_id() AS text) AS bigint),
+                   'reaction_created', message_uuid, user_uuid, emoji, created_at
+            FROM inserted
+        )
+        SELECT room_uuid, message_uuid, COUNT(*)
+        FROM inserted
+        GROUP BY room_uuid, message_uuid
+    """)).fetchall()
+    rooms = {}
+    for room_uuid, message_uuid, _ in rows:
+        rooms.setdefault(str(room_uuid), []).append(str(message_uuid))
+    inserted = sum(count for _, _, count in rows)
+
+    # Same lock as rebuild-summary: concurrent writes wait for the new counts
+    logger.info('Updating the reaction counts of the imported messages')
+    connection.execute(text(
+        'LOCK TABLE chatd_room_message_reaction_summary IN EXCLUSIVE MODE'
+    ))
+    connection.execute(text("""
+        INSERT INTO chatd_room_message_reaction_summary
+            (room_uuid, message_uuid, emoji, count, created_at, last_updated)
+        SELECT r.room_uuid, r.message_uuid, r.emoji, COUNT(*), MIN(r.created_at), MAX(r.created_at)
+        FROM chatd_room_message_reaction r
+        WHERE r.message_uuid IN (SELECT message_uuid FROM reactions_import_reaction)
+        GROUP BY r.room_uuid, r.message_uuid, r.emoji
+        ON CONFLICT (message_uuid, emoji) DO UPDATE
+        SET count = EXCLUDED.count,
+            created_at = EXCLUDED.created_at,
+            last_updated = EXCLUDED.last_updated
+    """))
+    return ImportResult(read, inserted, time.monotonic() - started, rejected, rooms)
+
+
+def _reject_invalid_emojis(connection):
+    """Delete the imported reactions whose emoji does not fit; returns their count."""
+    rows = connection.execute(text("""
+        DELETE FROM reactions_import_reaction
+        WHERE emoji IS NULL
+           OR char_length(emoji) NOT BETWEEN 1 AND :max_length
+        RETURNING message_uuid, user_uuid, emoji
+    """), {'max_length': MAX_EMOJI_LENGTH}).fetchall()
+    for message_uuid, user_uuid, emoji in rows[:REJECTED_EXAMPLES]:
+        logger.warning(
+            'Rejected reaction of %s to %s: invalid emoji %r', user_uuid, message_uuid, emoji
+        )
+    if len(rows) > REJECTED_EXAMPLES:
+        logger.warning('... and %d more rejected reactions', len(rows) - REJECTED_EXAMPLES)
+    return len(rows)
+
+
+def _copy(connection, table, file, total_bytes, header):
+    """COPY a CSV file into a table; returns the number of rows read."""
+    reader = _ProgressReader(file, total_bytes)
+    cursor = connection.connection.cursor()
+    try:
+        cursor.copy_expert(
+            f'COPY {table} FROM STDIN WITH (FORMAT csv, HEADER {str(header).lower()})',
+            reader,
+        )
+        count = cursor.rowcount
+    finally:
+        cursor.close()
+    logger.info('Loaded %d rows (%.1f MB), inserting', count, reader.bytes_read / 1e6)
+    return count
@@ -0,0 +1,128 @@
+# Copyright 2024 Community Contributors
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Data Access Object for chatd room messages.
+
+This DAO resolves single messages from the chatd_room_message table, shared by
+the reaction and reply services. It never loads the room's message collection.
+"""
+
+import logging
+from collections import namedtuple
+
+from sqlalchemy import text
+
+# Import the scoped session directly from wazo-chatd
+from wazo_chatd.database.helpers import Session
+
+from .rows import map_row
+
+logger = logging.getLogger(__name__)
+
+
+class MessageDAO:
+    """DAO for message lookups in chatd_room_message."""
+
+    def __init__(self):
+        pass
+
+    @property
+    def _session(self):
+        """Get the current session."""
+        return Session()
+
+    def get(self, room_uuid, message_uuid):
+        """Get a message by UUID, only if it belongs to the room.
+
+        Uses the primary key on chatd_room_message, so the cost does not
+        depend on the number of messages in the room.
+
+        Returns:
+            MessageResult or None
+        """
+        query = text("""
+            SELECT uuid, room_uuid, user_uuid, alias, content, created_at
+            FROM chatd_room_message
+            WHERE uuid = :message_uuid
+              AND room_uuid = :room_uuid
+        """)
+        result = self._session.execute(
+            query,
+            {
+                'message_uuid': str(message_uuid),
+                'room_uuid': str(room_uuid),
+            }
+        ).fetchone()
+
+        return map_row(MessageResult, result)
+
+    def filter_uuids(self, room_uuid, message_uuids):
+        """Keep only the message UUIDs that belong to the room.
+
+        Returns:
+            List of message UUIDs, in the order they were given
+        """
+        if not message_uuids:
+            return []
+
+        query = text("""
+            SELECT uuid
+            FROM chatd_room_message
+            WHERE uuid = ANY(CAST(:message_uuids AS uuid[]))
+              AND room_uuid = :room_uuid
+        """)
+        results = self._session.execute(
+            query,
+            {
+                'message_uuids': [str(uuid) for uuid in message_uuids],
+                'room_uuid': str(room_uuid),
+            }
+        ).fetchall()
+
+        found = {str(row[0]) for row in results}
+        return [uuid for uuid in message_uuids if str(uuid) in found]
+
+    def list_uuids(self, room_uuid, limit, before=None, after=None):
+        """List message UUIDs of a room, using keyset pagination.
+
+        Messages are ordered by (created_at, uuid): newest first, or oldest
+        first when only `after` is given.
+
+        Args:
+            room_uuid: The room UUID
+            limit: Maximum number of message UUIDs to return
+            before: MessageResult; only list messages older than this one
+            after: MessageResult; only list messages newer than this one
+
+        Returns:
+            List of message UUIDs
+        """
+        conditions = ['room_uuid = :room_uuid']
+        params = {'room_uuid': str(room_uuid), 'limit': limit}
+        if before:
+            conditions.append('(created_at, uuid) < (:before_created_at, :before_uuid)')
+            params['before_created_at'] = before.created_at
+            params['before_uuid'] = str(before.uuid)
+        if after:
+            conditions.append('(created_at, uuid) > (:after_created_at, :after_uuid)')
+            params['after_created_at'] = after.created_at
+            params['after_uuid'] = str(after.uuid)
+        direction = 'ASC' if after and not before else 'DESC'
+
+        query = text(f"""
+            SELECT uuid
+            FROM chatd_room_message
+            WHERE {' AND '.join(conditions)}
+            ORDER BY created_at {direction}, uuid {direction}
+            LIMIT :limit
+        """)
+        results = self._session.execute(query, params).fetchall()
+
+        return [row[0] for row in results]
+
+
+class MessageResult(namedtuple('MessageResult', 'uuid room_uuid user_uuid alias content created_at')):
+    """Result row for message data."""
+
+    __slots__ = ()
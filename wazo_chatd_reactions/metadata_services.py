@@ -0,0 +1,66 @@
+# Copyright 2024 Community Contributors
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import logging
+
+from .rooms import get_message_window, get_room
+
+logger = logging.getLogger(__name__)
+
+
+class RoomMetadataService:
+    """Service for loading reactions and reply metadata of messages together."""
+
+    def __init__(self, room_cache, message_dao, reaction_service, reply_service):
+        """Initialize the room metadata service.
+
+        Args:
+            room_cache: RoomAccessCache for tenant-scoped room lookups
+            message_dao: MessageDAO for indexed message lookups
+            reaction_service: ReactionService building reaction summaries
+            reply_service: ReplyService building reply metadata
+        """
+        self._room_cache = room_cache
+        self._message_dao = message_dao
+        self._reaction_service = reaction_service
+        self._reply_service = reply_service
+
+    def get_messages_metadata(self, tenant_uuid, room_uuid, current_user_uuid,
+                              message_uuids=None, before=None, after=None, limit=None):
+        """Get reactions, reply info and thread summaries for a set of messages in a room.
+
+        Messages are either listed explicitly (message_uuids) or selected as a
+        page with before/after/limit, in which case a next_cursor is returned.
+        The room is resolved once for every kind of metadata.
+
+        Returns a dict mapping each message_uuid to its reactions, reply info
+        (None if the message is not a reply) and thread summary (None if the
+        message has no replies). Listed messages that do not belong to the
+        room are left out.
+        """
+        # Verify room exists and user has access
+        room = get_room(self._room_cache, tenant_uuid, room_uuid)
+
+        result = {'room_uuid': str(room_uuid)}
+        if message_uuids:
+            message_uuids = self._message_dao.filter_uuids(room.uuid, message_uuids)
+        else:
+            message_uuids, result['next_cursor'] = get_message_window(
+                self._message_dao, room, before, after, limit
+            )
+
+        reactions = self._reaction_service.get_reactions_for_messages(
+            room, message_uuids, current_user_uuid
+        )
+        replies = self._reply_service.get_reply_metadata_for_messages(room, message_uuids)
+        threads = self._reply_service.get_thread_summaries_for_messages(room, message_uuids)
+
+        result['messages'] = {
+            str(message_uuid): {
+                'reactions': reactions.get(str(message_uuid), []),
+                'reply': replies.get(str(message_uuid)),
+                'thread': threads.get(str(message_uuid)),
+            }
+            for message_uuid in message_uuids
+        }
+        return result
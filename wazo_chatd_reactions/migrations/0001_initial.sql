@@ -0,0 +1,68 @@
+-- Copyright 2024 Community Contributors
+-- SPDX-License-Identifier: GPL-3.0-or-later
+
+-- Initial schema. Idempotent, so installs that predate versioned migrations
+-- (where the rules created these tables directly) are brought under version
+-- control without changes.
+
+-- Create reactions table if it doesn't exist
+CREATE TABLE IF NOT EXISTS chatd_room_message_reaction (
+    message_uuid UUID NOT NULL,
+    user_uuid UUID NOT NULL,
+    emoji VARCHAR(10) NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT NOW() NOT NULL,
+    PRIMARY KEY (message_uuid, user_uuid, emoji),
+    CONSTRAINT fk_message
+        FOREIGN KEY (message_uuid)
+        REFERENCES chatd_room_message(uuid)
+        ON DELETE CASCADE
+);
+
+-- Create index for faster lookups by message
+CREATE INDEX IF NOT EXISTS idx_chatd_reaction_message_uuid 
+    ON chatd_room_message_reaction(message_uuid);
+
+-- Create index for faster lookups by user
+CREATE INDEX IF NOT EXISTS idx_chatd_reaction_user_uuid 
+    ON chatd_room_message_reaction(user_uuid);
+
+-- Grant permissions to wazo-chatd user (asterisk)
+GRANT SELECT, INSERT, DELETE ON chatd_room_message_reaction TO asterisk;
+
+-- Create replies table for message threading
+CREATE TABLE IF NOT EXISTS chatd_room_message_reply (
+    child_message_uuid UUID NOT NULL,
+    parent_message_uuid UUID,
+    room_uuid UUID NOT NULL,
+    parent_content_preview VARCHAR(200),
+    parent_author_uuid UUID,
+    parent_author_alias VARCHAR(256),
+    parent_created_at TIMESTAMPTZ,
+    created_at TIMESTAMPTZ DEFAULT NOW() NOT NULL,
+    PRIMARY KEY (child_message_uuid),
+    CONSTRAINT fk_child_message
+        FOREIGN KEY (child_message_uuid)
+        REFERENCES chatd_room_message(uuid)
+        ON DELETE CASCADE,
+    CONSTRAINT fk_parent_message
+        FOREIGN KEY (parent_message_uuid)
+        REFERENCES chatd_room_message(uuid)
+        ON DELETE SET NULL,
+    CONSTRAINT fk_room
+        FOREIGN KEY (room_uuid)
+        REFERENCES chatd_room(uuid)
+        ON DELETE CASCADE
+);
+
+-- Create indexes for reply lookups
+CREATE INDEX IF NOT EXISTS idx_chatd_reply_parent_uuid 
+    ON chatd_room_message_reply(parent_message_uuid);
+
+CREATE INDEX IF NOT EXISTS idx_chatd_reply_child_uuid 
+    ON chatd_room_message_reply(child_message_uuid);
+
+CREATE INDEX IF NOT EXISTS idx_chatd_reply_room_uuid 
+    ON chatd_room_message_reply(room_uuid);
+
+-- Grant permissions for replies table
+GRANT SELECT, INSERT, UPDATE, DELETE ON chatd_room_message_reply TO asterisk;
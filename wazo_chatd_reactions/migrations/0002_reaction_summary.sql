@@ -0,0 +1,31 @@
+-- Copyright 2024 Community Contributors
+-- SPDX-License-Identifier: GPL-3.0-or-later
+
+-- Per-message reaction counts, kept up to date by ReactionDAO. Idempotent,
+-- like 0001_initial: the install rules created this table before versioned
+-- migrations.
+
+-- Create per-message reaction counts table
+CREATE TABLE IF NOT EXISTS chatd_room_message_reaction_summary (
+    message_uuid UUID NOT NULL,
+    emoji VARCHAR(10) NOT NULL,
+    count INTEGER NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT NOW() NOT NULL,
+    last_updated TIMESTAMPTZ DEFAULT NOW() NOT NULL,
+    PRIMARY KEY (message_uuid, emoji),
+    CONSTRAINT fk_summary_message
+        FOREIGN KEY (message_uuid)
+        REFERENCES chatd_room_message(uuid)
+        ON DELETE CASCADE
+);
+
+-- Fill counts from existing reactions (only when the table was just created)
+INSERT INTO chatd_room_message_reaction_summary
+    (message_uuid, emoji, count, created_at, last_updated)
+SELECT message_uuid, emoji, COUNT(*), MIN(created_at), MAX(created_at)
+FROM chatd_room_message_reaction
+WHERE NOT EXISTS (SELECT 1 FROM chatd_room_message_reaction_summary)
+GROUP BY message_uuid, emoji;
+
+-- Grant permissions for reaction counts table
+GRANT SELECT, INSERT, UPDATE, DELETE ON chatd_room_message_reaction_summary TO asterisk;
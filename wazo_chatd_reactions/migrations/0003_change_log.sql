@@ -0,0 +1,33 @@
+-- Copyright 2024 Community Contributors
+-- SPDX-License-Identifier: GPL-3.0-or-later
+
+-- Change log of reactions and replies, read by the delta sync endpoint.
+-- Idempotent, like 0001_initial: the install rules created this table before
+-- versioned migrations.
+
+-- Create change log of reactions and replies, for delta sync
+CREATE TABLE IF NOT EXISTS chatd_room_message_change (
+    id BIGSERIAL PRIMARY KEY,
+    room_uuid UUID NOT NULL,
+    txid BIGINT NOT NULL,
+    kind VARCHAR(32) NOT NULL,
+    message_uuid UUID NOT NULL,
+    user_uuid UUID,
+    emoji VARCHAR(10),
+    parent_message_uuid UUID,
+    created_at TIMESTAMPTZ DEFAULT NOW() NOT NULL,
+    CONSTRAINT fk_change_room
+        FOREIGN KEY (room_uuid)
+        REFERENCES chatd_room(uuid)
+        ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_chatd_change_room_txid_id
+    ON chatd_room_message_change(room_uuid, txid, id);
+
+CREATE INDEX IF NOT EXISTS idx_chatd_change_created_at
+    ON chatd_room_message_change(created_at);
+
+-- Grant permissions for change log table
+GRANT SELECT, INSERT, DELETE ON chatd_room_message_change TO asterisk;
+GRANT USAGE ON SEQUENCE chatd_room_message_change_id_seq TO asterisk;
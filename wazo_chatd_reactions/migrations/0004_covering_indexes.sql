@@ -0,0 +1,37 @@
+-- Copyright 2024 Community Contributors
+-- SPDX-License-Identifier: GPL-3.0-or-later
+
+-- migrate: no-transaction
+
+-- Replace indexes duplicating the primary keys with covering indexes matched
+-- to the DAO queries (see plans.py for the EXPLAIN checks of each index).
+-- Built concurrently so reactions and replies can still be written
+-- meanwhile, and each new index is built before the one it replaces is
+-- dropped.
+
+-- Already served by the primary keys (message_uuid, user_uuid, emoji) and
+-- (child_message_uuid)
+DROP INDEX CONCURRENTLY IF EXISTS idx_chatd_reaction_message_uuid;
+DROP INDEX CONCURRENTLY IF EXISTS idx_chatd_reply_child_uuid;
+
+-- Reactions of messages in reaction order (get_by_message, get_by_room,
+-- get_all_for_room, summaries), without reading the table
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_chatd_reaction_message_created
+    ON chatd_room_message_reaction(message_uuid, created_at)
+    INCLUDE (user_uuid, emoji);
+
+-- Emojis of a user per message (reacted_by_me overlay)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_chatd_reaction_user_message
+    ON chatd_room_message_reaction(user_uuid, message_uuid)
+    INCLUDE (emoji);
+DROP INDEX CONCURRENTLY IF EXISTS idx_chatd_reaction_user_uuid;
+
+-- Replies to a message in reply order, and reply counts
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_chatd_reply_parent_created
+    ON chatd_room_message_reply(parent_message_uuid, created_at);
+DROP INDEX CONCURRENTLY IF EXISTS idx_chatd_reply_parent_uuid;
+
+-- Replies of a room in reply order (room reply metadata)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_chatd_reply_room_created
+    ON chatd_room_message_reply(room_uuid, created_at);
+DROP INDEX CONCURRENTLY IF EXISTS idx_chatd_reply_room_uuid;
@@ -0,0 +1,40 @@
+-- Copyright 2024 Community Contributors
+-- SPDX-License-Identifier: GPL-3.0-or-later
+
+-- Store the room of each reaction and reaction count, like
+-- chatd_room_message_reply, so room reads do not join chatd_room_message.
+--
+-- The columns are nullable so they are added without rewriting the tables.
+-- Existing rows are filled in by the backfill-reaction-rooms admin command
+-- (run by the install rules), in short batches; migration 0007 then makes
+-- sure no row is left without a room.
+
+ALTER TABLE chatd_room_message_reaction ADD COLUMN IF NOT EXISTS room_uuid UUID;
+ALTER TABLE chatd_room_message_reaction_summary ADD COLUMN IF NOT EXISTS room_uuid UUID;
+
+-- Writers that do not set the room (older plugin versions still running
+-- during an upgrade, manual inserts) get it from the message
+CREATE OR REPLACE FUNCTION chatd_room_message_reaction_set_room_uuid()
+RETURNS trigger AS $$
+BEGIN
+    IF NEW.room_uuid IS NULL THEN
+        SELECT room_uuid INTO NEW.room_uuid
+        FROM chatd_room_message
+        WHERE uuid = NEW.message_uuid;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS chatd_room_message_reaction_room_uuid ON chatd_room_message_reaction;
+CREATE TRIGGER chatd_room_message_reaction_room_uuid
+    BEFORE INSERT ON chatd_room_message_reaction
+    FOR EACH ROW
+    EXECUTE FUNCTION chatd_room_message_reaction_set_room_uuid();
+
+DROP TRIGGER IF EXISTS chatd_room_message_reaction_summary_room_uuid
+    ON chatd_room_message_reaction_summary;
+CREATE TRIGGER chatd_room_message_reaction_summary_room_uuid
+    BEFORE INSERT ON chatd_room_message_reaction_summary
+    FOR EACH ROW
+    EXECUTE FUNCTION chatd_room_message_reaction_set_room_uuid();
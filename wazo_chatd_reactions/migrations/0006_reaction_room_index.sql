@@ -0,0 +1,16 @@
+-- Copyright 2024 Community Contributors
+-- SPDX-License-Identifier: GPL-3.0-or-later
+
+-- migrate: no-transaction
+
+-- Reactions of a room by message, in reaction order (get_all_for_room, room
+-- summaries, reacted_by_me overlay), and reaction counts of a room by message
+-- (room counts), without reading the tables. Built concurrently so reactions
+-- can still be written meanwhile.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_chatd_reaction_room_message
+    ON chatd_room_message_reaction(room_uuid, message_uuid, created_at)
+    INCLUDE (user_uuid, emoji);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_chatd_reaction_summary_room_message
+    ON chatd_room_message_reaction_summary(room_uuid, message_uuid);
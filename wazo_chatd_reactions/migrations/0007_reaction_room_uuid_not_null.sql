@@ -0,0 +1,15 @@
+-- Copyright 2024 Community Contributors
+-- SPDX-License-Identifier: GPL-3.0-or-later
+
+-- Reactions and reaction counts without a room are rejected from now on.
+-- The constraints are added NOT VALID, which does not read the tables: the
+-- backfill-reaction-rooms admin command validates them once every existing
+-- row has its room (validation does not block writes).
+
+ALTER TABLE chatd_room_message_reaction
+    ADD CONSTRAINT chatd_room_message_reaction_room_uuid_not_null
+    CHECK (room_uuid IS NOT NULL) NOT VALID;
+
+ALTER TABLE chatd_room_message_reaction_summary
+    ADD CONSTRAINT chatd_room_message_reaction_summary_room_uuid_not_null
+    CHECK (room_uuid IS NOT NULL) NOT VALID;
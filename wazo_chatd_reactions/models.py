@@ -3,7 +3,17 @@
 
 from datetime import datetime, timezone
 
-from sqlalchemy import Column, DateTime, ForeignKey, Index, String, Text, text
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+    text,
+)
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy_utils import UUIDType, generic_repr
 
@@ -18,12 +28,32 @@ class RoomMessageReaction(Base):
     
     Each row represents one user's reaction (emoji) to a message.
     A user can add multiple different emojis to a message, but not the same emoji twice.
+    
+    The table may be hash-partitioned by room_uuid (partition admin command),
+    in which case room_uuid is also part of the primary key.
     """
     
     __tablename__ = 'chatd_room_message_reaction'
     __table_args__ = (
-        Index('idx_chatd_reaction_message_uuid', 'message_uuid'),
-        Index('idx_chatd_reaction_user_uuid', 'user_uuid'),
+        Index(
+            'idx_chatd_reaction_message_created',
+            'message_uuid',
+            'created_at',
+            postgresql_include=['user_uuid', 'emoji'],
+        ),
+        Index(
+            'idx_chatd_reaction_user_message',
+            'user_uuid',
+            'message_uuid',
+            postgresql_include=['emoji'],
+        ),
+        Index(
+            'idx_chatd_reaction_room_message',
+            'room_uuid',
+            'message_uuid',
+            'created_at',
+            postgresql_include=['user_uuid', 'emoji'],
+        ),
     )
 
     message_uuid = Column(
@@ -45,6 +75,15 @@ class RoomMessageReaction(Base):
         nullable=False,
     )
 
+    # Room of the message; set by a trigger when not given. Nullable only
+    # so that it could be added online: a check constraint rejects NULL,
+    # validated once existing rows are backfilled (backfill-reaction-rooms
+    # admin command)
+    room_uuid = Column(
+        UUIDType(),
+        nullable=True,
+    )
+
     created_at = Column(
         DateTime(timezone=True),
         default=lambda: datetime.now(timezone.utc),
@@ -53,6 +92,60 @@ class RoomMessageReaction(Base):
     )
 
 
+@generic_repr
+class RoomMessageReactionSummary(Base):
+    """Model for per-message reaction counts.
+    
+    Each row holds the number of reactions with one emoji on one message.
+    It is maintained in the same transaction as chatd_room_message_reaction,
+    so counts can be read without scanning individual reactions.
+    """
+    
+    __tablename__ = 'chatd_room_message_reaction_summary'
+    __table_args__ = (
+        Index('idx_chatd_reaction_summary_room_message', 'room_uuid', 'message_uuid'),
+    )
+
+    message_uuid = Column(
+        UUIDType(),
+        ForeignKey('chatd_room_message.uuid', ondelete='CASCADE'),
+        primary_key=True,
+        nullable=False,
+    )
+
+    emoji = Column(
+        String(10),
+        primary_key=True,
+        nullable=False,
+    )
+
+    # Room of the message, like RoomMessageReaction.room_uuid
+    room_uuid = Column(
+        UUIDType(),
+        nullable=True,
+    )
+
+    count = Column(
+        Integer,
+        nullable=False,
+    )
+
+    # When the first reaction of this group was added (used for ordering)
+    created_at = Column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        server_default=text("(now() at time zone 'utc')"),
+        nullable=False,
+    )
+
+    last_updated = Column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        server_default=text("(now() at time zone 'utc')"),
+        nullable=False,
+    )
+
+
 @generic_repr
 class RoomMessageReply(Base):
     """Model for message reply relationships.
@@ -62,13 +155,14 @@ class RoomMessageReply(Base):
     
     Note: The actual reply message is stored in chatd_room_message table.
     This table only tracks the relationship and cached preview.
+    
+    Like reactions, the table may be hash-partitioned by room_uuid.
     """
     
     __tablename__ = 'chatd_room_message_reply'
     __table_args__ = (
-        Index('idx_chatd_reply_parent_uuid', 'parent_message_uuid'),
-        Index('idx_chatd_reply_child_uuid', 'child_message_uuid'),
-        Index('idx_chatd_reply_room_uuid', 'room_uuid'),
+        Index('idx_chatd_reply_parent_created', 'parent_message_uuid', 'created_at'),
+        Index('idx_chatd_reply_room_created', 'room_uuid', 'created_at'),
     )
 
     # The reply message UUID (child)
@@ -121,3 +215,69 @@ class RoomMessageReply(Base):
         server_default=text("(now() at time zone 'utc')"),
         nullable=False,
     )
+
+
+@generic_repr
+class RoomMessageChange(Base):
+    """Model for the change log of reactions and replies.
+    
+    Each row records one reaction created or deleted, or one reply created,
+    in a room. Rows are written in the same transaction as the change and
+    are read by the delta sync endpoint. Deleted reactions are only kept
+    here, as tombstones.
+    """
+    
+    __tablename__ = 'chatd_room_message_change'
+    __table_args__ = (
+        Index('idx_chatd_change_room_txid_id', 'room_uuid', 'txid', 'id'),
+        Index('idx_chatd_change_created_at', 'created_at'),
+    )
+
+    id = Column(BigInteger, primary_key=True)
+
+    room_uuid = Column(
+        UUIDType(),
+        ForeignKey('chatd_room.uuid', ondelete='CASCADE'),
+        nullable=False,
+    )
+
+    # Transaction ID of the change: changes are synced in (txid, id) order,
+    # only once every older transaction has ended
+    txid = Column(BigInteger, nullable=False)
+
+    # reaction_created, reaction_deleted or reply_created
+    kind = Column(String(32), nullable=False)
+
+    # No foreign key: tombstones outlive the message
+    message_uuid = Column(UUIDType(), nullable=False)
+
+    user_uuid = Column(UUIDType(), nullable=True)
+
+    emoji = Column(String(10), nullable=True)
+
+    parent_message_uuid = Column(UUIDType(), nullable=True)
+
+    created_at = Column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        server_default=text("(now() at time zone 'utc')"),
+        nullable=False,
+    )
+
+
+@generic_repr
+class ReactionsSchemaVersion(Base):
+    """Model for the applied schema migrations of the plugin (see schema.py)."""
+    
+    __tablename__ = 'chatd_reactions_schema_version'
+
+    version = Column(Integer, primary_key=True, autoincrement=False)
+
+    name = Column(String(128), nullable=False)
+
+    applied_at = Column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        server_default=text("(now() at time zone 'utc')"),
+        nullable=False,
+    )
@@ -3,20 +3,57 @@
 
 import logging
 
+from .coalesce import ReactionCoalescer
 from .events import (
+    RoomMessageReactionCreatedEvent,
+    RoomMessageReactionDeletedEvent,
+    RoomMessageReactionsChangedEvent,
+    RoomMessageReplyCreatedEvent,
     UserRoomMessageReactionCreatedEvent,
     UserRoomMessageReactionDeletedEvent,
+    UserRoomMessageReactionsChangedEvent,
     UserRoomMessageReplyCreatedEvent,
 )
 
 logger = logging.getLogger(__name__)
 
+# Publish one event per room member
+FANOUT_USER = 'user'
+# Publish one event per room, expanded to members by the websocket layer
+FANOUT_ROOM = 'room'
+
 
 class ReactionNotifier:
     """Notifier for reaction events via WebSocket/Bus."""
 
-    def __init__(self, bus_publisher):
+    def __init__(self, bus_publisher, fanout=FANOUT_USER, dispatcher=None,
+                 coalesce_window_ms=0):
+        """Initialize the notifier.
+        
+        Args:
+            bus_publisher: Bus publisher for events
+            fanout: FANOUT_USER or FANOUT_ROOM
+            dispatcher: NotificationDispatcher to publish from background
+                threads; events are published inline if None
+            coalesce_window_ms: If > 0, reaction created/deleted events are
+                merged per message over this window into a single
+                reactions_changed event
+        """
+        if fanout not in (FANOUT_USER, FANOUT_ROOM):
+            raise ValueError(f'Unknown notification fanout: {fanout}')
         self._bus_publisher = bus_publisher
+        self._fanout = fanout
+        self._dispatcher = dispatcher
+        self._coalescer = None
+        if coalesce_window_ms > 0:
+            self._coalescer = ReactionCoalescer(
+                self._reactions_changed, window_ms=coalesce_window_ms
+            )
+
+    @property
+    def coalescer(self):
+        """ReactionCoalescer to be started with the plugin, or None if disabled."""
+        return self._coalescer
 
     def reaction_created(self, room, message, reaction):
         """Notify all room users that a reaction was created."""
@@ -26,26 +63,15 @@ class ReactionNotifier:
             reaction.user_uuid,
             reaction.emoji,
         )
+        if self._coalescer and self._coalescer.reaction_added(
+            room, reaction.message_uuid, reaction.user_uuid, reaction.emoji
+        ):
+            return
         
-        # Include room_uuid and message_uuid in data for WebSocket clients
-        reaction_data = {
-            'emoji': reaction.emoji,
-            'user_uuid': str(reaction.user_uuid),
-            'created_at': reaction.created_at.isoformat() if reaction.created_at else None,
-            'room_uuid': str(room.uuid),
-            'message_uuid': str(reaction.message_uuid),
-        }
-        
-        # Notify each user in the room
-        for user in room.users:
-            event = UserRoomMessageReactionCreatedEvent(
-                reaction_data,
-                room_uuid=str(room.uuid),
-                message_uuid=str(reaction.message_uuid),
-                tenant_uuid=str(room.tenant_uuid),
-                user_uuid=str(user.uuid),
-            )
-            self._bus_publisher.publish(event)
+        user_event_class, room_event_class, data, kwargs = self._reaction_created_event(
+            room, reaction
+        )
+        self._publish(room, user_event_class, room_event_class, data, **kwargs)
 
     def reaction_deleted(self, room, message, user_uuid, emoji):
         """Notify all room users that a reaction was deleted."""
@@ -55,25 +81,128 @@ class ReactionNotifier:
             user_uuid,
             emoji,
         )
+        if self._coalescer and self._coalescer.reaction_removed(
+            room, message.uuid, user_uuid, emoji
+        ):
+            return
         
+        user_event_class, room_event_class, data, kwargs = self._reaction_deleted_event(
+            room, message.uuid, user_uuid, emoji
+        )
+        self._publish(room, user_event_class, room_event_class, data, **kwargs)
+
+    def reactions_bulk_changed(self, room, created, deleted):
+        """Notify all room users of the reactions written by a bulk request.
+
+        The same reaction created/deleted events as the single-reaction
+        endpoints are published, all of them by a single dispatcher job. With
+        coalescing enabled, the changes are merged with the other changes of
+        each message instead.
+
+        Args:
+            room: The room
+            created: ReactionResult list of the reactions created
+            deleted: ReactionResult list of the reactions deleted
+        """
+        events = []
+        for reaction in created:
+            if self._coalescer and self._coalescer.reaction_added(
+                room, reaction.message_uuid, reaction.user_uuid, reaction.emoji
+            ):
+                continue
+            events.append(self._reaction_created_event(room, reaction))
+        for reaction in deleted:
+            if self._coalescer and self._coalescer.reaction_removed(
+                room, reaction.message_uuid, reaction.user_uuid, reaction.emoji
+            ):
+                continue
+            events.append(self._reaction_deleted_event(
+                room, reaction.message_uuid, reaction.user_uuid, reaction.emoji
+            ))
+
+        logger.debug(
+            'Notifying bulk reactions changed: room=%s, events=%s',
+            room.uuid,
+            len(events),
+        )
+        if not events:
+            return
+        if self._dispatcher:
+            self._dispatcher.submit(self._fan_out_many, room, events)
+        else:
+            self._fan_out_many(room, events)
+
+    def _reaction_created_event(self, room, reaction):
+        """Build the (user event class, room event class, data, kwargs) of a reaction_created event."""
+        # Include room_uuid and message_uuid in data for WebSocket clients
+        reaction_data = {
+            'emoji': reaction.emoji,
+            'user_uuid': str(reaction.user_uuid),
+            'created_at': reaction.created_at.isoformat() if reaction.created_at else None,
+            'room_uuid': str(room.uuid),
+            'message_uuid': str(reaction.message_uuid),
+        }
+        kwargs = {
+            'room_uuid': str(room.uuid),
+            'message_uuid': str(reaction.message_uuid),
+        }
+        return (
+            UserRoomMessageReactionCreatedEvent,
+            RoomMessageReactionCreatedEvent,
+            reaction_data,
+            kwargs,
+        )
+
+    def _reaction_deleted_event(self, room, message_uuid, user_uuid, emoji):
+        """Build the (user event class, room event class, data, kwargs) of a reaction_deleted event."""
         # Include room_uuid and message_uuid in data for WebSocket clients
         reaction_data = {
             'emoji': emoji,
             'user_uuid': str(user_uuid),
             'room_uuid': str(room.uuid),
-            'message_uuid': str(message.uuid),
+            'message_uuid': str(message_uuid),
         }
-        
-        # Notify each user in the room
-        for user in room.users:
-            event = UserRoomMessageReactionDeletedEvent(
-                reaction_data,
-                room_uuid=str(room.uuid),
-                message_uuid=str(message.uuid),
-                tenant_uuid=str(room.tenant_uuid),
-                user_uuid=str(user.uuid),
-            )
-            self._bus_publisher.publish(event)
+        kwargs = {
+            'room_uuid': str(room.uuid),
+            'message_uuid': str(message_uuid),
+        }
+        return (
+            UserRoomMessageReactionDeletedEvent,
+            RoomMessageReactionDeletedEvent,
+            reaction_data,
+            kwargs,
+        )
+
+    def _reactions_changed(self, room, message_uuid, changes, since):
+        """Notify all room users of the coalesced reaction changes of a message."""
+        logger.debug(
+            'Notifying reactions changed: message=%s, emojis=%s',
+            message_uuid,
+            len(changes),
+        )
+        user_event_class, room_event_class, data, kwargs = self._reactions_changed_event(
+            room, message_uuid, changes, since
+        )
+        self._publish(room, user_event_class, room_event_class, data, **kwargs)
+
+    def _reactions_changed_event(self, room, message_uuid, changes, since):
+        """Build the (user event class, room event class, data, kwargs) of a reactions_changed event."""
+        changes_data = {
+            'room_uuid': str(room.uuid),
+            'message_uuid': str(message_uuid),
+            'since': since.isoformat(),
+            'reactions': changes,
+        }
+        kwargs = {
+            'room_uuid': str(room.uuid),
+            'message_uuid': str(message_uuid),
+        }
+        return (
+            UserRoomMessageReactionsChangedEvent,
+            RoomMessageReactionsChangedEvent,
+            changes_data,
+            kwargs,
+        )
 
     def reply_created(self, room, child_message, parent_message, reply):
         """Notify all room users that a reply was created."""
@@ -97,14 +226,48 @@ class ReactionNotifier:
             'created_at': reply.created_at.isoformat() if reply.created_at else None,
         }
         
+        self._publish(
+            room,
+            UserRoomMessageReplyCreatedEvent,
+            RoomMessageReplyCreatedEvent,
+            reply_data,
+            room_uuid=str(room.uuid),
+            parent_message_uuid=str(reply.parent_message_uuid),
+            child_message_uuid=str(reply.child_message_uuid),
+        )
+
+    def _publish(self, room, user_event_class, room_event_class, data, **kwargs):
+        """Publish an event to all room users, in the background if possible."""
+        if self._dispatcher:
+            self._dispatcher.submit(
+                self._fan_out, room, user_event_class, room_event_class, data, **kwargs
+            )
+        else:
+            self._fan_out(room, user_event_class, room_event_class, data, **kwargs)
+
+    def _fan_out_many(self, room, events):
+        """Publish several (user event class, room event class, data, kwargs) events."""
+        for user_event_class, room_event_class, data, kwargs in events:
+            self._fan_out(room, user_event_class, room_event_class, data, **kwargs)
+
+    def _fan_out(self, room, user_event_class, room_event_class, data, **kwargs):
+        """Publish an event to all room users, according to the fanout mode."""
+        if self._fanout == FANOUT_ROOM:
+            event = room_event_class(
+                data,
+                tenant_uuid=str(room.tenant_uuid),
+                user_uuids=sorted(room.user_uuids),
+                **kwargs,
+            )
+            self._bus_publisher.publish(event)
+            return
+
         # Notify each user in the room
-        for user in room.users:
-            event = UserRoomMessageReplyCreatedEvent(
-                reply_data,
-                room_uuid=str(room.uuid),
-                parent_message_uuid=str(reply.parent_message_uuid),
-                child_message_uuid=str(reply.child_message_uuid),
+        for member_uuid in room.user_uuids:
+            event = user_event_class(
+                data,
                 tenant_uuid=str(room.tenant_uuid),
-                user_uuid=str(user.uuid),
+                user_uuid=member_uuid,
+                **kwargs,
             )
             self._bus_publisher.publish(event)
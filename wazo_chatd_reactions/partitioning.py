@@ -0,0 +1,166 @@
+# Copyright 2024 Community Contributors
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Optional hash partitioning by room of the reaction and reply tables.
+
+On large installs, partitioning chatd_room_message_reaction and
+chatd_room_message_reply by hash of room_uuid keeps each partition (and its
+indexes) small enough for vacuum and index maintenance, and every DAO query
+has a room_uuid predicate so it only reads the partition of its room.
+
+Tables are switched by copying them into a new partitioned table, which
+replaces the original in the same transaction. Writes wait until the end of
+the copy (reads go on), so it is meant for a maintenance window. room_uuid
+becomes part of the primary key, which is still unique since a message
+belongs to a single room.
+
+The BEFORE INSERT trigger setting the room of reactions is not kept: it
+cannot move a row to another partition, so writers must set room_uuid (the
+DAO and the importer do). Migrations touching these tables must support both
+layouts (e.g. no CREATE INDEX CONCURRENTLY on a partitioned table).
+
+Range partitioning by created_at is not offered: no query filters on
+creation time, so it would not prune, and the time column would have to be
+part of every primary key.
+"""
+
+import logging
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+
+class PartitionedTable:
+    """Layout of a table once partitioned: keys, constraints and indexes."""
+
+    def __init__(self, name, primary_key, foreign_keys, indexes, grants):
+        """Initialize the layout.
+
+        Args:
+            name: Name of the table
+            primary_key: Primary key columns, starting with room_uuid
+            foreign_keys: Constraint name -> constraint SQL
+            indexes: Index name -> index SQL (columns and INCLUDE)
+            grants: Privileges of the wazo-chatd user
+        """
+        self.name = name
+        self.primary_key = primary_key
+        self.foreign_keys = foreign_keys
+        self.indexes = indexes
+        self.grants = grants
+
+
+TABLES = {
+    'reactions': PartitionedTable(
+        'chatd_room_message_reaction',
+        ['room_uuid', 'message_uuid', 'user_uuid', 'emoji'],
+        {
+            'fk_message': 'FOREIGN KEY (message_uuid) '
+                          'REFERENCES chatd_room_message(uuid) ON DELETE CASCADE',
+        },
+        {
+            'idx_chatd_reaction_message_created':
+                '(message_uuid, created_at) INCLUDE (user_uuid, emoji)',
+            'idx_chatd_reaction_user_message': '(user_uuid, message_uuid) INCLUDE (emoji)',
+            'idx_chatd_reaction_room_message':
+                '(room_uuid, message_uuid, created_at) INCLUDE (user_uuid, emoji)',
+        },
+        'SELECT, INSERT, DELETE',
+    ),
+    'replies': PartitionedTable(
+        'chatd_room_message_reply',
+        ['room_uuid', 'child_message_uuid'],
+        {
+            'fk_child_message': 'FOREIGN KEY (child_message_uuid) '
+                                'REFERENCES chatd_room_message(uuid) ON DELETE CASCADE',
+            'fk_parent_message': 'FOREIGN KEY (parent_message_uuid) '
+                                 'REFERENCES chatd_room_message(uuid) ON DELETE SET NULL',
+            'fk_room': 'FOREIGN KEY (room_uuid) '
+                       'REFERENCES chatd_room(uuid) ON DELETE CASCADE',
+        },
+        {
+            'idx_chatd_reply_parent_created': '(parent_message_uuid, created_at)',
+            'idx_chatd_reply_room_created': '(room_uuid, created_at)',
+        },
+        'SELECT, INSERT, UPDATE, DELETE',
+    ),
+}
+
+
+def get_partition_count(connection, table_name):
+    """Get the number of partitions of a table (0 if it is not partitioned)."""
+    return connection.execute(text("""
+        SELECT COUNT(i.inhrelid)
+        FROM pg_partitioned_table pt
+        LEFT JOIN pg_inherits i ON i.inhparent = pt.partrelid
+        WHERE pt.partrelid = to_regclass(:table_name)
+    """), {'table_name': table_name}).scalar()
+
+
+def partition_table(connection, table, partitions):
+    """Replace a table with a copy hash-partitioned by room_uuid.
+
+    Also repartitions an already partitioned table with another number of
+    partitions.
+
+    Args:
+        connection: SQLAlchemy connection, inside a transaction (run as the
+            table owner)
+        table: PartitionedTable
+        partitions: Number of partitions (at least 2)
+
+    Returns:
+        Number of rows copied
+
+    Raises:
+        ValueError: if the table already has this number of partitions, or
+            has rows without a room
+    """
+    name = table.name
+    if partitions < 2:
+        raise ValueError('At least 2 partitions are needed')
+    if get_partition_count(connection, name) == partitions:
+        raise ValueError(f'{name} already has {partitions} partitions')
+
+    # Reads go on during the copy, writes wait for the new table
+    connection.execute(text(f'LOCK TABLE {name} IN SHARE MODE'))
+    if connection.execute(text(
+        f'SELECT EXISTS (SELECT 1 FROM {name} WHERE room_uuid IS NULL)'
+    )).scalar():
+        raise ValueError(f'{name} has rows without a room, run backfill-reaction-rooms first')
+
+    new_name = f'{name}_new'
+    connection.execute(text(f"""
+        CREATE TABLE {new_name} (LIKE {name} INCLUDING DEFAULTS)
+        PARTITION BY HASH (room_uuid)
+    """))
+    connection.execute(text(f'ALTER TABLE {new_name} ALTER COLUMN room_uuid SET NOT NULL'))
+    for remainder in range(partitions):
+        # Named after the partition count, so a repartitioned table does not
+        # clash with the partitions it replaces
+        connection.execute(text(f"""
+            CREATE TABLE {name}_h{partitions}_{remainder}
+            PARTITION OF {new_name}
+            FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})
+        """))
+
+    logger.info('Copying %s into %d partitions', name, partitions)
+    count = connection.execute(text(f'INSERT INTO {new_name} SELECT * FROM {name}')).rowcount
+
+    # Constraint and index names are freed by the old table
+    connection.execute(text(f'DROP TABLE {name}'))
+    connection.execute(text(f'ALTER TABLE {new_name} RENAME TO {name}'))
+    logger.info('Building the keys and indexes of %s', name)
+    connection.execute(text(f"""
+        ALTER TABLE {name}
+        ADD CONSTRAINT {name}_pkey PRIMARY KEY ({', '.join(table.primary_key)})
+    """))
+    for constraint, sql in table.foreign_keys.items():
+        connection.execute(text(f'ALTER TABLE {name} ADD CONSTRAINT {constraint} {sql}'))
+    for index, sql in table.indexes.items():
+        connection.execute(text(f'CREATE INDEX {index} ON {name} {sql}'))
+    connection.execute(text(f'GRANT {table.grants} ON {name} TO asterisk'))
+    connection.execute(text(f'ANALYZE {name}'))
+    return count
@@ -0,0 +1,268 @@
+# Copyright 2024 Community Contributors
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+EXPLAIN-based checks that the DAO queries are served by the expected indexes.
+
+Each check runs the SQL of a DAO query (the *_SQL constants of the DAO
+modules) with placeholder parameters. Sequential scans are disabled while
+checking, and the generic plan of the query is checked: it is planned from
+the average selectivity of each column, as for a typical room, rather than
+for the placeholder values (which match no row, so that any index looks as
+cheap as another). On a database with real data, an
+unexpected plan points at a missing index or a query that no longer matches
+it. Add a check with every migration that adds or changes an index.
+
+Checks of the order an index gives (no_sort) are run with sorts disabled, so
+they verify that an index can give the order, not that it is cheaper than
+sorting, which it is not on small tables. On a table without rows, e.g.
+right after install, the planner has no statistics to prefer an index to
+another: checks then only require one of their indexes to exist.
+
+On partitioned tables (see partitioning.py), indexes of partitions count as
+their parent index, and a plan reading more than one partition of a table is
+reported: every checked query filters on a room.
+"""
+
+import re
+
+from sqlalchemy import text
+
+from . import change_dao, dao, reply_dao
+
+_UUID = '00000000-0000-0000-0000-000000000000'
+
+_SORT_NODES = ('Sort', 'Incremental Sort')
+
+_PARAM_RE = re.compile(r'(?<!:):(\w+)')
+
+
+class PlanCheck:
+    """A query and the indexes its plan may use."""
+
+    def __init__(self, name, query, params, indexes, no_sort=False):
+        """Initialize the check.
+
+        Args:
+            name: Name of the check (DAO method)
+            query: SQL of the query
+            params: Placeholder bind parameters
+            indexes: Names of indexes, at least one of which the plan must use
+            no_sort: Whether the index must also provide the order (no Sort node)
+        """
+        self.name = name
+        self.query = query
+        self.params = params
+        self.indexes = indexes
+        self.no_sort = no_sort
+
+
+PLAN_CHECKS = [
+    PlanCheck(
+        'ReactionDAO.get_by_message',
+        dao.GET_BY_MESSAGE_SQL,
+        {'room_uuid': _UUID, 'message_uuid': _UUID},
+        ['idx_chatd_reaction_message_created', 'idx_chatd_reaction_room_message'],
+        no_sort=True,
+    ),
+    PlanCheck(
+        'ReactionDAO.get_by_room',
+        dao.GET_BY_ROOM_SQL,
+        {'room_uuid': _UUID, 'message_uuids': [_UUID]},
+        # Or the primary key, which also finds the reactions of a list of
+        # messages (sorted afterwards)
+        [
+            'idx_chatd_reaction_message_created',
+            'idx_chatd_reaction_room_message',
+            'chatd_room_message_reaction_pkey',
+        ],
+    ),
+    PlanCheck(
+        'ReactionDAO.get_summaries_by_message',
+        dao.GET_SUMMARIES_BY_MESSAGE_SQL,
+        {'room_uuid': _UUID, 'message_uuid': _UUID, 'current_user_uuid': _UUID},
+        ['idx_chatd_reaction_message_created', 'idx_chatd_reaction_room_message'],
+    ),
+    PlanCheck(
+        'ReactionDAO.get_all_for_room',
+        dao.GET_ALL_FOR_ROOM_SQL,
+        {'room_uuid': _UUID},
+        ['idx_chatd_reaction_room_message'],
+        no_sort=True,
+    ),
+    PlanCheck(
+        'ReactionDAO.get_summaries_for_room',
+        dao.GET_SUMMARIES_FOR_ROOM_SQL,
+        {'room_uuid': _UUID, 'current_user_uuid': _UUID},
+        # Or the primary key, which leads with room_uuid on a partitioned table
+        ['idx_chatd_reaction_room_message', 'chatd_room_message_reaction_pkey'],
+    ),
+    PlanCheck(
+        'ReactionDAO.get_user_emojis_for_room',
+        dao.GET_USER_EMOJIS_FOR_ROOM_SQL.format(message_filter=''),
+        {'user_uuid': _UUID, 'room_uuid': _UUID},
+        # From the room's reactions, or from the user's reactions
+        ['idx_chatd_reaction_room_message', 'idx_chatd_reaction_user_message'],
+    ),
+    PlanCheck(
+        'ReactionDAO.get_counts_by_message',
+        dao.GET_COUNTS_BY_MESSAGE_SQL,
+        {'room_uuid': _UUID, 'message_uuid': _UUID, 'current_user_uuid': _UUID},
+        ['chatd_room_message_reaction_summary_pkey'],
+    ),
+    PlanCheck(
+        'ReactionDAO.get_counts_for_room',
+        dao.GET_COUNTS_FOR_ROOM_SQL,
+        {'room_uuid': _UUID, 'current_user_uuid': _UUID},
+        ['idx_chatd_reaction_summary_room_message'],
+    ),
+    PlanCheck(
+        'ReplyDAO.get_by_child',
+        reply_dao.GET_BY_CHILD_SQL,
+        {'room_uuid': _UUID, 'child_message_uuid': _UUID},
+        ['chatd_room_message_reply_pkey'],
+    ),
+    PlanCheck(
+        'ReplyDAO.get_replies_to_message',
+        reply_dao.GET_REPLIES_TO_MESSAGE_SQL,
+        {'room_uuid': _UUID, 'parent_message_uuid': _UUID},
+        ['idx_chatd_reply_parent_created'],
+        no_sort=True,
+    ),
+    PlanCheck(
+        'ReplyDAO.get_reply_count',
+        reply_dao.GET_REPLY_COUNT_SQL,
+        {'room_uuid': _UUID, 'parent_message_uuid': _UUID},
+        ['idx_chatd_reply_parent_created'],
+    ),
+    PlanCheck(
+        'ReplyDAO.get_thread_summaries',
+        reply_dao.GET_THREAD_SUMMARIES_SQL,
+        {'room_uuid': _UUID, 'parent_message_uuids': [_UUID]},
+        # The parents of a page can have most of the room's replies
+        ['idx_chatd_reply_parent_created', 'idx_chatd_reply_room_created'],
+    ),
+    PlanCheck(
+        'ReplyDAO.get_replies_in_room',
+        reply_dao.GET_REPLIES_IN_ROOM_SQL,
+        {'room_uuid': _UUID},
+        ['idx_chatd_reply_room_created'],
+        no_sort=True,
+    ),
+    PlanCheck(
+        'ChangeLogDAO.list_since',
+        change_dao.LIST_SINCE_SQL,
+        {'room_uuid': _UUID, 'txid': 0, 'change_id': 0, 'limit': 500},
+        ['idx_chatd_change_room_txid_id'],
+        no_sort=True,
+    ),
+]
+
+
+def check_plans(connection, checks=None):
+    """Run the plan checks.
+
+    Args:
+        connection: SQLAlchemy connection, inside a transaction (settings are
+            changed for the transaction only)
+        checks: PlanCheck list (PLAN_CHECKS if None)
+
+    Returns:
+        List of (check, problems) tuples; problems is an empty list for checks
+        that passed
+    """
+    checks = PLAN_CHECKS if checks is None else checks
+    connection.execute(text('SET LOCAL enable_seqscan = off'))
+    connection.execute(text('SET LOCAL plan_cache_mode = force_generic_plan'))
+    parents = _get_parents(connection)
+    results = []
+    for check in checks:
+        sort = 'off' if check.no_sort else 'on'
+        connection.execute(text(f'SET LOCAL enable_sort = {sort}'))
+        connection.execute(text(f'SET LOCAL enable_incremental_sort = {sort}'))
+        plan = _explain(connection, check)
+        nodes = list(_walk(plan[0]['Plan']))
+        used = {
+            parents.get(node['Index Name'], node['Index Name'])
+            for node in nodes if 'Index Name' in node
+        }
+        problems = []
+        scanned = {}
+        for node in nodes:
+            relation = node.get('Relation Name')
+            if relation in parents:
+                scanned.setdefault(parents[relation], set()).add(relation)
+        for table, partitions in sorted(scanned.items()):
+            if len(partitions) > 1:
+                problems.append(f'{len(partitions)} partitions of {table} read')
+        if not used.intersection(check.indexes):
+            tables = _get_index_tables(connection, check.indexes)
+            if not tables:
+                problems.append('none of {} exists'.format(', '.join(check.indexes)))
+            elif all(_has_rows(connection, table) for table in tables):
+                problems.append('none of {} used ({})'.format(
+                    ', '.join(check.indexes), ', '.join(sorted(used)) or 'no index'
+                ))
+        if check.no_sort and any(node['Node Type'] in _SORT_NODES for node in nodes):
+            problems.append('sorted instead of read in index order')
+        results.append((check, problems))
+    return results
+
+
+def _explain(connection, check):
+    """Get the generic plan of a check's query, as a prepared statement.
+
+    The placeholder values are still passed, so that the partitions of other
+    rooms are pruned from the plan.
+    """
+    names = []
+
+    def number(match):
+        if match.group(1) not in names:
+            names.append(match.group(1))
+        return f'${names.index(match.group(1)) + 1}'
+
+    connection.execute(text('PREPARE plan_check AS ' + _PARAM_RE.sub(number, check.query)))
+    values = {}
+    for name in names:
+        value = check.params[name]
+        # An array literal, typed by the query (a list would be a text[])
+        values[name] = '{' + ','.join(value) + '}' if isinstance(value, list) else value
+    plan = connection.execute(
+        text('EXPLAIN (FORMAT JSON) EXECUTE plan_check({})'.format(
+            ', '.join(f':{name}' for name in names)
+        )),
+        values,
+    ).scalar()
+    connection.execute(text('DEALLOCATE plan_check'))
+    return plan
+
+
+def _get_index_tables(connection, indexes):
+    """Get the set of tables having one of the indexes."""
+    results = connection.execute(
+        text('SELECT tablename FROM pg_indexes WHERE indexname = ANY(:indexes)'),
+        {'indexes': indexes},
+    ).fetchall()
+    return {row[0] for row in results}
+
+
+def _has_rows(connection, table):
+    return connection.execute(text(f'SELECT EXISTS (SELECT 1 FROM {table})')).scalar()
+
+
+def _get_parents(connection):
+    """Map the names of partitions, and of their indexes, to their parent's."""
+    results = connection.execute(text("""
+        SELECT c.relname, p.relname
+        FROM pg_inherits i
+        INNER JOIN pg_class c ON c.oid = i.inhrelid
+        INNER JOIN pg_class p ON p.oid = i.inhparent
+    """)).fetchall()
+    return {row[0]: row[1] for row in results}
+
+
+def _walk(node):
+    yield node
+    for child in node.get('Plans', []):
+        yield from _walk(child)
@@ -7,19 +7,37 @@ wazo-chatd-reactions plugin entry point.
 This plugin adds message reactions and threaded replies to wazo-chatd.
 """
 
+import logging
+
+from .cache_backends import BACKEND_MEMORY, FailSafeCache, NullCacheBackend, create_backend
 from .dao import ReactionDAO
+from .message_dao import MessageDAO
 from .reply_dao import ReplyDAO
+from .change_dao import ChangeLogDAO
 from .http import (
     MessageReactionsResource,
     MessageReactionResource,
+    MessageReactionToggleResource,
+    RoomReactionsBulkResource,
     RoomReactionsResource,
     MessageReplyInfoResource,
     MessageRepliesResource,
     RoomReplyMetadataResource,
+    RoomThreadSummariesResource,
+    RoomMessagesMetadataResource,
+    RoomSyncResource,
 )
+from .metadata_services import RoomMetadataService
+from .dispatch import NotificationDispatcher
 from .notifier import ReactionNotifier
 from .services import ReactionService
 from .reply_services import ReplyService
+from .response_cache import RoomResponseCache
+from .sync_services import RoomSyncService
+from .rooms import ROOM_MEMBERSHIP_EVENTS, RoomAccessCache
+from .versions import ROOM_MESSAGE_EVENTS, VersionTracker
+
+logger = logging.getLogger(__name__)
 
 
 class Plugin:
@@ -32,21 +50,94 @@ class Plugin:
             dependencies: Dict containing:
                 - api: Flask-RESTful API instance
                 - dao: wazo-chatd DAO (contains room and session access)
+                - bus_consumer: Bus consumer for chatd events
                 - bus_publisher: Bus publisher for events
                 - config: Configuration dict
+                - status_aggregator: Aggregator for the /status endpoint
+                - thread_manager: Starts and stops background threads
         """
         api = dependencies['api']
         dao = dependencies['dao']
+        bus_consumer = dependencies['bus_consumer']
         bus_publisher = dependencies['bus_publisher']
+        config = dependencies['config'].get('reactions', {})
+        status_aggregator = dependencies['status_aggregator']
+        thread_manager = dependencies['thread_manager']
+
+        # Optionally publish events from background threads, so that
+        # write requests only wait for the database commit
+        notification_config = dict(config.get('notifications', {}))
+        dispatch_config = dict(notification_config.pop('dispatch', {}))
+        dispatcher = None
+        if dispatch_config.pop('enabled', False):
+            dispatcher = NotificationDispatcher(**dispatch_config)
+            thread_manager.manage(dispatcher)
+            dispatcher.start()
 
         # Create notifier for WebSocket events (shared by both services)
-        notifier = ReactionNotifier(bus_publisher)
+        notifier = ReactionNotifier(
+            bus_publisher, dispatcher=dispatcher, **notification_config
+        )
+        if notifier.coalescer:
+            thread_manager.manage(notifier.coalescer)
+            notifier.coalescer.start()
+
+        # Indexed message lookups (shared by both services)
+        message_dao = MessageDAO()
+
+        # Room access cache, with room members (shared by both services),
+        # invalidated when chatd publishes room membership changes
+        room_cache = RoomAccessCache(dao, **config.get('room_cache', {}))
+        for event_name in ROOM_MEMBERSHIP_EVENTS:
+            bus_consumer.subscribe(event_name, room_cache.on_room_event)
+
+        # Cache backend for the read paths (per process, or shared by every
+        # node with Redis); failures fall back to the database, and versions
+        # and cached payloads are only used when the backend is shared
+        cache_config = config.get('cache', {})
+        try:
+            cache_backend = create_backend(
+                cache_config.get('backend', BACKEND_MEMORY),
+                memory=cache_config.get('memory'),
+                redis=cache_config.get('redis'),
+            )
+        except RuntimeError as e:
+            logger.error('Reaction caches disabled: %s', e)
+            cache_backend = NullCacheBackend()
+        cache = FailSafeCache(cache_backend, retry_after=cache_config.get('retry_after', 30))
+
+        # Room/message versions for ETags and cache keys, bumped by the
+        # write paths and once per posted message
+        versions = VersionTracker(cache, ttl=cache_config.get('version_ttl', 86400))
+        for event_name in ROOM_MESSAGE_EVENTS:
+            bus_consumer.subscribe(event_name, versions.on_message_event)
+
+        # Serialized room payloads, shared by the room members and keyed by
+        # room version
+        response_cache = RoomResponseCache(
+            cache,
+            ttl=cache_config.get('ttl', 300),
+            compress_min_bytes=cache_config.get('compress_min_bytes', 4096),
+        )
+
+        def provide_status(status):
+            plugin_status = status.setdefault('reactions', {})
+            plugin_status['room_cache'] = room_cache.stats()
+            plugin_status['cache'] = cache.stats()
+            if dispatcher:
+                plugin_status['notification_queue'] = dispatcher.stats()
+            if notifier.coalescer:
+                plugin_status['notification_coalescing'] = notifier.coalescer.stats()
+
+        status_aggregator.add_provider(provide_status)
 
         # =================================================================
         # Reactions
         # =================================================================
         reaction_dao = ReactionDAO()
-        reaction_service = ReactionService(dao, reaction_dao, notifier)
+        reaction_service = ReactionService(
+            room_cache, reaction_dao, message_dao, notifier, versions
+        )
 
         api.add_resource(
             MessageReactionsResource,
@@ -60,18 +151,34 @@ class Plugin:
             resource_class_args=[reaction_service],
         )
 
+        # Add or remove a reaction in a single statement
+        api.add_resource(
+            MessageReactionToggleResource,
+            '/users/me/rooms/<uuid:room_uuid>/messages/<uuid:message_uuid>/reactions/<string:emoji>/toggle',
+            resource_class_args=[reaction_service],
+        )
+
+        # Add and remove reactions on several messages in one transaction
+        api.add_resource(
+            RoomReactionsBulkResource,
+            '/users/me/rooms/<uuid:room_uuid>/reactions/bulk',
+            resource_class_args=[reaction_service],
+        )
+
         # Get all reactions for a room (batch loading)
         api.add_resource(
             RoomReactionsResource,
             '/users/me/rooms/<uuid:room_uuid>/reactions',
-            resource_class_args=[reaction_service],
+            resource_class_args=[reaction_service, response_cache],
         )
 
         # =================================================================
         # Replies
         # =================================================================
         reply_dao = ReplyDAO()
-        reply_service = ReplyService(dao, reply_dao, notifier)
+        reply_service = ReplyService(
+            room_cache, reply_dao, message_dao, notifier, versions
+        )
 
         # Get reply info for a message / Create reply relationship
         api.add_resource(
@@ -91,5 +198,39 @@ class Plugin:
         api.add_resource(
             RoomReplyMetadataResource,
             '/users/me/rooms/<uuid:room_uuid>/replies',
-            resource_class_args=[reply_service],
+            resource_class_args=[reply_service, response_cache],
+        )
+
+        # Get reply counts, last reply times and participants of messages
+        api.add_resource(
+            RoomThreadSummariesResource,
+            '/users/me/rooms/<uuid:room_uuid>/threads',
+            resource_class_args=[reply_service, response_cache],
+        )
+
+        # =================================================================
+        # Room metadata (reactions + replies)
+        # =================================================================
+        metadata_service = RoomMetadataService(
+            room_cache, message_dao, reaction_service, reply_service
+        )
+
+        # Get reactions and reply info for a set of messages in one call
+        api.add_resource(
+            RoomMessagesMetadataResource,
+            '/users/me/rooms/<uuid:room_uuid>/metadata',
+            resource_class_args=[metadata_service],
+        )
+
+        # =================================================================
+        # Delta sync (reaction and reply change log)
+        # =================================================================
+        change_dao = ChangeLogDAO()
+        sync_service = RoomSyncService(room_cache, change_dao, **config.get('sync', {}))
+
+        # Get reaction and reply changes since a cursor
+        api.add_resource(
+            RoomSyncResource,
+            '/users/me/rooms/<uuid:room_uuid>/sync',
+            resource_class_args=[sync_service],
         )
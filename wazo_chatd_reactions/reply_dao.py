@@ -8,6 +8,7 @@ This DAO provides database operations for the chatd_room_message_reply table.
 """
 
 import logging
+from collections import namedtuple
 from datetime import datetime, timezone
 
 from sqlalchemy import text
@@ -16,8 +17,57 @@ from sqlalchemy.exc import IntegrityError
 # Import the scoped session directly from wazo-chatd
 from wazo_chatd.database.helpers import Session
 
+from .rows import STREAM_BATCH_SIZE, iter_rows, map_row, map_rows
+
 logger = logging.getLogger(__name__)
 
+# Read queries, also run by the EXPLAIN checks of plans.py
+
+GET_BY_CHILD_SQL = """
+    SELECT child_message_uuid, parent_message_uuid, room_uuid,
+           parent_content_preview, parent_author_uuid, parent_author_alias,
+           parent_created_at, created_at
+    FROM chatd_room_message_reply
+    WHERE room_uuid = :room_uuid
+      AND child_message_uuid = :child_message_uuid
+"""
+
+GET_REPLIES_TO_MESSAGE_SQL = """
+    SELECT child_message_uuid, parent_message_uuid, room_uuid,
+           parent_content_preview, parent_author_uuid, parent_author_alias,
+           parent_created_at, created_at
+    FROM chatd_room_message_reply
+    WHERE room_uuid = :room_uuid
+      AND parent_message_uuid = :parent_message_uuid
+    ORDER BY created_at ASC
+"""
+
+GET_REPLY_COUNT_SQL = """
+    SELECT COUNT(*)
+    FROM chatd_room_message_reply
+    WHERE room_uuid = :room_uuid
+      AND parent_message_uuid = :parent_message_uuid
+"""
+
+GET_THREAD_SUMMARIES_SQL = """
+    SELECT r.parent_message_uuid, COUNT(*), MAX(r.created_at),
+           array_agg(DISTINCT CAST(m.user_uuid AS text))
+    FROM chatd_room_message_reply r
+    INNER JOIN chatd_room_message m ON m.uuid = r.child_message_uuid
+    WHERE r.room_uuid = :room_uuid
+      AND r.parent_message_uuid = ANY(CAST(:parent_message_uuids AS uuid[]))
+    GROUP BY r.parent_message_uuid
+"""
+
+GET_REPLIES_IN_ROOM_SQL = """
+    SELECT child_message_uuid, parent_message_uuid, room_uuid,
+           parent_content_preview, parent_author_uuid, parent_author_alias,
+           parent_created_at, created_at
+    FROM chatd_room_message_reply
+    WHERE room_uuid = :room_uuid
+    ORDER BY created_at ASC
+"""
+
 
 class ReplyDAO:
     """DAO for reply database operations."""
@@ -30,122 +80,139 @@ class ReplyDAO:
         """Get the current session."""
         return Session()
 
-    def get_by_child(self, child_message_uuid):
+    def get_by_child(self, room_uuid, child_message_uuid):
         """Get reply info for a specific message (if it's a reply)."""
-        query = text("""
-            SELECT child_message_uuid, parent_message_uuid, room_uuid,
-                   parent_content_preview, parent_author_uuid, parent_author_alias,
-                   parent_created_at, created_at
-            FROM chatd_room_message_reply
-            WHERE child_message_uuid = :child_message_uuid
-        """)
+        query = text(GET_BY_CHILD_SQL)
         result = self._session.execute(
             query,
-            {'child_message_uuid': str(child_message_uuid)}
+            {'room_uuid': str(room_uuid), 'child_message_uuid': str(child_message_uuid)}
         ).fetchone()
         
-        if result:
-            return ReplyResult(
-                child_message_uuid=result[0],
-                parent_message_uuid=result[1],
-                room_uuid=result[2],
-                parent_content_preview=result[3],
-                parent_author_uuid=result[4],
-                parent_author_alias=result[5],
-                parent_created_at=result[6],
-                created_at=result[7],
-            )
-        return None
+        return map_row(ReplyResult, result)
 
-    def get_replies_to_message(self, parent_message_uuid):
+    def get_replies_to_message(self, room_uuid, parent_message_uuid):
         """Get all messages that are replies to a specific message."""
-        query = text("""
-            SELECT child_message_uuid, parent_message_uuid, room_uuid,
-                   parent_content_preview, parent_author_uuid, parent_author_alias,
-                   parent_created_at, created_at
-            FROM chatd_room_message_reply
-            WHERE parent_message_uuid = :parent_message_uuid
-            ORDER BY created_at ASC
-        """)
+        query = text(GET_REPLIES_TO_MESSAGE_SQL)
         results = self._session.execute(
             query,
-            {'parent_message_uuid': str(parent_message_uuid)}
+            {'room_uuid': str(room_uuid), 'parent_message_uuid': str(parent_message_uuid)}
         ).fetchall()
         
-        return [
-            ReplyResult(
-                child_message_uuid=row[0],
-                parent_message_uuid=row[1],
-                room_uuid=row[2],
-                parent_content_preview=row[3],
-                parent_author_uuid=row[4],
-                parent_author_alias=row[5],
-                parent_created_at=row[6],
-                created_at=row[7],
-            )
-            for row in results
-        ]
+        return map_rows(ReplyResult, results)
 
-    def get_reply_count(self, parent_message_uuid):
+    def get_reply_count(self, room_uuid, parent_message_uuid):
         """Get the count of replies to a message."""
-        query = text("""
-            SELECT COUNT(*)
-            FROM chatd_room_message_reply
-            WHERE parent_message_uuid = :parent_message_uuid
-        """)
+        query = text(GET_REPLY_COUNT_SQL)
         result = self._session.execute(
             query,
-            {'parent_message_uuid': str(parent_message_uuid)}
+            {'room_uuid': str(room_uuid), 'parent_message_uuid': str(parent_message_uuid)}
         ).fetchone()
         return result[0] if result else 0
 
+    def get_thread_summaries(self, room_uuid, parent_message_uuids):
+        """Get the reply count, last reply time and participants of threads.
+
+        A single grouped query for a set of parent messages of a room; the
+        participants are the authors of the replies.
+
+        Returns:
+            List of ThreadSummaryResult objects, for the messages that have
+            replies only
+        """
+        if not parent_message_uuids:
+            return []
+
+        query = text(GET_THREAD_SUMMARIES_SQL)
+        results = self._session.execute(
+            query,
+            {
+                'room_uuid': str(room_uuid),
+                'parent_message_uuids': [str(uuid) for uuid in parent_message_uuids],
+            }
+        ).fetchall()
+
+        return map_rows(ThreadSummaryResult, results)
+
     def get_replies_in_room(self, room_uuid):
         """Get all reply relationships in a room (for batch loading)."""
+        results = self._execute_replies_in_room(room_uuid).fetchall()
+        return map_rows(ReplyResult, results)
+
+    def iter_replies_in_room(self, room_uuid, batch_size=STREAM_BATCH_SIZE):
+        """Same as get_replies_in_room, read through a server-side cursor.
+
+        The session must stay open until the iterator is exhausted.
+        """
+        results = self._execute_replies_in_room(room_uuid, stream=True)
+        return iter_rows(ReplyResult, results, batch_size)
+
+    def _execute_replies_in_room(self, room_uuid, stream=False):
+        query = text(GET_REPLIES_IN_ROOM_SQL).execution_options(stream_results=stream)
+        return self._session.execute(
+            query,
+            {'room_uuid': str(room_uuid)}
+        )
+
+    def get_by_children(self, room_uuid, child_message_uuids):
+        """Get reply info for multiple messages of a room (for batch loading).
+
+        Messages that are not replies are simply absent from the result.
+        """
+        if not child_message_uuids:
+            return []
+
         query = text("""
             SELECT child_message_uuid, parent_message_uuid, room_uuid,
                    parent_content_preview, parent_author_uuid, parent_author_alias,
                    parent_created_at, created_at
             FROM chatd_room_message_reply
-            WHERE room_uuid = :room_uuid
-            ORDER BY created_at ASC
+            WHERE child_message_uuid = ANY(CAST(:child_message_uuids AS uuid[]))
+              AND room_uuid = :room_uuid
         """)
         results = self._session.execute(
             query,
-            {'room_uuid': str(room_uuid)}
+            {
+                'child_message_uuids': [str(uuid) for uuid in child_message_uuids],
+                'room_uuid': str(room_uuid),
+            }
         ).fetchall()
-        
-        return [
-            ReplyResult(
-                child_message_uuid=row[0],
-                parent_message_uuid=row[1],
-                room_uuid=row[2],
-                parent_content_preview=row[3],
-                parent_author_uuid=row[4],
-                parent_author_alias=row[5],
-                parent_created_at=row[6],
-                created_at=row[7],
-            )
-            for row in results
-        ]
+
+        return map_rows(ReplyResult, results)
 
     def create(self, child_message_uuid, parent_message_uuid, room_uuid,
                parent_content_preview, parent_author_uuid, parent_author_alias,
                parent_created_at):
-        """Create a new reply relationship."""
+        """Create a new reply relationship.
+        
+        The chatd_room_message_change log entry is written by the same
+        statement.
+        """
         now = datetime.now(timezone.utc)
         
         query = text("""
-            INSERT INTO chatd_room_message_reply 
-                (child_message_uuid, parent_message_uuid, room_uuid,
-                 parent_content_preview, parent_author_uuid, parent_author_alias,
-                 parent_created_at, created_at)
-            VALUES 
-                (:child_message_uuid, :parent_message_uuid, :room_uuid,
-                 :parent_content_preview, :parent_author_uuid, :parent_author_alias,
-                 :parent_created_at, :created_at)
-            RETURNING child_message_uuid, parent_message_uuid, room_uuid,
-                      parent_content_preview, parent_author_uuid, parent_author_alias,
-                      parent_created_at, created_at
+            WITH inserted AS (
+                INSERT INTO chatd_room_message_reply 
+                    (child_message_uuid, parent_message_uuid, room_uuid,
+                     parent_content_preview, parent_author_uuid, parent_author_alias,
+                     parent_created_at, created_at)
+                VALUES 
+                    (:child_message_uuid, :parent_message_uuid, :room_uuid,
+                     :parent_content_preview, :parent_author_uuid, :parent_author_alias,
+                     :parent_created_at, :created_at)
+                RETURNING child_message_uuid, parent_message_uuid, room_uuid,
+                          parent_content_preview, parent_author_uuid, parent_author_alias,
+                          parent_created_at, created_at
+            ), logged AS (
+                INSERT INTO chatd_room_message_change
+                    (room_uuid, txid, kind, message_uuid, parent_message_uuid, created_at)
+                SELECT room_uuid, CAST(CAST(pg_current_xact_id() AS text) AS bigint),
+                       'reply_created', child_message_uuid, parent_message_uuid, created_at
+                FROM inserted
+            )
+            SELECT child_message_uuid, parent_message_uuid, room_uuid,
+                   parent_content_preview, parent_author_uuid, parent_author_alias,
+                   parent_created_at, created_at
+            FROM inserted
         """)
         
         try:
@@ -164,45 +231,42 @@ class ReplyDAO:
             ).fetchone()
             self._session.commit()
             
-            return ReplyResult(
-                child_message_uuid=result[0],
-                parent_message_uuid=result[1],
-                room_uuid=result[2],
-                parent_content_preview=result[3],
-                parent_author_uuid=result[4],
-                parent_author_alias=result[5],
-                parent_created_at=result[6],
-                created_at=result[7],
-            )
+            return map_row(ReplyResult, result)
         except IntegrityError:
             self._session.rollback()
             raise
 
-    def delete(self, child_message_uuid):
+    def delete(self, room_uuid, child_message_uuid):
         """Delete a reply relationship."""
         query = text("""
             DELETE FROM chatd_room_message_reply
-            WHERE child_message_uuid = :child_message_uuid
+            WHERE room_uuid = :room_uuid
+              AND child_message_uuid = :child_message_uuid
         """)
         
         self._session.execute(
             query,
-            {'child_message_uuid': str(child_message_uuid)}
+            {'room_uuid': str(room_uuid), 'child_message_uuid': str(child_message_uuid)}
         )
         self._session.commit()
 
 
-class ReplyResult:
-    """Simple result object for reply data."""
-    
-    def __init__(self, child_message_uuid, parent_message_uuid, room_uuid,
-                 parent_content_preview, parent_author_uuid, parent_author_alias,
-                 parent_created_at, created_at):
-        self.child_message_uuid = child_message_uuid
-        self.parent_message_uuid = parent_message_uuid
-        self.room_uuid = room_uuid
-        self.parent_content_preview = parent_content_preview
-        self.parent_author_uuid = parent_author_uuid
-        self.parent_author_alias = parent_author_alias
-        self.parent_created_at = parent_created_at
-        self.created_at = created_at
+class ReplyResult(namedtuple('ReplyResult', [
+    'child_message_uuid', 'parent_message_uuid', 'room_uuid',
+    'parent_content_preview', 'parent_author_uuid', 'parent_author_alias',
+    'parent_created_at', 'created_at',
+])):
+    """Result row for reply data."""
+
+    __slots__ = ()
+
+
+class ThreadSummaryResult(namedtuple('ThreadSummaryResult', [
+    'parent_message_uuid', 'reply_count', 'last_reply_at', 'participant_uuids',
+])):
+    """Result row for the replies to a message, aggregated.
+
+    participant_uuids are the distinct authors of the replies, as strings.
+    """
+
+    __slots__ = ()
@@ -3,10 +3,7 @@
 
 import logging
 
-from .exceptions import (
-    MessageNotFoundException,
-    RoomNotFoundException,
-)
+from .rooms import get_message, get_message_window, get_room, verify_user_in_room
 
 logger = logging.getLogger(__name__)
 
@@ -14,17 +11,29 @@ logger = logging.getLogger(__name__)
 class ReplyService:
     """Service for managing message replies/threading."""
 
-    def __init__(self, chatd_dao, reply_dao, notifier):
+    def __init__(self, room_cache, reply_dao, message_dao, notifier, versions):
         """Initialize the reply service.
         
         Args:
-            chatd_dao: The main chatd DAO (for room/message access)
+            room_cache: RoomAccessCache for tenant-scoped room lookups
             reply_dao: Our reply-specific DAO
+            message_dao: MessageDAO for indexed message lookups
             notifier: ReplyNotifier for WebSocket events
+            versions: VersionTracker bumped on every reply write
         """
-        self._chatd_dao = chatd_dao
+        self._room_cache = room_cache
         self._reply_dao = reply_dao
+        self._message_dao = message_dao
         self._notifier = notifier
+        self._versions = versions
+
+    def get_room_version(self, tenant_uuid, room_uuid):
+        """Get the version of a room's replies, for conditional reads.
+
+        Only the room access is verified: no reply is read.
+        """
+        room = get_room(self._room_cache, tenant_uuid, room_uuid)
+        return self._versions.room_version(room.uuid)
 
     def get_reply_info(self, tenant_uuid, room_uuid, message_uuid):
         """Get reply info for a specific message.
@@ -32,13 +41,13 @@ class ReplyService:
         Returns the parent message info if this message is a reply.
         """
         # Verify room exists and user has access
-        room = self._get_room(tenant_uuid, room_uuid)
+        room = get_room(self._room_cache, tenant_uuid, room_uuid)
         
         # Verify message exists in room
-        self._get_message(room, message_uuid)
+        get_message(self._message_dao, room, message_uuid)
         
         # Get reply relationship
-        reply = self._reply_dao.get_by_child(message_uuid)
+        reply = self._reply_dao.get_by_child(room.uuid, message_uuid)
         
         if not reply:
             return None
@@ -61,13 +70,13 @@ class ReplyService:
         Returns a list of message UUIDs that are replies to this message.
         """
         # Verify room exists and user has access
-        room = self._get_room(tenant_uuid, room_uuid)
+        room = get_room(self._room_cache, tenant_uuid, room_uuid)
         
         # Verify message exists in room
-        self._get_message(room, message_uuid)
+        get_message(self._message_dao, room, message_uuid)
         
         # Get replies
-        replies = self._reply_dao.get_replies_to_message(message_uuid)
+        replies = self._reply_dao.get_replies_to_message(room.uuid, message_uuid)
         
         return {
             'parent_message_uuid': str(message_uuid),
@@ -87,26 +96,90 @@ class ReplyService:
         Returns a dict mapping message UUIDs to their reply info.
         """
         # Verify room exists
-        self._get_room(tenant_uuid, room_uuid)
+        room = get_room(self._room_cache, tenant_uuid, room_uuid)
         
         # Get all replies in room
-        replies = self._reply_dao.get_replies_in_room(room_uuid)
-        
-        result = {}
-        for reply in replies:
-            result[str(reply.child_message_uuid)] = {
-                'parent_message_uuid': str(reply.parent_message_uuid) if reply.parent_message_uuid else None,
-                'parent_preview': {
-                    'content': reply.parent_content_preview,
-                    'author_uuid': str(reply.parent_author_uuid) if reply.parent_author_uuid else None,
-                    'author_alias': reply.parent_author_alias,
-                    'created_at': reply.parent_created_at,  # Let schema handle datetime formatting
-                } if reply.parent_content_preview else None,
-            }
+        replies = self._reply_dao.get_replies_in_room(room.uuid)
         
         return {
             'room_uuid': str(room_uuid),
-            'replies': result,
+            'replies': {
+                str(reply.child_message_uuid): self._build_reply_metadata(reply)
+                for reply in replies
+            },
+        }
+
+    def iter_room_reply_metadata(self, tenant_uuid, room_uuid):
+        """Get the reply metadata of a room, one reply at a time.
+
+        Same as get_room_reply_metadata, for streaming responses: replies are
+        read through a server-side cursor. The room access is verified before
+        returning.
+
+        Returns an iterator of (message_uuid, reply info) pairs.
+        """
+        # Verify room exists
+        room = get_room(self._room_cache, tenant_uuid, room_uuid)
+        
+        replies = self._reply_dao.iter_replies_in_room(room.uuid)
+        return (
+            (str(reply.child_message_uuid), self._build_reply_metadata(reply))
+            for reply in replies
+        )
+
+    def get_reply_metadata_for_messages(self, room, message_uuids):
+        """Get reply metadata for messages of an already resolved room.
+
+        The caller is responsible for getting the room through the room cache
+        and for passing only message UUIDs that belong to it.
+
+        Returns a dict mapping the UUIDs of messages that are replies to their
+        reply info.
+        """
+        replies = self._reply_dao.get_by_children(room.uuid, message_uuids)
+        return {
+            str(reply.child_message_uuid): self._build_reply_metadata(reply)
+            for reply in replies
+        }
+
+    def get_thread_summaries(self, tenant_uuid, room_uuid, message_uuids=None,
+                             before=None, after=None, limit=None):
+        """Get the thread summary of a set of messages in a room.
+
+        Messages are either listed explicitly (message_uuids) or selected as a
+        page with before/after/limit, in which case a next_cursor is returned.
+
+        Returns a dict mapping the UUIDs of messages that have replies to
+        their reply count, last reply time and participants.
+        """
+        # Verify room exists
+        room = get_room(self._room_cache, tenant_uuid, room_uuid)
+
+        result = {'room_uuid': str(room_uuid)}
+        if not message_uuids:
+            message_uuids, result['next_cursor'] = get_message_window(
+                self._message_dao, room, before, after, limit
+            )
+        result['threads'] = self.get_thread_summaries_for_messages(room, message_uuids)
+        return result
+
+    def get_thread_summaries_for_messages(self, room, message_uuids):
+        """Get thread summaries for messages of an already resolved room.
+
+        Messages of other rooms are ignored by the query, so message_uuids
+        need not be verified.
+
+        Returns a dict mapping the UUIDs of messages that have replies to
+        their thread summary.
+        """
+        summaries = self._reply_dao.get_thread_summaries(room.uuid, message_uuids)
+        return {
+            str(summary.parent_message_uuid): {
+                'reply_count': summary.reply_count,
+                'last_reply_at': summary.last_reply_at,  # Let schema handle datetime formatting
+                'participant_uuids': summary.participant_uuids,
+            }
+            for summary in summaries
         }
 
     def create_reply_relationship(self, tenant_uuid, room_uuid, child_message_uuid,
@@ -116,25 +189,26 @@ class ReplyService:
         This is called after the child message is created to establish the link.
         """
         # Verify room exists and user has access
-        room = self._get_room(tenant_uuid, room_uuid)
-        self._verify_user_in_room(room, user_uuid)
+        room = get_room(self._room_cache, tenant_uuid, room_uuid)
+        verify_user_in_room(room, user_uuid)
         
         # Verify child message exists
-        child_message = self._get_message(room, child_message_uuid)
+        child_message = get_message(self._message_dao, room, child_message_uuid)
         
         # Get parent message for preview
-        parent_message = self._get_message(room, parent_message_uuid)
+        parent_message = get_message(self._message_dao, room, parent_message_uuid)
         
         # Create the relationship with cached preview
         reply = self._reply_dao.create(
             child_message_uuid=child_message_uuid,
             parent_message_uuid=parent_message_uuid,
-            room_uuid=room_uuid,
+            room_uuid=room.uuid,
             parent_content_preview=parent_message.content[:200] if parent_message.content else None,
             parent_author_uuid=parent_message.user_uuid,
             parent_author_alias=parent_message.alias,
             parent_created_at=parent_message.created_at,
         )
+        self._versions.bump_room(room.uuid)
         
         # Notify via WebSocket
         self._notifier.reply_created(room, child_message, parent_message, reply)
@@ -151,22 +225,14 @@ class ReplyService:
             },
         }
 
-    def _get_room(self, tenant_uuid, room_uuid):
-        """Get room by UUID, verifying tenant access."""
-        room = self._chatd_dao.room.get([tenant_uuid], room_uuid)
-        if not room:
-            raise RoomNotFoundException(room_uuid)
-        return room
-
-    def _get_message(self, room, message_uuid):
-        """Get message by UUID, verifying it belongs to room."""
-        for message in room.messages:
-            if str(message.uuid) == str(message_uuid):
-                return message
-        raise MessageNotFoundException(message_uuid)
-
-    def _verify_user_in_room(self, room, user_uuid):
-        """Verify user is a member of the room."""
-        user_uuids = {str(user.uuid) for user in room.users}
-        if str(user_uuid) not in user_uuids:
-            raise RoomNotFoundException(room.uuid)
+    def _build_reply_metadata(self, reply):
+        """Build the reply info used in room-wide metadata."""
+        return {
+            'parent_message_uuid': str(reply.parent_message_uuid) if reply.parent_message_uuid else None,
+            'parent_preview': {
+                'content': reply.parent_content_preview,
+                'author_uuid': str(reply.parent_author_uuid) if reply.parent_author_uuid else None,
+                'author_alias': reply.parent_author_alias,
+                'created_at': reply.parent_created_at,  # Let schema handle datetime formatting
+            } if reply.parent_content_preview else None,
+        }
@@ -0,0 +1,114 @@
+# Copyright 2024 Community Contributors
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Cache of serialized room-level responses, shared by every room member.
+
+Entries are keyed by room and room version (see VersionTracker): a reaction or
+reply write bumps the version, so entries are never invalidated explicitly,
+they just stop being used and expire. The per-user reacted_by_me flags are
+left out of cached payloads and applied to each response.
+
+Payloads are only cached in a shared backend (Redis, or the memory backend of
+a single-process deployment): a per-process copy would keep serving a room
+payload after a write on another process, until its TTL expires.
+"""
+
+import json
+import logging
+import zlib
+
+logger = logging.getLogger(__name__)
+
+# Leading byte of stored values, telling how the JSON payload is encoded
+_PLAIN = b'j'
+_COMPRESSED = b'z'
+
+
+class RoomResponseCache:
+    """Cache of dumped room payloads, stored in the cache backend as JSON."""
+
+    def __init__(self, cache, ttl=300, compress_min_bytes=4096):
+        """Initialize the cache.
+
+        Args:
+            cache: FailSafeCache wrapping the cache backend
+            ttl: Seconds a payload is kept; also bounds how long a payload may
+                be served if a version bump was lost to a backend failure
+            compress_min_bytes: Payloads at least this large (in JSON) are
+                stored zlib-compressed; 0 disables compression
+        """
+        self._cache = cache
+        self._ttl = ttl
+        self._compress_min_bytes = compress_min_bytes
+        self._enabled = cache.shared
+
+    def get_or_build(self, key, build):
+        """Get a cached payload, or build and cache it.
+
+        Args:
+            key: Tuple of key parts, including the room version; None to
+                bypass the cache (e.g. when versions are unavailable). The
+                cache is also bypassed when the backend is not shared.
+            build: Called without arguments on a miss; returns the payload,
+                already dumped by its schema and without per-user data
+
+        Returns:
+            The payload
+        """
+        if key is None or not self._enabled:
+            return build()
+
+        cache_key = 'response:' + ':'.join(str(part) for part in key)
+        value = self._cache.get(cache_key)
+        if value is not None:
+            try:
+                return self._decode(value)
+            except (ValueError, zlib.error):
+                logger.warning('Ignoring undecodable cached payload %s', cache_key)
+
+        payload = build()
+        self._cache.set(cache_key, self._encode(payload), self._ttl)
+        return payload
+
+    def _encode(self, payload):
+        data = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        if self._compress_min_bytes and len(data) >= self._compress_min_bytes:
+            return _COMPRESSED + zlib.compress(data)
+        return _PLAIN + data
+
+    @staticmethod
+    def _decode(value):
+        if value[:1] == _COMPRESSED:
+            return json.loads(zlib.decompress(value[1:]))
+        return json.loads(value[1:])
+
+
+def without_reacted_by_me(payload):
+    """Remove reacted_by_me from a dumped room reactions payload, in place."""
+    for reactions in payload['reactions'].values():
+        for reaction in reactions:
+            reaction.pop('reacted_by_me', None)
+    return payload
+
+
+def with_reacted_by_me(payload, is_reacted):
+    """Copy a room reactions payload without reacted_by_me, adding it.
+
+    Args:
+        payload: Dumped payload, without reacted_by_me
+        is_reacted: Called with (message_uuid, reaction dict); returns whether
+            the current user reacted with this emoji
+
+    Returns:
+        New payload; the given one is left untouched
+    """
+    result = dict(payload)
+    result['reactions'] = {
+        message_uuid: [
+            dict(reaction, reacted_by_me=is_reacted(message_uuid, reaction))
+            for reaction in reactions
+        ]
+        for message_uuid, reactions in payload['reactions'].items()
+    }
+    return result
@@ -0,0 +1,121 @@
+# Copyright 2024 Community Contributors
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Room access helpers shared by the reaction, reply, metadata and sync services.
+"""
+
+import logging
+
+from .cache import LRUCache
+from .exceptions import MessageNotFoundException, RoomNotFoundException
+
+logger = logging.getLogger(__name__)
+
+# Number of messages per page when only before/after is given
+DEFAULT_WINDOW_LIMIT = 50
+
+# Bus events published by wazo-chatd when room membership changes
+ROOM_MEMBERSHIP_EVENTS = ('chatd_user_room_created',)
+
+
+class RoomAccess:
+    """Lightweight description of a room, enough to check access and notify.
+
+    Replaces the hydrated chatd ORM room in the reaction and reply services.
+    """
+
+    def __init__(self, uuid, tenant_uuid, user_uuids):
+        self.uuid = uuid
+        self.tenant_uuid = tenant_uuid
+        self.user_uuids = user_uuids
+
+
+class RoomAccessCache:
+    """Per-process cache of RoomAccess descriptors, keyed by (tenant, room).
+
+    On a miss, the room is loaded once through the chatd DAO and its members
+    are kept as a frozenset of UUID strings, so membership checks do not
+    rebuild it from room.users. Entries have a short TTL and are invalidated
+    when wazo-chatd publishes a room membership change on the bus.
+    """
+
+    def __init__(self, chatd_dao, max_size=10000, ttl=30):
+        self._chatd_dao = chatd_dao
+        self._cache = LRUCache(max_size, ttl)
+
+    def get(self, tenant_uuid, room_uuid):
+        """Get the access descriptor of a room within a tenant.
+
+        Returns:
+            RoomAccess or None if the room does not exist in this tenant
+        """
+        key = (str(tenant_uuid), str(room_uuid))
+        access = self._cache.get(key)
+        if access is None:
+            room = self._chatd_dao.room.get([tenant_uuid], room_uuid)
+            if not room:
+                return None
+            access = RoomAccess(
+                uuid=str(room.uuid),
+                tenant_uuid=str(room.tenant_uuid),
+                user_uuids=frozenset(str(user.uuid) for user in room.users),
+            )
+            self._cache.set(key, access)
+        return access
+
+    def invalidate(self, room_uuid):
+        """Forget a room, in every tenant, along with its members."""
+        room_uuid = str(room_uuid)
+        self._cache.invalidate_where(lambda key: key[1] == room_uuid)
+
+    def on_room_event(self, payload):
+        """Bus handler for room membership events."""
+        room_uuid = payload.get('uuid')
+        if room_uuid:
+            logger.debug('Invalidating cached access to room %s', room_uuid)
+            self.invalidate(room_uuid)
+
+    def stats(self):
+        """Get cache hit/miss counters."""
+        return self._cache.stats()
+
+
+def get_room(room_cache, tenant_uuid, room_uuid):
+    """Get room by UUID, verifying tenant access.
+
+    Raises RoomNotFoundException if the room is not in the tenant.
+    """
+    room = room_cache.get(tenant_uuid, room_uuid)
+    if not room:
+        raise RoomNotFoundException(room_uuid)
+    return room
+
+
+def verify_user_in_room(room, user_uuid):
+    """Verify user is a member of the room."""
+    if str(user_uuid) not in room.user_uuids:
+        raise RoomNotFoundException(room.uuid)
+
+
+def get_message(message_dao, room, message_uuid):
+    """Get message by UUID, verifying it belongs to room.
+
+    Raises MessageNotFoundException if the message is not in the room.
+    """
+    message = message_dao.get(room.uuid, message_uuid)
+    if not message:
+        raise MessageNotFoundException(message_uuid)
+    return message
+
+
+def get_message_window(message_dao, room, before, after, limit):
+    """Get a page of message UUIDs in a room and the cursor of the next page."""
+    limit = limit or DEFAULT_WINDOW_LIMIT
+    before_message = get_message(message_dao, room, before) if before else None
+    after_message = get_message(message_dao, room, after) if after else None
+    message_uuids = message_dao.list_uuids(
+        room.uuid, limit, before=before_message, after=after_message
+    )
+    next_cursor = str(message_uuids[-1]) if len(message_uuids) == limit else None
+    return message_uuids, next_cursor
@@ -0,0 +1,35 @@
+# Copyright 2024 Community Contributors
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Helpers shared by the DAOs to turn database rows into result objects.
+
+Result types are namedtuple subclasses with empty __slots__: they have no
+per-instance __dict__ and are built straight from a row, so the columns of a
+query must be selected in the order of the result fields.
+"""
+
+# Rows fetched at a time by the iter_* DAO methods (server-side cursors)
+STREAM_BATCH_SIZE = 1000
+
+
+def map_row(result_type, row):
+    """Build a result from a row, or return None if there is no row."""
+    if row is None:
+        return None
+    return result_type._make(row)
+
+
+def map_rows(result_type, rows):
+    """Build a list of results from rows."""
+    return list(map(result_type._make, rows))
+
+
+def iter_rows(result_type, results, batch_size=STREAM_BATCH_SIZE):
+    """Iterate over the results of a streamed query, fetching batch_size rows at a time."""
+    make = result_type._make
+    while True:
+        rows = results.fetchmany(batch_size)
+        if not rows:
+            break
+        yield from map(make, rows)
@@ -0,0 +1,192 @@
+# Copyright 2024 Community Contributors
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Versioned schema migrations of the plugin tables.
+
+Migrations are the SQL files of the migrations directory, named
+NNNN_description.sql and applied in version order. Applied versions are
+recorded in chatd_reactions_schema_version, and each migration is applied in
+its own transaction along with its version row.
+
+A migration containing the line `-- migrate: no-transaction` is run outside
+of a transaction, one statement at a time (statements end with `;` at the end
+of a line), e.g. for CREATE INDEX CONCURRENTLY. Its statements must be safe
+to run again if it is interrupted: an index that an interrupted CREATE INDEX
+CONCURRENTLY left invalid is dropped before the migration is run again, so
+that CREATE INDEX CONCURRENTLY IF NOT EXISTS builds it anew.
+
+Migrations are run by the migrate admin command, as the database owner (the
+install rules run it as the postgres user).
+"""
+
+import logging
+import os
+import re
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), 'migrations')
+
+_FILENAME_RE = re.compile(r'^(\d{4})_(\w+)\.sql$')
+_NO_TRANSACTION_RE = re.compile(r'^-- migrate: no-transaction$', re.MULTILINE)
+_STATEMENT_END_RE = re.compile(r';[ \t]*$', re.MULTILINE)
+
+# Serializes concurrent migrate runs
+_LOCK_NAME = 'wazo-chatd-reactions-migrate'
+
+
+class Migration:
+    """A migration SQL file."""
+
+    def __init__(self, version, name, path):
+        self.version = version
+        self.name = name
+        self.path = path
+
+    def read_sql(self):
+        with open(self.path, encoding='utf-8') as f:
+            return f.read()
+
+    @property
+    def transactional(self):
+        return not _NO_TRANSACTION_RE.search(self.read_sql())
+
+    def statements(self):
+        """Split the SQL in statements, leaving out comment-only parts."""
+        statements = []
+        for part in _STATEMENT_END_RE.split(self.read_sql()):
+            lines = [line for line in part.splitlines() if line.strip()]
+            if any(not line.lstrip().startswith('--') for line in lines):
+                statements.append(part.strip())
+        return statements
+
+    def __str__(self):
+        return f'{self.version:04d}_{self.name}'
+
+
+def list_migrations(directory=MIGRATIONS_DIR):
+    """List the migrations of a directory, in version order.
+
+    Raises:
+        ValueError: if two migrations have the same version
+    """
+    migrations = {}
+    for filename in os.listdir(directory):
+        match = _FILENAME_RE.match(filename)
+        if not match:
+            continue
+        version = int(match.group(1))
+        if version in migrations:
+            raise ValueError(f'Duplicate migration version: {filename}')
+        migrations[version] = Migration(version, match.group(2), os.path.join(directory, filename))
+    return [migrations[version] for version in sorted(migrations)]
+
+
+def get_applied_versions(connection):
+    """Get the set of applied migration versions, creating the version table if needed."""
+    connection.execute(text("""
+        CREATE TABLE IF NOT EXISTS chatd_reactions_schema_version (
+            version INTEGER PRIMARY KEY,
+            name VARCHAR(128) NOT NULL,
+            applied_at TIMESTAMPTZ DEFAULT NOW() NOT NULL
+        )
+    """))
+    results = connection.execute(text(
+        'SELECT version FROM chatd_reactions_schema_version'
+    )).fetchall()
+    return {row[0] for row in results}
+
+
+def get_pending(engine, migrations=None):
+    """Get the migrations not applied yet, in version order."""
+    migrations = list_migrations() if migrations is None else migrations
+    with engine.begin() as connection:
+        applied = get_applied_versions(connection)
+    return [migration for migration in migrations if migration.version not in applied]
+
+
+def migrate(engine, target=None, migrations=None):
+    """Apply the pending migrations, up to the target version (all if None).
+
+    Returns:
+        List of the migrations applied
+    """
+    applied = []
+    for migration in get_pending(engine, migrations):
+        if target is not None and migration.version > target:
+            break
+        logger.info('Applying migration %s', migration)
+        if migration.transactional:
+            with engine.begin() as connection:
+                _lock(connection)
+                # Applied by a concurrent run while waiting for the lock
+                if migration.version in get_applied_versions(connection):
+                    continue
+                _execute(connection, migration.read_sql())
+                _record(connection, migration)
+        else:
+            with engine.connect() as connection:
+                connection = connection.execution_options(isolation_level='AUTOCOMMIT')
+                # Held until the migration is recorded, as every statement
+                # commits on its own
+                connection.execute(
+                    text('SELECT pg_advisory_lock(hashtext(:name))'), {'name': _LOCK_NAME}
+                )
+                try:
+                    if migration.version in get_applied_versions(connection):
+                        continue
+                    _drop_invalid_indexes(connection, migration)
+                    for statement in migration.statements():
+                        _execute(connection, statement)
+                    _record(connection, migration)
+                finally:
+                    connection.execute(
+                        text('SELECT pg_advisory_unlock(hashtext(:name))'), {'name': _LOCK_NAME}
+                    )
+        applied.append(migration)
+    return applied
+
+
+def _lock(connection):
+    connection.execute(
+        text('SELECT pg_advisory_xact_lock(hashtext(:name))'), {'name': _LOCK_NAME}
+    )
+
+
+def _drop_invalid_indexes(connection, migration):
+    """Drop the invalid indexes named in a migration, left by an interrupted run."""
+    results = connection.execute(text("""
+        SELECT c.relname
+        FROM pg_index i
+        INNER JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE NOT i.indisvalid
+          AND pg_catalog.pg_table_is_visible(c.oid)
+    """)).fetchall()
+    sql = migration.read_sql()
+    for (name,) in results:
+        if re.search(rf'\b{re.escape(name)}\b', sql):
+            logger.warning('Dropping index %s left invalid by an interrupted migration', name)
+            _execute(connection, f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+
+
+def _execute(connection, sql):
+    # Raw cursor: the SQL may hold several statements, and colons that are
+    # not bind parameters
+    cursor = connection.connection.cursor()
+    try:
+        cursor.execute(sql)
+    finally:
+        cursor.close()
+
+
+def _record(connection, migration):
+    connection.execute(
+        text("""
+            INSERT INTO chatd_reactions_schema_version (version, name)
+            VALUES (:version, :name)
+        """),
+        {'version': migration.version, 'name': migration.name},
+    )
@@ -1,7 +1,8 @@
 # Copyright 2024 Community Contributors
 # SPDX-License-Identifier: GPL-3.0-or-later
 
-from xivo.mallow import fields
+from marshmallow import ValidationError, pre_load, validates_schema
+from xivo.mallow import fields, validate
 from xivo.mallow_helpers import Schema
 
 
@@ -18,12 +19,62 @@ class ReactionSchema(Schema):
     created_at = fields.DateTime(dump_only=True)
 
 
+class ReactionToggleSchema(ReactionSchema):
+    """Schema for the result of toggling a reaction."""
+    
+    # True if the reaction was added, False if it was removed
+    reacted = fields.Boolean(dump_only=True)
+
+
 class ReactionCreateSchema(Schema):
     """Schema for creating a reaction."""
     
     emoji = fields.String(required=True)
 
 
+class BulkReactionOperationSchema(Schema):
+    """Schema for one operation of a bulk reaction request."""
+    
+    action = fields.String(required=True, validate=validate.OneOf(['add', 'remove']))
+    message_uuid = fields.UUID(required=True)
+    emoji = fields.String(required=True, validate=validate.Length(min=1, max=10))
+
+
+class BulkReactionsSchema(Schema):
+    """Schema for adding and removing reactions on several messages at once."""
+    
+    operations = fields.Nested(
+        BulkReactionOperationSchema,
+        many=True,
+        required=True,
+        validate=validate.Length(min=1, max=500),
+    )
+
+    @validates_schema
+    def validate_unique_reactions(self, data, **kwargs):
+        keys = [
+            (operation['message_uuid'], operation['emoji'])
+            for operation in data.get('operations', [])
+        ]
+        if len(set(keys)) != len(keys):
+            raise ValidationError(
+                'At most one operation per message and emoji', 'operations'
+            )
+
+
+class BulkReactionResultSchema(BulkReactionOperationSchema):
+    """Schema for the result of one bulk reaction operation."""
+    
+    # False if the reaction already existed (add) or did not exist (remove)
+    applied = fields.Boolean(dump_only=True)
+
+
+class BulkReactionResultsSchema(Schema):
+    """Schema for the results of a bulk reaction request."""
+    
+    results = fields.Nested(BulkReactionResultSchema, many=True)
+
+
 class ReactionDetailSchema(Schema):
     """Schema for detailed reaction info (user + timestamp)."""
     
@@ -42,6 +93,14 @@ class ReactionSummarySchema(Schema):
     details = fields.Nested(ReactionDetailSchema, many=True)
 
 
+class ReactionCountSchema(Schema):
+    """Schema for compact reaction summary (emoji + count only)."""
+    
+    emoji = fields.String()
+    count = fields.Integer()
+    reacted_by_me = fields.Boolean()
+
+
 class MessageReactionsSchema(Schema):
     """Schema for all reactions on a message."""
     
@@ -58,6 +117,50 @@ class RoomReactionsSchema(Schema):
         keys=fields.String(),
         values=fields.Nested(ReactionSummarySchema, many=True)
     )
+    # Only present when a message window was requested
+    next_cursor = fields.UUID(allow_none=True)
+
+
+class MessageReactionCountsSchema(Schema):
+    """Schema for reaction counts on a message (summary view)."""
+    
+    message_uuid = fields.UUID()
+    reactions = fields.Nested(ReactionCountSchema, many=True)
+
+
+class RoomReactionCountsSchema(Schema):
+    """Schema for reaction counts in a room (summary view)."""
+    
+    room_uuid = fields.UUID()
+    reactions = fields.Dict(
+        keys=fields.String(),
+        values=fields.Nested(ReactionCountSchema, many=True)
+    )
+    # Only present when a message window was requested
+    next_cursor = fields.UUID(allow_none=True)
+
+
+class MessageWindowSchema(Schema):
+    """Schema for selecting a page of messages in a room (keyset pagination)."""
+    
+    before = fields.UUID()
+    after = fields.UUID()
+    limit = fields.Integer(validate=validate.Range(min=1, max=500))
+
+
+class ReactionsQuerySchema(Schema):
+    """Schema for the query string of message reaction reads."""
+    
+    # 'full' includes user_uuids and details, 'summary' only counts
+    view = fields.String(validate=validate.OneOf(['full', 'summary']), missing='full')
+
+
+class RoomReactionsQuerySchema(MessageWindowSchema):
+    """Schema for the query string of room reaction reads."""
+    
+    view = fields.String(validate=validate.OneOf(['full', 'summary']), missing='full')
+    # Stream the response of whole-room reads (ignored with a message window)
+    stream = fields.Boolean(missing=False)
 
 
 # =============================================================================
@@ -103,8 +206,105 @@ class MessageRepliesSchema(Schema):
     replies = fields.Nested(ReplyListItemSchema, many=True)
 
 
+class RoomReplyMetadataQuerySchema(Schema):
+    """Schema for the query string of room reply metadata reads."""
+    
+    stream = fields.Boolean(missing=False)
+
+
 class RoomReplyMetadataSchema(Schema):
     """Schema for room-wide reply metadata."""
     
     room_uuid = fields.UUID()
     replies = fields.Dict(keys=fields.String(), values=fields.Nested(ReplyInfoSchema))
+
+
+class ThreadSummarySchema(Schema):
+    """Schema for the replies to a message, aggregated."""
+    
+    reply_count = fields.Integer()
+    last_reply_at = fields.DateTime()
+    participant_uuids = fields.List(fields.UUID())
+
+
+# =============================================================================
+# Room Metadata Schemas
+# =============================================================================
+
+class MessagesMetadataQuerySchema(MessageWindowSchema):
+    """Schema for selecting messages, by UUID list or by page."""
+    
+    # Comma-separated in the query string
+    message_uuids = fields.List(fields.UUID(), validate=validate.Length(max=500))
+
+    @pre_load
+    def split_message_uuids(self, data, **kwargs):
+        if 'message_uuids' not in data:
+            return data
+        data = dict(data)
+        data['message_uuids'] = [
+            uuid for uuid in data['message_uuids'].split(',') if uuid
+        ]
+        return data
+
+
+class MessageMetadataSchema(Schema):
+    """Schema for the reactions and reply info of one message."""
+    
+    reactions = fields.Nested(ReactionSummarySchema, many=True)
+    reply = fields.Nested(ReplyInfoSchema, allow_none=True)
+    thread = fields.Nested(ThreadSummarySchema, allow_none=True)
+
+
+class RoomMessagesMetadataSchema(Schema):
+    """Schema for the metadata of a set of messages in a room."""
+    
+    room_uuid = fields.UUID()
+    messages = fields.Dict(keys=fields.String(), values=fields.Nested(MessageMetadataSchema))
+    # Only present when a message window was requested
+    next_cursor = fields.UUID(allow_none=True)
+
+
+class RoomThreadSummariesSchema(Schema):
+    """Schema for the thread summaries of a set of messages in a room."""
+    
+    room_uuid = fields.UUID()
+    threads = fields.Dict(keys=fields.String(), values=fields.Nested(ThreadSummarySchema))
+    # Only present when a message window was requested
+    next_cursor = fields.UUID(allow_none=True)
+
+
+# =============================================================================
+# Room Sync Schemas
+# =============================================================================
+
+class RoomSyncQuerySchema(Schema):
+    """Schema for the query string of delta sync."""
+    
+    # Opaque cursor from a previous sync response
+    since = fields.String(validate=validate.Length(min=1, max=64))
+    limit = fields.Integer(validate=validate.Range(min=1, max=1000))
+
+
+class RoomChangeSchema(Schema):
+    """Schema for a reaction or reply change."""
+    
+    # reaction_created, reaction_deleted or reply_created
+    kind = fields.String()
+    message_uuid = fields.UUID()
+    # Reaction changes only
+    user_uuid = fields.UUID()
+    emoji = fields.String()
+    # Reply changes only
+    parent_message_uuid = fields.UUID(allow_none=True)
+    created_at = fields.DateTime()
+
+
+class RoomSyncSchema(Schema):
+    """Schema for the changes of a room since a cursor."""
+    
+    room_uuid = fields.UUID()
+    changes = fields.Nested(RoomChangeSchema, many=True)
+    next_cursor = fields.String()
+    has_more = fields.Boolean()
+    reset = fields.Boolean()
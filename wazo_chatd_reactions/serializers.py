@@ -0,0 +1,150 @@
+# Copyright 2024 Community Contributors
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Serializers for the hot reaction read responses.
+
+They produce the same output as dumping with the matching schema
+(MessageReactionsSchema, RoomReactionsSchema and their summary views), without
+the per-field overhead of nested marshmallow dumping: rooms with many messages
+otherwise spend more time dumping than querying. Keep them in sync with the
+schemas when a field is added.
+
+iter_json_object encodes large responses incrementally, for streaming.
+"""
+
+import json
+
+# Size of the chunks written by iter_json_object
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def _uuid(value):
+    return str(value) if value is not None else None
+
+
+def _datetime(value):
+    return value.isoformat() if value is not None else None
+
+
+def _int(value):
+    return int(value) if value is not None else None
+
+
+def _bool(value):
+    return bool(value) if value is not None else None
+
+
+def _dump_summary(summary):
+    """Dump a reaction summary, like ReactionSummarySchema."""
+    result = {
+        'emoji': summary['emoji'],
+        'count': _int(summary['count']),
+        'user_uuids': [_uuid(user_uuid) for user_uuid in summary['user_uuids']],
+        'details': [
+            {
+                'user_uuid': _uuid(detail['user_uuid']),
+                'created_at': _datetime(detail['created_at']),
+            }
+            for detail in summary['details']
+        ],
+    }
+    if 'reacted_by_me' in summary:
+        result['reacted_by_me'] = _bool(summary['reacted_by_me'])
+    return result
+
+
+def _dump_count(count):
+    """Dump a reaction count, like ReactionCountSchema."""
+    result = {
+        'emoji': count['emoji'],
+        'count': _int(count['count']),
+    }
+    if 'reacted_by_me' in count:
+        result['reacted_by_me'] = _bool(count['reacted_by_me'])
+    return result
+
+
+def _dump_room(result, dump_reaction):
+    dumped = {
+        'room_uuid': _uuid(result['room_uuid']),
+        'reactions': {
+            str(message_uuid): [dump_reaction(reaction) for reaction in reactions]
+            for message_uuid, reactions in result['reactions'].items()
+        },
+    }
+    if 'next_cursor' in result:
+        dumped['next_cursor'] = _uuid(result['next_cursor'])
+    return dumped
+
+
+def dump_reaction_summaries(summaries):
+    """Dump a list of reaction summaries, like ReactionSummarySchema(many=True)."""
+    return [_dump_summary(summary) for summary in summaries]
+
+
+def dump_reaction_counts(counts):
+    """Dump a list of reaction counts, like ReactionCountSchema(many=True)."""
+    return [_dump_count(count) for count in counts]
+
+
+def dump_message_reactions(result):
+    """Dump the result of ReactionService.get_reactions, like MessageReactionsSchema."""
+    return {
+        'message_uuid': _uuid(result['message_uuid']),
+        'reactions': dump_reaction_summaries(result['reactions']),
+    }
+
+
+def dump_message_reaction_counts(result):
+    """Dump the result of ReactionService.get_reaction_counts, like MessageReactionCountsSchema."""
+    return {
+        'message_uuid': _uuid(result['message_uuid']),
+        'reactions': dump_reaction_counts(result['reactions']),
+    }
+
+
+def dump_room_reactions(result):
+    """Dump the result of ReactionService.get_room_reactions, like RoomReactionsSchema."""
+    return _dump_room(result, _dump_summary)
+
+
+def dump_room_reaction_counts(result):
+    """Dump the result of ReactionService.get_room_reaction_counts, like RoomReactionCountsSchema."""
+    return _dump_room(result, _dump_count)
+
+
+def iter_json_object(fields, name, items, dump_value, chunk_size=STREAM_CHUNK_SIZE):
+    """Encode a JSON object with a large mapping as an iterator of chunks.
+
+    Gives the same JSON value as encoding `dict(fields, name=dict(items))`,
+    but only one item is dumped at a time, so memory does not grow with the
+    number of items.
+
+    Args:
+        fields: Dict of the other (small) members of the object
+        name: Name of the mapping member
+        items: Iterable of (key, value) pairs of the mapping
+        dump_value: Called with each value; returns its JSON-compatible dump
+        chunk_size: Encoded items are buffered up to about this many
+            characters before being yielded
+    """
+    head = json.dumps(fields, separators=(',', ':'))[:-1]
+    buffer = [head, ',' if fields else '', json.dumps(name), ':{']
+    size = 0
+    separator = ''
+    for key, value in items:
+        item = '{}{}:{}'.format(
+            separator,
+            json.dumps(str(key)),
+            json.dumps(dump_value(value), separators=(',', ':')),
+        )
+        separator = ','
+        buffer.append(item)
+        size += len(item)
+        if size >= chunk_size:
+            yield ''.join(buffer)
+            buffer = []
+            size = 0
+    buffer.append('}}')
+    yield ''.join(buffer)
@@ -2,32 +2,56 @@
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 import logging
-from collections import defaultdict
+from itertools import groupby
 
 from .exceptions import (
     ReactionAlreadyExistsException,
     ReactionNotFoundException,
     MessageNotFoundException,
-    RoomNotFoundException,
 )
+from .rooms import get_message, get_message_window, get_room, verify_user_in_room
 
 logger = logging.getLogger(__name__)
 
+# Actions of bulk reaction operations
+BULK_ADD = 'add'
+BULK_REMOVE = 'remove'
+
 
 class ReactionService:
     """Service for managing message reactions."""
 
-    def __init__(self, chatd_dao, reaction_dao, notifier):
+    def __init__(self, room_cache, reaction_dao, message_dao, notifier, versions):
         """Initialize the reaction service.
         
         Args:
-            chatd_dao: The main chatd DAO (for room access)
+            room_cache: RoomAccessCache for tenant-scoped room lookups
             reaction_dao: Our reaction-specific DAO
+            message_dao: MessageDAO for indexed message lookups
             notifier: ReactionNotifier for WebSocket events
+            versions: VersionTracker bumped on every reaction write
         """
-        self._chatd_dao = chatd_dao
+        self._room_cache = room_cache
         self._reaction_dao = reaction_dao
+        self._message_dao = message_dao
         self._notifier = notifier
+        self._versions = versions
+
+    def get_message_version(self, tenant_uuid, room_uuid, message_uuid):
+        """Get the version of a message's reactions, for conditional reads.
+
+        Only the room access is verified: no message or reaction is read.
+        """
+        room = get_room(self._room_cache, tenant_uuid, room_uuid)
+        return self._versions.message_version(room.uuid, message_uuid)
+
+    def get_room_version(self, tenant_uuid, room_uuid):
+        """Get the version of a room's reactions, for conditional reads.
+
+        Only the room access is verified: no message or reaction is read.
+        """
+        room = get_room(self._room_cache, tenant_uuid, room_uuid)
+        return self._versions.room_version(room.uuid)
 
     def get_reactions(self, tenant_uuid, room_uuid, message_uuid, current_user_uuid):
         """Get all reactions for a message, grouped by emoji.
@@ -37,37 +61,42 @@ class ReactionService:
         Details contains user_uuid + created_at for each reaction (for tooltip display).
         """
         # Verify room exists and user has access
-        room = self._get_room(tenant_uuid, room_uuid)
+        room = get_room(self._room_cache, tenant_uuid, room_uuid)
         
         # Verify message exists in room
-        message = self._get_message(room, message_uuid)
-        
-        # Get raw reactions from database
-        reactions = self._reaction_dao.get_by_message(message_uuid)
-        
-        # Group by emoji, keeping full reaction details
-        grouped = defaultdict(list)
-        for reaction in reactions:
-            grouped[reaction.emoji].append({
-                'user_uuid': str(reaction.user_uuid),
-                'created_at': reaction.created_at,
-            })
-        
-        # Build summary with details
-        result = []
-        for emoji, details in grouped.items():
-            user_uuids = [d['user_uuid'] for d in details]
-            result.append({
-                'emoji': emoji,
-                'count': len(details),
-                'user_uuids': user_uuids,
-                'reacted_by_me': str(current_user_uuid) in user_uuids,
-                'details': details,
-            })
+        message = get_message(self._message_dao, room, message_uuid)
+        
+        # Get reactions grouped by emoji, aggregated by the database
+        summaries = self._reaction_dao.get_summaries_by_message(
+            room.uuid, message_uuid, current_user_uuid
+        )
         
         return {
             'message_uuid': str(message_uuid),
-            'reactions': result,
+            'reactions': [self._build_summary(summary) for summary in summaries],
+        }
+
+    def get_reaction_counts(self, tenant_uuid, room_uuid, message_uuid, current_user_uuid):
+        """Get reaction counts for a message, grouped by emoji.
+        
+        Same as get_reactions, but each reaction only has emoji, count and
+        reacted_by_me. Counts are read from the summary table, so the cost
+        depends on the number of distinct emojis, not on the number of
+        reactions.
+        """
+        # Verify room exists and user has access
+        room = get_room(self._room_cache, tenant_uuid, room_uuid)
+        
+        # Verify message exists in room
+        get_message(self._message_dao, room, message_uuid)
+        
+        counts = self._reaction_dao.get_counts_by_message(
+            room.uuid, message_uuid, current_user_uuid
+        )
+        
+        return {
+            'message_uuid': str(message_uuid),
+            'reactions': [self._build_count(count) for count in counts],
         }
 
     def add_reaction(self, tenant_uuid, room_uuid, message_uuid, user_uuid, emoji):
@@ -76,19 +105,17 @@ class ReactionService:
         Raises ReactionAlreadyExistsException if user already reacted with this emoji.
         """
         # Verify room exists and user has access
-        room = self._get_room(tenant_uuid, room_uuid)
-        self._verify_user_in_room(room, user_uuid)
+        room = get_room(self._room_cache, tenant_uuid, room_uuid)
+        verify_user_in_room(room, user_uuid)
         
         # Verify message exists in room
-        message = self._get_message(room, message_uuid)
+        message = get_message(self._message_dao, room, message_uuid)
         
-        # Check if reaction already exists
-        existing = self._reaction_dao.get(message_uuid, user_uuid, emoji)
-        if existing:
+        # Create reaction (a no-op returning None if it already exists)
+        reaction = self._reaction_dao.create(room.uuid, message_uuid, user_uuid, emoji)
+        if not reaction:
             raise ReactionAlreadyExistsException(message_uuid, user_uuid, emoji)
-        
-        # Create reaction
-        reaction = self._reaction_dao.create(message_uuid, user_uuid, emoji)
+        self._versions.bump_message(room.uuid, message_uuid)
         
         # Notify via WebSocket
         self._notifier.reaction_created(room, message, reaction)
@@ -101,87 +128,272 @@ class ReactionService:
         Raises ReactionNotFoundException if reaction doesn't exist.
         """
         # Verify room exists and user has access
-        room = self._get_room(tenant_uuid, room_uuid)
-        self._verify_user_in_room(room, user_uuid)
+        room = get_room(self._room_cache, tenant_uuid, room_uuid)
+        verify_user_in_room(room, user_uuid)
         
         # Verify message exists in room
-        message = self._get_message(room, message_uuid)
+        message = get_message(self._message_dao, room, message_uuid)
         
-        # Get reaction
-        reaction = self._reaction_dao.get(message_uuid, user_uuid, emoji)
+        # Delete reaction (a no-op returning None if it does not exist)
+        reaction = self._reaction_dao.delete(room.uuid, message_uuid, user_uuid, emoji)
         if not reaction:
             raise ReactionNotFoundException(message_uuid, user_uuid, emoji)
-        
-        # Delete reaction
-        self._reaction_dao.delete(message_uuid, user_uuid, emoji)
+        self._versions.bump_message(room.uuid, message_uuid)
         
         # Notify via WebSocket
         self._notifier.reaction_deleted(room, message, user_uuid, emoji)
 
-    def get_room_reactions(self, tenant_uuid, room_uuid, current_user_uuid):
-        """Get all reactions for all messages in a room.
+    def toggle_reaction(self, tenant_uuid, room_uuid, message_uuid, user_uuid, emoji):
+        """Remove a reaction if the user already reacted with this emoji, add it otherwise.
+        
+        Returns a dict with the reaction fields and `reacted`, which is True if
+        the reaction was added and False if it was removed. If concurrent
+        toggles left nothing to change, the current state is returned (with
+        created_at None when the user has not reacted) and nothing is notified.
+        """
+        # Verify room exists and user has access
+        room = get_room(self._room_cache, tenant_uuid, room_uuid)
+        verify_user_in_room(room, user_uuid)
+        
+        # Verify message exists in room
+        message = get_message(self._message_dao, room, message_uuid)
+        
+        toggled = self._reaction_dao.toggle(room.uuid, message_uuid, user_uuid, emoji)
+        if not toggled:
+            reaction = self._reaction_dao.get(room.uuid, message_uuid, user_uuid, emoji)
+            return {
+                'message_uuid': message_uuid,
+                'user_uuid': user_uuid,
+                'emoji': emoji,
+                'created_at': reaction.created_at if reaction else None,
+                'reacted': reaction is not None,
+            }
+        added, reaction = toggled
+        self._versions.bump_message(room.uuid, message_uuid)
+        
+        # Notify via WebSocket
+        if added:
+            self._notifier.reaction_created(room, message, reaction)
+        else:
+            self._notifier.reaction_deleted(room, message, user_uuid, emoji)
+        
+        return {
+            'message_uuid': reaction.message_uuid,
+            'user_uuid': reaction.user_uuid,
+            'emoji': reaction.emoji,
+            'created_at': reaction.created_at,
+            'reacted': added,
+        }
+
+    def bulk_update_reactions(self, tenant_uuid, room_uuid, user_uuid, operations):
+        """Add and remove reactions of a user on several messages of a room at once.
+
+        The room, the membership and the messages are verified once for the
+        whole request, then every operation is applied by a single DAO
+        statement (all or nothing) and notified in one batch. Adding an
+        existing reaction or removing a missing one is not an error: the
+        operation is reported as not applied.
+
+        Args:
+            operations: List of dicts with action ('add' or 'remove'),
+                message_uuid and emoji; at most one per (message_uuid, emoji)
+
+        Returns a dict with the results, one per operation and in the same
+        order, each with the operation fields and `applied`.
+        """
+        # Verify room exists and user has access
+        room = get_room(self._room_cache, tenant_uuid, room_uuid)
+        verify_user_in_room(room, user_uuid)
+        
+        # Verify every message exists in room, with one query
+        message_uuids = list({str(operation['message_uuid']) for operation in operations})
+        found = set(self._message_dao.filter_uuids(room.uuid, message_uuids))
+        for message_uuid in message_uuids:
+            if message_uuid not in found:
+                raise MessageNotFoundException(message_uuid)
+        
+        added = [
+            (operation['message_uuid'], operation['emoji'])
+            for operation in operations if operation['action'] == BULK_ADD
+        ]
+        removed = [
+            (operation['message_uuid'], operation['emoji'])
+            for operation in operations if operation['action'] == BULK_REMOVE
+        ]
+        created, deleted = self._reaction_dao.bulk_update(room.uuid, user_uuid, added, removed)
+        
+        if created or deleted:
+            self._versions.bump_messages(
+                room.uuid,
+                {str(reaction.message_uuid) for reaction in created + deleted},
+            )
+            # Notify via WebSocket
+            self._notifier.reactions_bulk_changed(room, created, deleted)
+        
+        applied = {
+            (BULK_ADD, str(reaction.message_uuid), reaction.emoji) for reaction in created
+        } | {
+            (BULK_REMOVE, str(reaction.message_uuid), reaction.emoji) for reaction in deleted
+        }
+        return {
+            'results': [
+                dict(
+                    operation,
+                    applied=(
+                        operation['action'], str(operation['message_uuid']), operation['emoji']
+                    ) in applied,
+                )
+                for operation in operations
+            ],
+        }
+
+    def get_room_reactions(self, tenant_uuid, room_uuid, current_user_uuid,
+                           before=None, after=None, limit=None):
+        """Get reactions for the messages in a room.
         
         Returns a dict mapping message_uuid to grouped reactions.
         This is for batch loading to avoid N+1 queries.
+        
+        Without window arguments, reactions of every message in the room are
+        returned. With before/after/limit, only the reactions of a page of
+        messages are returned, along with a next_cursor to fetch the next page
+        (None when the last page was reached).
         """
         # Verify room exists and user has access
-        room = self._get_room(tenant_uuid, room_uuid)
-        
-        # Get all reactions for this room directly from the reaction table
-        # This avoids relying on room.messages which may not be loaded
-        reactions = self._reaction_dao.get_all_for_room(room_uuid)
+        room = get_room(self._room_cache, tenant_uuid, room_uuid)
         
-        if not reactions:
+        if before is None and after is None and limit is None:
+            # Get all reactions for this room directly from the reaction table,
+            # grouped by message and emoji in the database.
+            # This avoids relying on room.messages which may not be loaded
+            summaries = self._reaction_dao.get_summaries_for_room(
+                room.uuid, current_user_uuid
+            )
             return {
                 'room_uuid': str(room_uuid),
-                'reactions': {},
+                'reactions': self._group_by_message(summaries),
             }
         
-        # Group by message, then by emoji
-        by_message = defaultdict(lambda: defaultdict(list))
-        for reaction in reactions:
-            by_message[str(reaction.message_uuid)][reaction.emoji].append({
-                'user_uuid': str(reaction.user_uuid),
-                'created_at': reaction.created_at,
-            })
+        message_uuids, next_cursor = get_message_window(
+            self._message_dao, room, before, after, limit
+        )
+        summaries = self._reaction_dao.get_summaries_by_room(
+            room.uuid, message_uuids, current_user_uuid
+        )
+        return {
+            'room_uuid': str(room_uuid),
+            'reactions': self._group_by_message(summaries),
+            'next_cursor': next_cursor,
+        }
+
+    def get_room_reaction_counts(self, tenant_uuid, room_uuid, current_user_uuid,
+                                 before=None, after=None, limit=None):
+        """Get reaction counts for the messages in a room.
         
-        # Build result structure
-        result = {}
-        for message_uuid, emoji_groups in by_message.items():
-            message_reactions = []
-            for emoji, details in emoji_groups.items():
-                user_uuids = [d['user_uuid'] for d in details]
-                message_reactions.append({
-                    'emoji': emoji,
-                    'count': len(details),
-                    'user_uuids': user_uuids,
-                    'reacted_by_me': str(current_user_uuid) in user_uuids,
-                    'details': details,
-                })
-            result[message_uuid] = message_reactions
+        Same as get_room_reactions, but each reaction only has emoji, count
+        and reacted_by_me, read from the summary table.
+        """
+        # Verify room exists and user has access
+        room = get_room(self._room_cache, tenant_uuid, room_uuid)
         
+        if before is None and after is None and limit is None:
+            counts = self._reaction_dao.get_counts_for_room(room.uuid, current_user_uuid)
+            return {
+                'room_uuid': str(room_uuid),
+                'reactions': self._group_by_message(counts, self._build_count),
+            }
+        
+        message_uuids, next_cursor = get_message_window(
+            self._message_dao, room, before, after, limit
+        )
+        counts = self._reaction_dao.get_counts_by_room(
+            room.uuid, message_uuids, current_user_uuid
+        )
         return {
             'room_uuid': str(room_uuid),
-            'reactions': result,
+            'reactions': self._group_by_message(counts, self._build_count),
+            'next_cursor': next_cursor,
+        }
+
+    def iter_room_reactions(self, tenant_uuid, room_uuid, current_user_uuid):
+        """Get the reactions of every message in a room, one message at a time.
+
+        Same as get_room_reactions without window arguments, for streaming
+        responses: rows are read through a server-side cursor and grouped as
+        they come, so memory does not grow with the size of the room. The
+        room access is verified before returning.
+
+        Returns an iterator of (message_uuid, reactions) pairs.
+        """
+        # Verify room exists and user has access
+        room = get_room(self._room_cache, tenant_uuid, room_uuid)
+        
+        summaries = self._reaction_dao.iter_summaries_for_room(room.uuid, current_user_uuid)
+        return self._iter_by_message(summaries)
+
+    def iter_room_reaction_counts(self, tenant_uuid, room_uuid, current_user_uuid):
+        """Same as iter_room_reactions, with only emoji, count and reacted_by_me."""
+        # Verify room exists and user has access
+        room = get_room(self._room_cache, tenant_uuid, room_uuid)
+        
+        counts = self._reaction_dao.iter_counts_for_room(room.uuid, current_user_uuid)
+        return self._iter_by_message(counts, self._build_count)
+
+    def get_reacted_emojis(self, tenant_uuid, room_uuid, user_uuid, message_uuids=None):
+        """Get the emojis a user reacted with, to overlay reacted_by_me on shared payloads.
+
+        Returns a set of (message_uuid, emoji) tuples, with message UUIDs as
+        strings.
+        """
+        # Verify room exists and user has access
+        room = get_room(self._room_cache, tenant_uuid, room_uuid)
+        
+        return self._reaction_dao.get_user_emojis_for_room(room.uuid, user_uuid, message_uuids)
+
+    def get_reactions_for_messages(self, room, message_uuids, current_user_uuid):
+        """Get grouped reactions for messages of an already resolved room.
+
+        The caller is responsible for getting the room through the room cache
+        and for passing only message UUIDs that belong to it.
+
+        Returns a dict mapping message_uuid to grouped reactions.
+        """
+        summaries = self._reaction_dao.get_summaries_by_room(
+            room.uuid, message_uuids, current_user_uuid
+        )
+        return self._group_by_message(summaries)
+
+    def _group_by_message(self, summaries, build=None):
+        """Group aggregated DAO rows into a dict of message_uuid -> summaries."""
+        build = build or self._build_summary
+        result = {}
+        for summary in summaries:
+            result.setdefault(str(summary.message_uuid), []).append(build(summary))
+        return result
+
+    def _iter_by_message(self, summaries, build=None):
+        """Group aggregated DAO rows, ordered by message, into (message_uuid, summaries) pairs."""
+        build = build or self._build_summary
+        for message_uuid, group in groupby(summaries, key=lambda summary: summary.message_uuid):
+            yield str(message_uuid), [build(summary) for summary in group]
+
+    def _build_summary(self, summary):
+        """Build the emoji summary dict from an aggregated DAO row."""
+        return {
+            'emoji': summary.emoji,
+            'count': summary.count,
+            'user_uuids': summary.user_uuids,
+            'reacted_by_me': summary.reacted_by_me,
+            'details': [
+                {'user_uuid': user_uuid, 'created_at': created_at}
+                for user_uuid, created_at in zip(summary.user_uuids, summary.created_ats)
+            ],
         }
 
-    def _get_room(self, tenant_uuid, room_uuid):
-        """Get room by UUID, verifying tenant access."""
-        # Use chatd's room DAO
-        room = self._chatd_dao.room.get([tenant_uuid], room_uuid)
-        if not room:
-            raise RoomNotFoundException(room_uuid)
-        return room
-
-    def _get_message(self, room, message_uuid):
-        """Get message by UUID, verifying it belongs to room."""
-        for message in room.messages:
-            if str(message.uuid) == str(message_uuid):
-                return message
-        raise MessageNotFoundException(message_uuid)
-
-    def _verify_user_in_room(self, room, user_uuid):
-        """Verify user is a member of the room."""
-        user_uuids = {str(user.uuid) for user in room.users}
-        if str(user_uuid) not in user_uuids:
-            raise RoomNotFoundException(room.uuid)
+    def _build_count(self, count):
+        """Build the emoji summary dict from a summary table row."""
+        return {
+            'emoji': count.emoji,
+            'count': count.count,
+            'reacted_by_me': count.reacted_by_me,
+        }
@@ -0,0 +1,120 @@
+# Copyright 2024 Community Contributors
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import logging
+from datetime import datetime, timedelta, timezone
+
+from .exceptions import InvalidSyncCursorException
+from .rooms import get_room
+
+logger = logging.getLogger(__name__)
+
+# Number of changes per response when no limit is given
+DEFAULT_SYNC_LIMIT = 500
+
+# Sorts after every change ID, for cursors placed after a whole transaction
+_LAST_ID = 2 ** 63 - 1
+
+
+class RoomSyncService:
+    """Service for syncing reaction and reply changes since a cursor."""
+
+    def __init__(self, room_cache, change_dao, retention_days=30):
+        """Initialize the room sync service.
+
+        Args:
+            room_cache: RoomAccessCache for tenant-scoped room lookups
+            change_dao: ChangeLogDAO reading the change log
+            retention_days: Days changes are kept in the log (see the
+                prune-changes admin command); older cursors get a reset
+        """
+        self._room_cache = room_cache
+        self._change_dao = change_dao
+        self._retention = timedelta(days=retention_days)
+
+    def get_changes(self, tenant_uuid, room_uuid, since=None, limit=None):
+        """Get the reactions created/deleted and replies created after a cursor.
+
+        Without `since`, no change is returned, only the current cursor: get
+        it before loading the room, then sync from it. Changes may overlap
+        with what was loaded, so applying them must be idempotent.
+
+        When the cursor is older than the log retention, `reset` is True and
+        no change is returned: the client must reload the room, then sync
+        from the returned cursor.
+
+        Returns a dict with the changes, in order, the next_cursor and
+        has_more (True if next_cursor should be used right away).
+        """
+        # Verify room exists and user has access
+        room = get_room(self._room_cache, tenant_uuid, room_uuid)
+
+        result = {
+            'room_uuid': str(room_uuid),
+            'changes': [],
+            'has_more': False,
+            'reset': False,
+        }
+
+        if since is None:
+            horizon, now = self._change_dao.get_horizon()
+            result['next_cursor'] = _encode_cursor(horizon - 1, _LAST_ID, now)
+            return result
+
+        txid, change_id, issued_at = _decode_cursor(since)
+        limit = limit or DEFAULT_SYNC_LIMIT
+        changes, horizon, now = self._change_dao.list_since(
+            room.uuid, txid, change_id, limit + 1
+        )
+
+        if issued_at < now - self._retention:
+            logger.debug('Sync cursor of room %s is past the retention', room_uuid)
+            result['reset'] = True
+            result['next_cursor'] = _encode_cursor(horizon - 1, _LAST_ID, now)
+            return result
+
+        if len(changes) > limit:
+            changes = changes[:limit]
+            last = changes[-1]
+            result['has_more'] = True
+            result['next_cursor'] = _encode_cursor(last.txid, last.id, issued_at)
+        else:
+            # Every change before the horizon was returned: skip to it
+            position = max((txid, change_id), (horizon - 1, _LAST_ID))
+            result['next_cursor'] = _encode_cursor(*position, now)
+
+        result['changes'] = [self._build_change(change) for change in changes]
+        return result
+
+    def _build_change(self, change):
+        """Build a change entry, with only the fields of its kind."""
+        entry = {
+            'kind': change.kind,
+            'message_uuid': str(change.message_uuid),
+            'created_at': change.created_at,  # Let schema handle datetime formatting
+        }
+        if change.kind == 'reply_created':
+            entry['parent_message_uuid'] = (
+                str(change.parent_message_uuid) if change.parent_message_uuid else None
+            )
+        else:
+            entry['user_uuid'] = str(change.user_uuid)
+            entry['emoji'] = change.emoji
+        return entry
+
+
+def _encode_cursor(txid, change_id, issued_at):
+    """Encode a log position and the time it was handed out as an opaque string."""
+    return f'{txid}.{change_id}.{int(issued_at.timestamp())}'
+
+
+def _decode_cursor(cursor):
+    try:
+        txid, change_id, issued_at = cursor.split('.')
+        return (
+            int(txid),
+            int(change_id),
+            datetime.fromtimestamp(int(issued_at), timezone.utc),
+        )
+    except (ValueError, OverflowError, OSError):
+        raise InvalidSyncCursorException(cursor)
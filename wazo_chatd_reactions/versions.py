@@ -0,0 +1,177 @@
+# Copyright 2024 Community Contributors
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Version counters of rooms and messages, used to build ETags and cache keys.
+
+A version changes whenever a reaction or reply of the room (or message) is
+written through this plugin, and room versions also change when a message is
+posted. Versions are stored in the cache backend and are only used when the
+backend is shared by every process serving the API: otherwise another process
+could answer 304 Not Modified to an ETag made stale by a write it did not see.
+"""
+
+import logging
+import threading
+import time
+
+from .cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# Bus events published by wazo-chatd when a message is posted in a room
+ROOM_MESSAGE_EVENTS = ('chatd_user_room_message_created',)
+
+_COUNTER_KEY = 'version:counter'
+
+
+class VersionTracker:
+    """Version counters, keyed by room or (room, message).
+
+    All keys share a single counter: a bump gives the key a value never handed
+    out before. The counter starts at a random value, so versions are not
+    reused if the backend loses it.
+
+    Keys that were never bumped, or expired or were evicted, get the current
+    counter value, which is at least as high as any value they held. This can
+    change a version without a write (a spurious cache miss), but never gives
+    back a version that was valid for older data.
+
+    When the backend is unavailable or not shared, versions are None:
+    callers must then skip ETags and cached payloads.
+
+    A bump that fails is retried before every later read or bump, and versions
+    stay None meanwhile: an ETag or cached payload that the lost bump should
+    have invalidated is never served by this process. If too many bumps are
+    pending, they are dropped and versions stay None for `ttl` seconds, until
+    every version they could have left stale has expired.
+    """
+
+    def __init__(self, cache, ttl=86400, seen_messages=10000, max_pending=10000,
+                 clock=time.monotonic):
+        """Initialize the tracker.
+
+        Args:
+            cache: FailSafeCache wrapping the cache backend
+            ttl: Seconds a version is kept after its last bump
+            seen_messages: Number of recently posted messages remembered, so
+                that a message bumps its room once (see on_message_event)
+            max_pending: Number of keys of failed bumps kept to be retried
+        """
+        self._cache = cache
+        self._ttl = ttl
+        self._enabled = cache.shared
+        self._seen_messages = LRUCache(seen_messages, ttl=60)
+        self._max_pending = max_pending
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._disabled_until = 0
+        if not self._enabled:
+            logger.warning(
+                'The reactions cache backend is not shared by every wazo-chatd process: '
+                'ETags and cached room payloads are disabled'
+            )
+
+    def room_version(self, room_uuid):
+        """Get the version of everything in a room, or None."""
+        return self._get(_room_key(room_uuid))
+
+    def message_version(self, room_uuid, message_uuid):
+        """Get the version of a message's reactions, or None."""
+        return self._get(_message_key(room_uuid, message_uuid))
+
+    def bump_room(self, room_uuid):
+        """Mark the room as changed. Call after the write is committed."""
+        self._bump(_room_key(room_uuid))
+
+    def bump_message(self, room_uuid, message_uuid):
+        """Mark a message's reactions, and thus its room, as changed.
+
+        Call after the write is committed.
+        """
+        self._bump(_message_key(room_uuid, message_uuid), _room_key(room_uuid))
+
+    def bump_messages(self, room_uuid, message_uuids):
+        """Same as bump_message for several messages of a room, in one backend call."""
+        keys = [_message_key(room_uuid, message_uuid) for message_uuid in message_uuids]
+        self._bump(*keys, _room_key(room_uuid))
+
+    def on_message_event(self, payload):
+        """Bus handler for chatd message events.
+
+        New messages change which messages a windowed room read selects.
+        chatd publishes one event per room member, so only the first event of
+        a message bumps its room.
+        """
+        room_uuid = (payload.get('room') or {}).get('uuid')
+        message_uuid = payload.get('uuid')
+        if not room_uuid or not self._enabled:
+            return
+        if message_uuid:
+            if self._seen_messages.get(message_uuid):
+                return
+            self._seen_messages.set(message_uuid, True)
+        self.bump_room(room_uuid)
+
+    def _get(self, key):
+        if not self._enabled or not self._retry_pending():
+            return None
+        version, counter = self._cache.get_many([key, _COUNTER_KEY])
+        if version is not None:
+            return int(version)
+        if counter is not None:
+            return int(counter)
+        # Never bumped (or lost): seed the counter
+        return self._cache.bump(_COUNTER_KEY, [], self._ttl)
+
+    def _bump(self, *keys):
+        if not self._enabled:
+            return
+        with self._lock:
+            keys = self._pending.union(keys)
+            self._pending.clear()
+        if self._cache.bump(_COUNTER_KEY, list(keys), self._ttl) is None:
+            self._add_pending(keys)
+
+    def _retry_pending(self):
+        """Retry the failed bumps; returns whether versions can be used."""
+        with self._lock:
+            if self._clock() < self._disabled_until:
+                return False
+            if not self._pending:
+                return True
+            keys = list(self._pending)
+            self._pending.clear()
+        if self._cache.bump(_COUNTER_KEY, keys, self._ttl) is None:
+            self._add_pending(keys)
+            return False
+        logger.info('Bumped %s versions after a cache backend failure', len(keys))
+        return True
+
+    def _add_pending(self, keys):
+        with self._lock:
+            first_failure = not self._pending
+            self._pending.update(keys)
+            if len(self._pending) <= self._max_pending:
+                if first_failure:
+                    logger.warning(
+                        'Could not bump versions: ETags and cached payloads are '
+                        'disabled until they are bumped'
+                    )
+                return
+            self._pending.clear()
+            self._disabled_until = self._clock() + self._ttl
+        logger.error(
+            'Too many versions could not be bumped: ETags and cached payloads '
+            'are disabled for %ss',
+            self._ttl,
+        )
+
+
+def _room_key(room_uuid):
+    return f'version:room:{room_uuid}'
+
+
+def _message_key(room_uuid, message_uuid):
+    return f'version:message:{room_uuid}:{message_uuid}'